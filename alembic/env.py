@@ -3,7 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
-from app.models import Base, DataSource, Handler, Output
+from app.models import Base, DataSource, Handler, HandlerRun, Output, OutputFile
 
 from alembic import context
 
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
 
 from app.models.handler import HandlerCreate, HandlerRead, HandlerUpdate
+from app.models.handler_run import HandlerRunRead, HandlerRunSummary, ProfileSort
 from app.services.handler import HandlerService
+from app.services.result_cache import result_cache
 
 router = APIRouter()
 
@@ -27,6 +30,32 @@ async def read_handlers(
     """
     return await service.get_all(skip=skip, limit=limit)
 
+@router.get("/cache/stats")
+async def read_result_cache_stats():
+    """
+    Gibt Trefferzähler und Füllstand des Ergebnis-Caches zurück.
+    """
+    return result_cache.stats()
+
+@router.delete("/cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_result_cache():
+    """
+    Leert den Ergebnis-Cache.
+    """
+    result_cache.clear()
+    return None
+
+@router.get("/runs/summary", response_model=List[HandlerRunSummary])
+async def read_handler_run_summary(
+    since: Optional[datetime] = None,
+    limit: int = 20,
+    service: HandlerService = Depends(),
+):
+    """
+    Gibt die Verbrauchswerte je Datenhandler zurück, nach verbrauchter CPU-Zeit absteigend sortiert.
+    """
+    return await service.get_run_summary(since=since, limit=limit)
+
 @router.get("/{handler_id}", response_model=HandlerRead)
 async def read_handler(
     handler_id: int,
@@ -68,21 +97,40 @@ async def delete_handler(
     await service.delete(handler_id)
     return None
 
+@router.get("/{handler_id}/runs", response_model=List[HandlerRunRead])
+async def read_handler_runs(
+    handler_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    service: HandlerService = Depends(),
+):
+    """
+    Gibt die Ausführungshistorie eines Datenhandlers mit Laufzeit, CPU-Zeit und Speicherverbrauch zurück.
+    """
+    handler = await service.get_by_id(handler_id)
+    if handler is None:
+        raise HTTPException(status_code=404, detail="Datenhandler nicht gefunden")
+    return await service.get_runs(handler_id, skip=skip, limit=limit)
+
 @router.post("/{handler_id}/test", status_code=status.HTTP_200_OK)
 async def test_handler(
     handler_id: int,
     test_data: dict,
+    profile: bool = False,
+    top: Optional[int] = Query(None, gt=0),
+    sort: ProfileSort = ProfileSort.CUMULATIVE,
     service: HandlerService = Depends(),
 ):
     """
     Testet einen Datenhandler mit Testdaten.
+    Mit profile=true wird der Handler unter einem Profiler ausgeführt und die Antwort enthält
+    die top Funktionen mit dem höchsten Zeitverbrauch.
     """
     handler = await service.get_by_id(handler_id)
     if handler is None:
         raise HTTPException(status_code=404, detail="Datenhandler nicht gefunden")
     
     try:
-        result = await service.test_handler(handler, test_data)
-        return {"result": result}
+        return await service.test_handler(handler, test_data, profile=profile, top=top, sort=sort)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Fehler beim Testen: {str(e)}")
\ No newline at end of file
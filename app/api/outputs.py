@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List
 
 from app.models.output import OutputCreate, OutputRead, OutputUpdate
+from app.models.output_file import OutputFile, OutputFileRead
 from app.services.output import OutputService
+from app.utils.delta import keyframe_path
+from app.utils.file_response import logical_name, serve_bytes, serve_file
 
 router = APIRouter()
 
@@ -66,4 +69,79 @@ async def delete_output(
     if output is None:
         raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
     await service.delete(output_id)
-    return None
\ No newline at end of file
+    return None
+
+@router.get("/{output_id}/files", response_model=List[OutputFileRead])
+async def read_output_files(
+    output_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    service: OutputService = Depends(),
+):
+    """
+    Gibt die geschriebenen Dateien einer Ausgabekonfiguration zurück, die neuesten zuerst.
+    Bei der delta-Strategie verweist base_id eines Deltas auf seinen Keyframe.
+    """
+    output = await service.get_by_id(output_id)
+    if output is None:
+        raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
+    return await service.get_files(output_id, skip=skip, limit=limit)
+
+@router.get("/{output_id}/files/{file_id}/content")
+async def read_output_file_content(
+    output_id: int,
+    file_id: int,
+    service: OutputService = Depends(),
+):
+    """
+    Gibt den entpackten Inhalt einer gespeicherten Version zurück; Deltas werden dazu aus
+    ihrem Keyframe wiederhergestellt.
+    """
+    content = await service.read_version(output_id, file_id)
+    return Response(content=content, media_type="application/octet-stream")
+
+async def _download(request: Request, service: OutputService, output_file: OutputFile) -> Response:
+    if output_file.base_id is not None:
+        # Deltas werden wiederhergestellt; Inhalt und damit ETag einer Version ändern sich nicht mehr
+        content = await service.read_version(output_file.output_id, output_file.id)
+        return serve_bytes(
+            request,
+            content,
+            etag=f'"v{output_file.id:x}-{len(content):x}"',
+            last_modified=output_file.created_at.timestamp(),
+            filename=logical_name(keyframe_path(output_file.path))
+        )
+    try:
+        return await serve_file(request, service.get_file_path(output_file))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Datei nicht mehr vorhanden")
+
+@router.api_route("/{output_id}/download", methods=["GET", "HEAD"])
+async def download_latest_file(
+    output_id: int,
+    request: Request,
+    service: OutputService = Depends(),
+):
+    """
+    Lädt die zuletzt geschriebene Datei einer Ausgabekonfiguration herunter.
+    Unterstützt Range-Anfragen sowie bedingte Anfragen (If-None-Match, If-Modified-Since),
+    die bei unveränderter Datei mit 304 beantwortet werden. Komprimiert gespeicherte Dateien
+    werden bei passendem Accept-Encoding unverändert gesendet, sonst beim Senden entpackt.
+    """
+    output = await service.get_by_id(output_id)
+    if output is None:
+        raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
+    return await _download(request, service, await service.get_latest_file(output_id))
+
+@router.api_route("/{output_id}/files/{file_id}/download", methods=["GET", "HEAD"])
+async def download_output_file(
+    output_id: int,
+    file_id: int,
+    request: Request,
+    service: OutputService = Depends(),
+):
+    """
+    Lädt eine gespeicherte Version einer Ausgabekonfiguration herunter, wie /download.
+    Deltas werden aus ihrem Keyframe wiederhergestellt und unkomprimiert gesendet.
+    """
+    return await _download(request, service, await service.get_file(output_id, file_id))
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -22,6 +22,30 @@ class Settings(BaseSettings):
     
     # Output-Konfiguration
     OUTPUT_DIR: Path = BASE_DIR / "output"
+    OUTPUT_BUFFER_SIZE: int = 64 * 1024  # Bytes, die beim gestreamten Schreiben gesammelt werden
+    OUTPUT_FSYNC_POLICY: str = "file"  # Standard für Ausgaben ohne eigene Einstellung ("none", "file" oder "batch")
+    OUTPUT_MAX_CONCURRENCY: int = 4  # Maximale Anzahl gleichzeitig schreibender Ausgaben
+    OUTPUT_WRITER_BUFFER_SIZE: int = 4 * 1024 * 1024  # Bytes, die je Ausgabe auf das Schreiben warten dürfen
+    OUTPUT_SEGMENT_MAX_MB: int = 64  # Größe, ab der bei der append-Strategie ein neues Segment begonnen wird
+    OUTPUT_SEGMENT_MAX_MINUTES: int = 60  # Alter, ab dem bei der append-Strategie ein neues Segment begonnen wird
+    OUTPUT_APPEND_FLUSH_SIZE: int = 1024 * 1024  # Bytes, die vor dem Schreiben an ein Segment gesammelt werden
+    OUTPUT_APPEND_FLUSH_INTERVAL: int = 10  # Sekunden, nach denen gesammelte Daten spätestens geschrieben werden
+    OUTPUT_DELTA_KEYFRAME_INTERVAL: int = 24  # Läufe, nach denen bei der delta-Strategie ein neuer Keyframe geschrieben wird
+    OUTPUT_DELTA_MAX_RATIO: float = 0.5  # Größeres Delta im Verhältnis zur vollständigen Version wird als Keyframe gespeichert
+    OUTPUT_DEDUPLICATE: bool = True  # Zeitgestempelte Dateien mit gleichem Inhalt als Hardlinks auf einen Blob speichern
+    OUTPUT_DOWNLOAD_CHUNK_SIZE: int = 256 * 1024  # Bytes je Lesevorgang beim Herunterladen, wenn der Server kein sendfile() anbietet
+    
+    # Objektspeicher-Konfiguration (S3-kompatibel) für Ausgaben mit sink "s3"
+    S3_ENDPOINT_URL: Optional[str] = None  # z.B. https://s3.eu-central-1.amazonaws.com oder http://localhost:9000
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: Optional[str] = None
+    S3_SECRET_KEY: Optional[str] = None
+    S3_BUCKET: Optional[str] = None  # Standard für Ausgaben ohne eigenen Bucket
+    S3_PART_SIZE: int = 8 * 1024 * 1024  # Bytes je Teil eines Multipart-Uploads (mindestens 5 MB)
+    S3_MAX_CONCURRENT_PARTS: int = 4  # Gleichzeitig hochgeladene Teile je Objekt
+    S3_MAX_CONNECTIONS: int = 16  # Größe des Connection-Pools
+    S3_TIMEOUT: float = 60.0  # Sekunden
+    S3_MAX_RETRIES: int = 3  # Wiederholungen bei Verbindungs- und Serverfehlern
     
     # Logging-Konfiguration
     LOG_LEVEL: str = "INFO"
@@ -30,9 +54,38 @@ class Settings(BaseSettings):
     # Scheduler-Konfiguration
     SCHEDULER_MISFIRE_GRACE_TIME: int = 60  # Sekunden
     
+    # HTTP-Client-Konfiguration für den Datenabruf
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Sekunden
+    HTTP_HTTP2: bool = False  # Erfordert das Paket 'h2'
+    HTTP_TIMEOUT: float = 30.0  # Sekunden, Standard für Datenquellen ohne eigenes Timeout
+    HTTP_CONNECT_TIMEOUT: float = 10.0  # Sekunden
+    
+    # Datenabruf-Konfiguration
+    FETCH_CHUNK_SIZE: int = 64 * 1024  # Bytes pro gelesenem Block
+    FETCH_MAX_SIZE: int = 512 * 1024 * 1024  # Bytes, Standard für Datenquellen ohne eigenes Limit
+    
     # Sandbox-Konfiguration
-    SANDBOX_TIMEOUT: int = 30  # Sekunden
+    SANDBOX_TIMEOUT: int = 30  # Sekunden je Auftrag bzw. Sammelauftrag, ab dem Senden gemessen
     TEMP_DIR: Path = BASE_DIR / "tmp"
+    SANDBOX_MAX_CONCURRENCY: int = 4  # Gleichzeitige Sandbox-Ausführungen
+    SANDBOX_POOL_SIZE: int = 4  # Anzahl vorgestarteter Worker (0 = für jede Ausführung ein neuer Prozess)
+    SANDBOX_WORKER_MAX_JOBS: int = 100  # Aufträge, nach denen ein Worker ersetzt wird
+    SANDBOX_WORKER_MAX_RSS_MB: int = 512  # Speicherverbrauch, ab dem ein Worker ersetzt wird
+    SANDBOX_BYTECODE_CACHE_SIZE: int = 256  # Anzahl zwischengespeicherter kompilierter Skripte
+    SANDBOX_RESULT_ENCODING: str = "json"  # Kodierung strukturierter Ergebnisse ("json" oder "binary")
+    SANDBOX_BATCH_HANDLERS: bool = True  # Alle Handler einer Datenquelle in einem Sandbox-Auftrag ausführen
+    SANDBOX_PROFILE_TOP_N: int = 20  # Anzahl der Funktionen in Profilen von Handlern
+    HANDLER_RUN_RETENTION_DAYS: int = 30  # Aufbewahrungsdauer der Ausführungshistorie in Tagen
+    
+    # Ergebnis-Cache für Datenhandler
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 256  # Einträge im Speicher
+    RESULT_CACHE_MAX_MEMORY_MB: int = 64  # Größe aller Einträge im Speicher
+    RESULT_CACHE_MAX_DISK_MB: int = 1024  # Größe aller Einträge auf der Festplatte
+    RESULT_CACHE_MAX_ENTRY_MB: int = 32  # Größere Ergebnisse werden nicht zwischengespeichert
+    RESULT_CACHE_MAX_AGE: int = 86400  # Sekunden
     
     class Config:
         env_file = ".env"
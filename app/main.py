@@ -5,6 +5,9 @@ from contextlib import asynccontextmanager
 from app.api.routes import router as api_router
 from app.config.settings import settings
 from app.models.base import init_db
+from app.services.object_storage import close_s3_client
+from app.services.sandbox_pool import shutdown_worker_pool
+from app.services.segments import close_segments
 from app.utils.logging import setup_logging
 
 @asynccontextmanager
@@ -18,7 +21,14 @@ async def lifespan(app: FastAPI):
     
     yield  # Warten, bis die App beendet wird
     
-    # Cleanup oder weitere Shutdown-Logik könnte hier ergänzt werden
+    # Gesammelte Daten der Ausgabesegmente schreiben
+    await close_segments()
+    
+    # Verbindungen zum Objektspeicher schließen
+    await close_s3_client()
+    
+    # Sandbox-Worker beenden
+    await shutdown_worker_pool()
 
 app = FastAPI(
     title="Data Fetch & Process Webapp",
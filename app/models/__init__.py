@@ -1,4 +1,6 @@
 from app.models.base import Base
 from app.models.datasource import DataSource
 from app.models.handler import Handler
-from app.models.output import Output
\ No newline at end of file
+from app.models.handler_run import HandlerRun
+from app.models.output import Output
+from app.models.output_file import OutputFile
\ No newline at end of file
@@ -1,10 +1,34 @@
-from datetime import datetime, time
-from typing import Optional
+from datetime import datetime, time, timedelta
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel, HttpUrl, validator
-from sqlalchemy import Column, String, Integer, Time, Interval
+from sqlalchemy import Column, String, Integer, Time, Interval, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy.orm import relationship
 
-from app.models.base import BaseModel as SQLABaseModel
+from app.models.base import Base, BaseModel as SQLABaseModel
+
+# Enum für das Ergebnis eines Datenabrufs
+class FetchStatus(str, Enum):
+    SUCCESS = "success"
+    UNCHANGED = "unchanged"
+    ERROR = "error"
+
+# Verknüpfung von Datenquellen mit den Handlern, die ihre Daten verarbeiten
+datasource_handlers = Table(
+    "datasource_handlers",
+    Base.metadata,
+    Column("datasource_id", Integer, ForeignKey("datasources.id", ondelete="CASCADE"), primary_key=True),
+    Column("handler_id", Integer, ForeignKey("handlers.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+# Verknüpfung von Datenquellen mit den Ausgaben, in die die Ergebnisse geschrieben werden
+datasource_outputs = Table(
+    "datasource_outputs",
+    Base.metadata,
+    Column("datasource_id", Integer, ForeignKey("datasources.id", ondelete="CASCADE"), primary_key=True),
+    Column("output_id", Integer, ForeignKey("outputs.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
 
 # SQLAlchemy-Modell
 class DataSource(SQLABaseModel):
@@ -15,6 +39,35 @@ class DataSource(SQLABaseModel):
     description = Column(String, nullable=True)
     start_time = Column(Time, nullable=False, default=time(0, 0))
     frequency = Column(Interval, nullable=False)
+    timeout = Column(Integer, nullable=True)  # Timeout für den Abruf in Sekunden (Standard: HTTP_TIMEOUT)
+    stream_to_disk = Column(Boolean, nullable=False, default=False)  # Daten in eine Spill-Datei streamen
+    max_size = Column(Integer, nullable=True)  # Maximale Größe in Bytes (Standard: FETCH_MAX_SIZE)
+    
+    # Zustand des letzten Abrufs (wird vom Scheduler gepflegt)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    last_fetch_at = Column(DateTime, nullable=True)
+    last_fetch_status = Column(String, nullable=True)
+    content_digest = Column(String, nullable=True)  # Digest der zuletzt verarbeiteten Daten
+    unchanged_runs = Column(Integer, nullable=False, default=0)  # Übersprungene Läufe seit der letzten Verarbeitung
+    force_process_every = Column(Integer, nullable=True)  # Verarbeitung spätestens jeden N-ten Lauf erzwingen
+    
+    # Zugeordnete Handler und Ausgaben (werden mit der Datenquelle geladen)
+    handlers = relationship("Handler", secondary=datasource_handlers, lazy="selectin", order_by="Handler.id")
+    outputs = relationship("Output", secondary=datasource_outputs, lazy="selectin", order_by="Output.id")
+    
+    @property
+    def handler_ids(self) -> List[int]:
+        return [handler.id for handler in self.handlers]
+    
+    @property
+    def output_ids(self) -> List[int]:
+        return [output.id for output in self.outputs]
+    
+    @property
+    def forced_run_due(self) -> bool:
+        # Der nächste Lauf muss verarbeiten, auch wenn sich die Daten nicht geändert haben
+        return bool(self.force_process_every) and (self.unchanged_runs or 0) + 1 >= self.force_process_every
     
 # Pydantic-Modelle für API-Validierung
 class DataSourceBase(BaseModel):
@@ -23,6 +76,12 @@ class DataSourceBase(BaseModel):
     description: Optional[str] = None
     start_time: time = time(0, 0)
     frequency: int  # Frequenz in Sekunden
+    timeout: Optional[int] = None  # Timeout in Sekunden
+    stream_to_disk: bool = False
+    max_size: Optional[int] = None  # Maximale Größe in Bytes
+    force_process_every: Optional[int] = None  # Unveränderte Daten spätestens jeden N-ten Lauf verarbeiten
+    handler_ids: List[int] = []  # Handler, die die Daten verarbeiten
+    output_ids: List[int] = []  # Ausgaben, in die die Ergebnisse geschrieben werden
     
     @validator('frequency')
     def validate_frequency(cls, v):
@@ -30,6 +89,24 @@ class DataSourceBase(BaseModel):
             raise ValueError("Die Frequenz muss größer als 0 sein")
         return v
     
+    @validator('timeout')
+    def validate_timeout(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Das Timeout muss größer als 0 sein")
+        return v
+    
+    @validator('max_size')
+    def validate_max_size(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Die maximale Größe muss größer als 0 sein")
+        return v
+    
+    @validator('force_process_every')
+    def validate_force_process_every(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Der Wert für die erzwungene Verarbeitung muss größer als 0 sein")
+        return v
+    
     class Config:
         orm_mode = True
 
@@ -42,6 +119,12 @@ class DataSourceUpdate(BaseModel):
     description: Optional[str] = None
     start_time: Optional[time] = None
     frequency: Optional[int] = None
+    timeout: Optional[int] = None
+    stream_to_disk: Optional[bool] = None
+    max_size: Optional[int] = None
+    force_process_every: Optional[int] = None
+    handler_ids: Optional[List[int]] = None
+    output_ids: Optional[List[int]] = None
     
     @validator('frequency')
     def validate_frequency(cls, v):
@@ -49,10 +132,37 @@ class DataSourceUpdate(BaseModel):
             raise ValueError("Die Frequenz muss größer als 0 sein")
         return v
     
+    @validator('timeout')
+    def validate_timeout(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Das Timeout muss größer als 0 sein")
+        return v
+    
+    @validator('max_size')
+    def validate_max_size(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Die maximale Größe muss größer als 0 sein")
+        return v
+    
+    @validator('force_process_every')
+    def validate_force_process_every(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Der Wert für die erzwungene Verarbeitung muss größer als 0 sein")
+        return v
+    
     class Config:
         orm_mode = True
 
 class DataSourceRead(DataSourceBase):
     id: int
+    last_fetch_at: Optional[datetime] = None
+    last_fetch_status: Optional[FetchStatus] = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+    
+    @validator('frequency', pre=True)
+    def frequency_to_seconds(cls, v):
+        # In der Datenbank als Intervall gespeichert
+        if isinstance(v, timedelta):
+            return int(v.total_seconds())
+        return v
\ No newline at end of file
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, validator
-from sqlalchemy import Column, String, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, Text, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel as SQLABaseModel
@@ -15,12 +15,20 @@ class Handler(SQLABaseModel):
     description = Column(String, nullable=True)
     script = Column(Text, nullable=False)
     version = Column(Integer, nullable=False, default=1)
+    parent_id = Column(Integer, ForeignKey("handlers.id"), nullable=True)  # Vorstufe, deren Ergebnis als Eingabe dient
+    max_memory_mb = Column(Integer, nullable=True)  # Limit für den Adressraum des Sandbox-Prozesses (RLIMIT_AS)
+    max_cpu_seconds = Column(Integer, nullable=True)  # Limit für die CPU-Zeit je Ausführung (RLIMIT_CPU)
+    profile = Column(Boolean, nullable=False, default=False)  # Ausführungen profilieren und Profil in der Historie speichern
     
 # Pydantic-Modelle für API-Validierung
 class HandlerBase(BaseModel):
     name: str
     description: Optional[str] = None
     script: str
+    parent_id: Optional[int] = None  # Vorstufe in einer Pipeline
+    max_memory_mb: Optional[int] = None  # Speicherlimit in MB
+    max_cpu_seconds: Optional[int] = None  # CPU-Zeitlimit in Sekunden
+    profile: bool = False  # Ausführungen profilieren
     
     @validator('script')
     def validate_script(cls, v):
@@ -28,6 +36,12 @@ class HandlerBase(BaseModel):
             raise ValueError("Das Skript darf nicht leer sein")
         return v
     
+    @validator('max_memory_mb', 'max_cpu_seconds')
+    def validate_limits(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Das Limit muss größer als 0 sein")
+        return v
+    
     class Config:
         orm_mode = True
 
@@ -38,6 +52,10 @@ class HandlerUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     script: Optional[str] = None
+    parent_id: Optional[int] = None
+    max_memory_mb: Optional[int] = None
+    max_cpu_seconds: Optional[int] = None
+    profile: Optional[bool] = None
     
     @validator('script')
     def validate_script(cls, v):
@@ -45,6 +63,12 @@ class HandlerUpdate(BaseModel):
             raise ValueError("Das Skript darf nicht leer sein")
         return v
     
+    @validator('max_memory_mb', 'max_cpu_seconds')
+    def validate_limits(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Das Limit muss größer als 0 sein")
+        return v
+    
     class Config:
         orm_mode = True
 
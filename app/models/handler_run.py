@@ -0,0 +1,65 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Column, String, Integer, Float, Boolean, JSON, ForeignKey
+
+from app.models.base import BaseModel as SQLABaseModel
+
+# Enum für die Sortierung von Profilen
+class ProfileSort(str, Enum):
+    CUMULATIVE = "cumulative"  # Zeit einschließlich aufgerufener Funktionen
+    OWN = "own"  # Zeit in der Funktion selbst
+
+# SQLAlchemy-Modell
+class HandlerRun(SQLABaseModel):
+    __tablename__ = "handler_runs"
+    
+    handler_id = Column(Integer, ForeignKey("handlers.id"), index=True, nullable=False)
+    handler_version = Column(Integer, nullable=False)
+    datasource_id = Column(Integer, ForeignKey("datasources.id"), nullable=True)  # Leer bei Ausführungen ohne Datenquelle
+    success = Column(Boolean, nullable=False)
+    error = Column(String, nullable=True)  # Erste Zeile der Fehlermeldung
+    
+    # Verbrauchswerte aus dem Sandbox-Prozess (leer, wenn der Prozess kein Ergebnis geliefert hat)
+    wall_time = Column(Float, nullable=True)  # Laufzeit in Sekunden
+    cpu_user = Column(Float, nullable=True)  # CPU-Zeit im Benutzermodus in Sekunden
+    cpu_system = Column(Float, nullable=True)  # CPU-Zeit im Systemmodus in Sekunden
+    max_rss_kb = Column(Integer, nullable=True)  # Spitzenwert des Speicherverbrauchs in KiB
+    input_bytes = Column(Integer, nullable=True)  # Größe der übertragenen bzw. gelesenen Eingabe
+    output_bytes = Column(Integer, nullable=True)  # Größe des zurückgesendeten Ergebnisses
+    profile = Column(JSON, nullable=True)  # Profil der Ausführung (nur bei profilierten Handlern)
+    cached = Column(Boolean, nullable=False, default=False)  # Ergebnis aus dem Ergebnis-Cache (ohne Verbrauchswerte)
+    
+# Pydantic-Modelle für API-Validierung
+class HandlerRunRead(BaseModel):
+    id: int
+    handler_id: int
+    handler_version: int
+    datasource_id: Optional[int] = None
+    success: bool
+    error: Optional[str] = None
+    wall_time: Optional[float] = None
+    cpu_user: Optional[float] = None
+    cpu_system: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+    input_bytes: Optional[int] = None
+    output_bytes: Optional[int] = None
+    profile: Optional[Dict[str, Any]] = None
+    cached: bool = False
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+class HandlerRunSummary(BaseModel):
+    handler_id: int
+    runs: int
+    failures: int
+    avg_wall_time: Optional[float] = None
+    total_cpu_time: Optional[float] = None  # Summe aus Benutzer- und Systemzeit
+    max_rss_kb: Optional[int] = None
+    total_input_bytes: Optional[int] = None
+    total_output_bytes: Optional[int] = None
+    cache_hits: int = 0  # Aus dem Ergebnis-Cache gelieferte Ergebnisse
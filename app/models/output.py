@@ -6,12 +6,37 @@ from pydantic import BaseModel, validator
 from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 
+from app.config.settings import settings
 from app.models.base import BaseModel as SQLABaseModel
+from app.utils.compression import LEVELS, require_zstandard
 
 # Enum für Ausgabestrategien
 class OutputStrategy(str, Enum):
     OVERWRITE = "overwrite"
     TIMESTAMP = "timestamp"
+    APPEND = "append"  # Fortlaufende Segmente, an die jeder Lauf angehängt wird
+    DELTA = "delta"  # Regelmäßige vollständige Keyframes, dazwischen nur Änderungen
+
+# Enum für die Synchronisierung geschriebener Dateien auf den Datenträger
+class FsyncPolicy(str, Enum):
+    NONE = "none"  # Keine Synchronisierung, Dateien werden nur atomar ersetzt
+    FILE = "file"  # Jede Datei vor dem Ersetzen synchronisieren
+    BATCH = "batch"  # Alle Dateien eines Laufs gemeinsam am Ende synchronisieren
+
+# Enum für die Komprimierung von Ausgabedateien
+class Compression(str, Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+# Enum für die Verzeichnisstruktur zeitgestempelter Dateien
+class OutputLayout(str, Enum):
+    FLAT = "flat"  # name_YYYYmmdd_HHMMSS.ext neben dem Basispfad
+    DATE = "date"  # name/YYYY/MM/DD/name_HHMMSS.ext, ein Verzeichnis je Tag
+
+# Enum für das Ziel, in das eine Ausgabe geschrieben wird
+class OutputSink(str, Enum):
+    LOCAL = "local"  # Dateien unter OUTPUT_DIR
+    S3 = "s3"  # Objekte in einem S3-kompatiblen Objektspeicher (Schlüssel wie der Pfad unter OUTPUT_DIR)
 
 # SQLAlchemy-Modell
 class Output(SQLABaseModel):
@@ -23,6 +48,15 @@ class Output(SQLABaseModel):
     strategy = Column(String, nullable=False, default=OutputStrategy.OVERWRITE)
     retention_days = Column(Integer, nullable=True)  # Aufbewahrungsdauer in Tagen (nur für timestamp-Strategie)
     active = Column(Boolean, nullable=False, default=True)
+    fsync_policy = Column(String, nullable=True)  # Synchronisierung geschriebener Dateien (Standard: OUTPUT_FSYNC_POLICY)
+    compression = Column(String, nullable=True)  # Kompressionsverfahren (leer = unkomprimiert)
+    compression_level = Column(Integer, nullable=True)  # Kompressionsstufe (Standard je Verfahren)
+    layout = Column(String, nullable=False, default=OutputLayout.FLAT)  # Verzeichnisstruktur (nur für timestamp- und append-Strategie)
+    segment_max_mb = Column(Integer, nullable=True)  # Größe, ab der ein neues Segment begonnen wird (Standard: OUTPUT_SEGMENT_MAX_MB)
+    segment_max_minutes = Column(Integer, nullable=True)  # Alter, ab dem ein neues Segment begonnen wird (Standard: OUTPUT_SEGMENT_MAX_MINUTES)
+    keyframe_interval = Column(Integer, nullable=True)  # Läufe je Keyframe bei der delta-Strategie (Standard: OUTPUT_DELTA_KEYFRAME_INTERVAL)
+    sink = Column(String, nullable=False, default=OutputSink.LOCAL)  # Ziel der Ausgabe
+    bucket = Column(String, nullable=True)  # Bucket im Objektspeicher (Standard: S3_BUCKET)
     
 # Pydantic-Modelle für API-Validierung
 class OutputBase(BaseModel):
@@ -32,6 +66,15 @@ class OutputBase(BaseModel):
     strategy: OutputStrategy = OutputStrategy.OVERWRITE
     retention_days: Optional[int] = None
     active: bool = True
+    fsync_policy: Optional[FsyncPolicy] = None
+    compression: Optional[Compression] = None
+    compression_level: Optional[int] = None
+    layout: OutputLayout = OutputLayout.FLAT
+    segment_max_mb: Optional[int] = None
+    segment_max_minutes: Optional[int] = None
+    keyframe_interval: Optional[int] = None
+    sink: OutputSink = OutputSink.LOCAL
+    bucket: Optional[str] = None
     
     @validator('retention_days')
     def validate_retention_days(cls, v, values):
@@ -48,11 +91,54 @@ class OutputBase(BaseModel):
         
         return v
     
+    @validator('compression')
+    def validate_compression(cls, v):
+        if v == Compression.ZSTD:
+            require_zstandard()
+        return v
+    
+    @validator('compression_level')
+    def validate_compression_level(cls, v, values):
+        if v is not None:
+            compression = values.get('compression')
+            if compression is None:
+                raise ValueError("Eine Kompressionsstufe kann nur zusammen mit einem Kompressionsverfahren festgelegt werden")
+            
+            minimum, maximum, _ = LEVELS[Compression(compression).value]
+            if not minimum <= v <= maximum:
+                raise ValueError(f"Die Kompressionsstufe für {Compression(compression).value} muss zwischen {minimum} und {maximum} liegen")
+        
+        return v
+    
+    @validator('layout')
+    def validate_layout(cls, v, values):
+        # Nach Datum aufgeteilt werden nur zeitgestempelte Dateien
+        if v == OutputLayout.DATE and values.get('strategy') == OutputStrategy.OVERWRITE:
+            raise ValueError("Bei der 'overwrite'-Strategie kann keine Aufteilung nach Datum festgelegt werden")
+        return v
+    
+    @validator('segment_max_mb', 'segment_max_minutes', 'keyframe_interval')
+    def validate_segment_limits(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Die Grenzen für Segmente und Keyframes müssen größer als 0 sein")
+        return v
+    
+    @validator('sink')
+    def validate_sink(cls, v, values):
+        # Segmente und Deltas werden nachträglich verändert und sind nur lokal möglich
+        if v == OutputSink.S3 and values.get('strategy') in (OutputStrategy.APPEND, OutputStrategy.DELTA):
+            raise ValueError("Die Strategien 'append' und 'delta' sind nur für lokale Ausgaben möglich")
+        return v
+    
     class Config:
         orm_mode = True
 
 class OutputCreate(OutputBase):
-    pass
+    @validator('bucket', always=True)
+    def validate_bucket(cls, v, values):
+        if values.get('sink') == OutputSink.S3 and not (v or settings.S3_BUCKET):
+            raise ValueError("Für Ausgaben in den Objektspeicher muss ein Bucket festgelegt sein (oder S3_BUCKET)")
+        return v
 
 class OutputUpdate(BaseModel):
     name: Optional[str] = None
@@ -61,6 +147,15 @@ class OutputUpdate(BaseModel):
     strategy: Optional[OutputStrategy] = None
     retention_days: Optional[int] = None
     active: Optional[bool] = None
+    fsync_policy: Optional[FsyncPolicy] = None
+    compression: Optional[Compression] = None
+    compression_level: Optional[int] = None
+    layout: Optional[OutputLayout] = None
+    segment_max_mb: Optional[int] = None
+    segment_max_minutes: Optional[int] = None
+    keyframe_interval: Optional[int] = None
+    sink: Optional[OutputSink] = None
+    bucket: Optional[str] = None
     
     @validator('retention_days')
     def validate_retention_days(cls, v, values):
@@ -77,6 +172,50 @@ class OutputUpdate(BaseModel):
         
         return v
     
+    @validator('compression')
+    def validate_compression(cls, v):
+        if v == Compression.ZSTD:
+            require_zstandard()
+        return v
+    
+    @validator('compression_level')
+    def validate_compression_level(cls, v, values):
+        if v is not None:
+            # Ohne Verfahren in der Aktualisierung gilt der größte Bereich aller Verfahren
+            compression = values.get('compression')
+            if compression is None:
+                minimum = min(level[0] for level in LEVELS.values())
+                maximum = max(level[1] for level in LEVELS.values())
+                if not minimum <= v <= maximum:
+                    raise ValueError(f"Die Kompressionsstufe muss zwischen {minimum} und {maximum} liegen")
+                return v
+            
+            minimum, maximum, _ = LEVELS[Compression(compression).value]
+            if not minimum <= v <= maximum:
+                raise ValueError(f"Die Kompressionsstufe für {Compression(compression).value} muss zwischen {minimum} und {maximum} liegen")
+        
+        return v
+    
+    @validator('layout')
+    def validate_layout(cls, v, values):
+        # Nach Datum aufgeteilt werden nur zeitgestempelte Dateien
+        if v == OutputLayout.DATE and values.get('strategy') == OutputStrategy.OVERWRITE:
+            raise ValueError("Bei der 'overwrite'-Strategie kann keine Aufteilung nach Datum festgelegt werden")
+        return v
+    
+    @validator('segment_max_mb', 'segment_max_minutes', 'keyframe_interval')
+    def validate_segment_limits(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Die Grenzen für Segmente und Keyframes müssen größer als 0 sein")
+        return v
+    
+    @validator('sink')
+    def validate_sink(cls, v, values):
+        # Segmente und Deltas werden nachträglich verändert und sind nur lokal möglich
+        if v == OutputSink.S3 and values.get('strategy') in (OutputStrategy.APPEND, OutputStrategy.DELTA):
+            raise ValueError("Die Strategien 'append' und 'delta' sind nur für lokale Ausgaben möglich")
+        return v
+    
     class Config:
         orm_mode = True
 
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
+
+from app.models.base import BaseModel as SQLABaseModel
+
+# SQLAlchemy-Modell für den Index aller geschriebenen Ausgabedateien; die Bereinigung fragt
+# abgelaufene Dateien über (output_id, created_at) ab, statt die Verzeichnisse zu durchsuchen
+class OutputFile(SQLABaseModel):
+    __tablename__ = "output_files"
+    __table_args__ = (
+        Index("ix_output_files_output_id_created_at", "output_id", "created_at"),
+    )
+    
+    output_id = Column(Integer, ForeignKey("outputs.id"), nullable=False)
+    path = Column(String, unique=True, nullable=False)  # Pfad relativ zu OUTPUT_DIR
+    size = Column(Integer, nullable=False)  # Größe der Datei in Bytes
+    digest = Column(String, nullable=True)  # SHA-256 des Inhalts (nur bei deduplizierten Ausgaben)
+    base_id = Column(Integer, ForeignKey("output_files.id"), index=True, nullable=True)  # Keyframe eines Deltas
+
+# Pydantic-Modelle für API-Validierung
+class OutputFileRead(BaseModel):
+    id: int
+    output_id: int
+    path: str
+    size: int
+    digest: Optional[str] = None
+    base_id: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
@@ -0,0 +1,5 @@
+"""
+Code, der innerhalb der Sandbox-Prozesse ausgeführt wird.
+Die Module dieses Pakets verwenden ausschließlich die Standardbibliothek, damit die
+Sandbox-Worker schnell starten und keine Anwendungsmodule laden.
+"""
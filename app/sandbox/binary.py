@@ -0,0 +1,198 @@
+"""
+Kompakte Binärkodierung für Ergebnisse von Datenhandlern.
+Unterstützt im Gegensatz zu JSON auch Bytes, beliebig große Ganzzahlen und Dicts mit
+nicht-textuellen Schlüsseln. Es werden ausschließlich Daten und niemals Code dekodiert,
+sodass Ausgaben aus der Sandbox gefahrlos gelesen werden können.
+
+Jeder Wert besteht aus einem Typ-Byte, gefolgt vom Inhalt; Längen werden als Varint kodiert.
+"""
+
+import struct
+from typing import Any, Iterator, Tuple
+
+# Typ-Bytes
+TAG_NONE = 0x4E  # N
+TAG_TRUE = 0x54  # T
+TAG_FALSE = 0x46  # F
+TAG_INT = 0x69  # i: Länge + vorzeichenbehaftete Big-Endian-Bytes
+TAG_FLOAT = 0x64  # d: 8 Byte IEEE 754
+TAG_STR = 0x73  # s: Länge + UTF-8
+TAG_BYTES = 0x62  # b: Länge + Bytes
+TAG_LIST = 0x6C  # l: Anzahl + Elemente
+TAG_DICT = 0x6D  # m: Anzahl + Schlüssel/Wert-Paare
+
+_FLOAT = struct.Struct(">d")
+
+
+class BinaryEncodingError(ValueError):
+    """
+    Wird ausgelöst, wenn ein Wert nicht kodiert oder dekodiert werden kann.
+    """
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise BinaryEncodingError("Unerwartetes Ende der Daten")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _encode(buffer: bytearray, value: Any):
+    if value is None:
+        buffer.append(TAG_NONE)
+    elif value is True:
+        buffer.append(TAG_TRUE)
+    elif value is False:
+        buffer.append(TAG_FALSE)
+    elif isinstance(value, int):
+        body = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+        buffer.append(TAG_INT)
+        _write_varint(buffer, len(body))
+        buffer += body
+    elif isinstance(value, float):
+        buffer.append(TAG_FLOAT)
+        buffer += _FLOAT.pack(value)
+    elif isinstance(value, str):
+        body = value.encode("utf-8")
+        buffer.append(TAG_STR)
+        _write_varint(buffer, len(body))
+        buffer += body
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        body = memoryview(value).cast("B")
+        buffer.append(TAG_BYTES)
+        _write_varint(buffer, body.nbytes)
+        buffer += body
+    elif isinstance(value, (list, tuple)):
+        buffer.append(TAG_LIST)
+        _write_varint(buffer, len(value))
+        for item in value:
+            _encode(buffer, item)
+    elif isinstance(value, dict):
+        buffer.append(TAG_DICT)
+        _write_varint(buffer, len(value))
+        for key, item in value.items():
+            _encode(buffer, key)
+            _encode(buffer, item)
+    else:
+        raise BinaryEncodingError(f"Typ {type(value).__name__} kann nicht kodiert werden")
+
+
+def _freeze(value: Any) -> Any:
+    # Listen werden als Tupel dekodiert, wenn sie als Dict-Schlüssel dienen
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _decode(data: memoryview, offset: int) -> Tuple[Any, int]:
+    if offset >= len(data):
+        raise BinaryEncodingError("Unerwartetes Ende der Daten")
+    tag = data[offset]
+    offset += 1
+
+    if tag == TAG_NONE:
+        return None, offset
+    if tag == TAG_TRUE:
+        return True, offset
+    if tag == TAG_FALSE:
+        return False, offset
+    if tag == TAG_FLOAT:
+        if offset + _FLOAT.size > len(data):
+            raise BinaryEncodingError("Unerwartetes Ende der Daten")
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+    if tag in (TAG_INT, TAG_STR, TAG_BYTES):
+        length, offset = _read_varint(data, offset)
+        end = offset + length
+        if end > len(data):
+            raise BinaryEncodingError("Unerwartetes Ende der Daten")
+        body = data[offset:end]
+        if tag == TAG_INT:
+            return int.from_bytes(body, "big", signed=True), end
+        if tag == TAG_STR:
+            return str(body, "utf-8"), end
+        return bytes(body), end
+    if tag == TAG_LIST:
+        count, offset = _read_varint(data, offset)
+        items = []
+        for _ in range(count):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == TAG_DICT:
+        count, offset = _read_varint(data, offset)
+        result = {}
+        for _ in range(count):
+            key, offset = _decode(data, offset)
+            item, offset = _decode(data, offset)
+            result[_freeze(key)] = item
+        return result, offset
+    raise BinaryEncodingError(f"Unbekanntes Typ-Byte: {tag:#x}")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Kodiert einen Wert in das Binärformat.
+
+    Args:
+        value: Der zu kodierende Wert
+
+    Returns:
+        Die kodierten Daten
+
+    Raises:
+        BinaryEncodingError: Wenn der Wert nicht unterstützte Typen enthält
+    """
+    buffer = bytearray()
+    _encode(buffer, value)
+    return bytes(buffer)
+
+
+def loads(data: bytes) -> Any:
+    """
+    Dekodiert einen mit dumps() kodierten Wert.
+
+    Args:
+        data: Die kodierten Daten
+
+    Returns:
+        Der dekodierte Wert
+
+    Raises:
+        BinaryEncodingError: Wenn die Daten ungültig sind
+    """
+    view = memoryview(data)
+    value, offset = _decode(view, 0)
+    if offset != len(view):
+        raise BinaryEncodingError("Überzählige Daten nach dem Wert")
+    return value
+
+
+def iter_loads(data: bytes) -> Iterator[Any]:
+    """
+    Dekodiert eine Folge aneinandergereihter, mit dumps() kodierter Werte.
+
+    Args:
+        data: Die kodierten Daten
+
+    Returns:
+        Iterator über die dekodierten Werte
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        value, offset = _decode(view, offset)
+        yield value
@@ -0,0 +1,343 @@
+"""
+Rahmenprotokoll für die Kommunikation mit Sandbox-Prozessen.
+Jede Nachricht besteht aus einem Kopf (Art des Inhalts, Länge) und dem Inhalt selbst.
+Das Modul verwendet ausschließlich die Standardbibliothek, da es auch im Sandbox-Prozess geladen wird.
+"""
+
+import json
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from app.sandbox import binary
+
+# Kopf eines Rahmens: Art (1 Byte) und Länge des Inhalts (8 Byte, Big Endian)
+FRAME_HEADER = struct.Struct(">cQ")
+
+# Arten von Rahmeninhalten
+KIND_JSON = b"J"
+KIND_TEXT = b"T"
+KIND_CODE = b"M"  # Mit marshal serialisierter Code
+KIND_BYTES = b"B"  # Unveränderte Bytes
+KIND_BINARY = b"P"  # Kompakte Binärkodierung (app.sandbox.binary)
+
+# Rahmenarten für Teilergebnisse gestreamter Handler (Kleinbuchstaben der jeweiligen Art)
+CHUNK_KINDS = {KIND_TEXT: b"t", KIND_JSON: b"j", KIND_BYTES: b"b", KIND_BINARY: b"p"}
+_CHUNK_VALUE_KINDS = {chunk_kind: kind for kind, chunk_kind in CHUNK_KINDS.items()}
+
+# Kodierungen für Ergebnisse, die weder Text noch Bytes sind
+RESULT_ENCODINGS = ("json", "binary")
+
+
+class ProtocolError(Exception):
+    """
+    Wird ausgelöst, wenn ein Rahmen nicht gelesen werden kann.
+    """
+
+
+def pack_frame(kind: bytes, body: bytes) -> bytes:
+    """
+    Erzeugt den Kopf eines Rahmens für einen Inhalt.
+
+    Args:
+        kind: Art des Inhalts
+        body: Der Inhalt
+
+    Returns:
+        Der gepackte Rahmenkopf
+    """
+    return FRAME_HEADER.pack(kind, memoryview(body).nbytes)
+
+
+def write_frame(stream: BinaryIO, kind: bytes, body: bytes, flush: bool = True):
+    """
+    Schreibt einen Rahmen in einen Stream.
+
+    Args:
+        stream: Der Ziel-Stream
+        kind: Art des Inhalts
+        body: Der Inhalt
+        flush: Ob der Stream anschließend geleert werden soll
+    """
+    stream.write(pack_frame(kind, body))
+    stream.write(body)
+    if flush:
+        stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Liest einen Rahmen aus einem Stream.
+
+    Args:
+        stream: Der Quell-Stream
+
+    Returns:
+        Tuple mit (Art, Inhalt) oder None, wenn der Stream beendet ist
+    """
+    header = stream.read(FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) < FRAME_HEADER.size:
+        raise ProtocolError("Unvollständiger Rahmenkopf")
+
+    kind, length = FRAME_HEADER.unpack(header)
+    body = stream.read(length)
+    if len(body) < length:
+        raise ProtocolError("Unvollständiger Rahmeninhalt")
+    return kind, body
+
+
+def write_message(stream: BinaryIO, message: Any):
+    """
+    Schreibt eine JSON-Nachricht als Rahmen.
+
+    Args:
+        stream: Der Ziel-Stream
+        message: Die zu serialisierende Nachricht
+    """
+    write_frame(stream, KIND_JSON, json.dumps(message).encode("utf-8"))
+
+
+def read_message(stream: BinaryIO) -> Optional[Any]:
+    """
+    Liest eine JSON-Nachricht aus einem Rahmen.
+
+    Args:
+        stream: Der Quell-Stream
+
+    Returns:
+        Die deserialisierte Nachricht oder None, wenn der Stream beendet ist
+    """
+    frame = read_frame(stream)
+    if frame is None:
+        return None
+
+    kind, body = frame
+    if kind != KIND_JSON:
+        raise ProtocolError(f"Unerwartete Rahmenart: {kind!r}")
+    return json.loads(body)
+
+
+def encode_value(value: Any, encoding: str = "json") -> Tuple[bytes, bytes]:
+    """
+    Kodiert einen Wert für die Übertragung.
+    Texte werden unverändert als UTF-8 und Bytes ohne weitere Kodierung übertragen,
+    alle anderen Werte als JSON oder in der kompakten Binärkodierung. Werte, die nicht
+    als JSON darstellbar sind (z.B. verschachtelte Bytes), werden binär kodiert.
+
+    Args:
+        value: Der zu kodierende Wert
+        encoding: Kodierung für strukturierte Werte ("json" oder "binary")
+
+    Returns:
+        Tuple mit (Art, Inhalt)
+    """
+    if isinstance(value, str):
+        return KIND_TEXT, value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return KIND_BYTES, memoryview(value).cast("B")
+    if encoding == "json":
+        try:
+            return KIND_JSON, json.dumps(value).encode("utf-8")
+        except (TypeError, ValueError):
+            pass
+    return KIND_BINARY, binary.dumps(value)
+
+
+def decode_value(kind: bytes, body: bytes) -> Any:
+    """
+    Dekodiert einen mit encode_value() kodierten Wert.
+
+    Args:
+        kind: Art des Inhalts
+        body: Der Inhalt
+
+    Returns:
+        Der dekodierte Wert
+    """
+    if kind == KIND_TEXT:
+        return body.decode("utf-8")
+    if kind == KIND_JSON:
+        return json.loads(body)
+    if kind == KIND_BYTES:
+        return body
+    if kind == KIND_BINARY:
+        return binary.loads(body)
+    raise ProtocolError(f"Unbekannte Rahmenart: {kind!r}")
+
+
+def is_chunk(kind: bytes) -> bool:
+    """
+    Prüft, ob ein Rahmen ein Teilergebnis eines gestreamten Handlers enthält.
+
+    Args:
+        kind: Art des Rahmens
+
+    Returns:
+        True, wenn der Rahmen ein Teilergebnis ist
+    """
+    return kind in _CHUNK_VALUE_KINDS
+
+
+def write_chunk(stream: BinaryIO, value: Any, encoding: str = "json"):
+    """
+    Schreibt ein Teilergebnis eines gestreamten Handlers.
+    Der Stream wird nicht geleert, sodass kleine Teilergebnisse gebündelt übertragen werden;
+    das abschließende write_result() leert ihn.
+
+    Args:
+        stream: Der Ziel-Stream
+        value: Das Teilergebnis
+        encoding: Kodierung für strukturierte Werte ("json" oder "binary")
+    """
+    kind, body = encode_value(value, encoding)
+    write_frame(stream, CHUNK_KINDS[kind], body, flush=False)
+
+
+def decode_chunk(kind: bytes, body: bytes) -> Any:
+    """
+    Dekodiert ein mit write_chunk() geschriebenes Teilergebnis.
+
+    Args:
+        kind: Art des Rahmens
+        body: Der Inhalt
+
+    Returns:
+        Das dekodierte Teilergebnis
+    """
+    return decode_value(_CHUNK_VALUE_KINDS[kind], body)
+
+
+def write_result(stream: BinaryIO, result: Dict[str, Any], encoding: str = "json"):
+    """
+    Schreibt ein Ergebnis als Folge von Rahmen: Ergebniskopf (JSON, alle Felder außer data)
+    und die mit encode_value() kodierten Daten. Enthält das Ergebnis Verbrauchswerte unter usage,
+    wird die Größe des Datenrahmens zu usage["output_bytes"] addiert.
+
+    Args:
+        stream: Der Ziel-Stream
+        result: Das Ergebnis mit success, data und error
+        encoding: Kodierung für strukturierte Daten ("json" oder "binary")
+
+    Raises:
+        binary.BinaryEncodingError: Wenn die Daten nicht kodiert werden können
+    """
+    kind, body = encode_value(result.get("data"), encoding)
+    header = {key: value for key, value in result.items() if key != "data"}
+    if header.get("usage"):
+        output_bytes = header["usage"].get("output_bytes", 0) + FRAME_HEADER.size + memoryview(body).nbytes
+        header["usage"] = dict(header["usage"], output_bytes=output_bytes)
+    write_message(stream, header)
+    write_frame(stream, kind, body)
+
+
+def read_result(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """
+    Liest ein mit write_result() geschriebenes Ergebnis.
+    Vorangehende Teilergebnisse eines gestreamten Handlers werden als Liste in data zusammengefasst.
+
+    Args:
+        stream: Der Quell-Stream
+
+    Returns:
+        Das Ergebnis mit success, data und error oder None, wenn der Stream beendet ist
+    """
+    chunks = []
+    while True:
+        frame = read_frame(stream)
+        if frame is None:
+            return None
+        if not is_chunk(frame[0]):
+            break
+        chunks.append(decode_chunk(*frame))
+
+    kind, body = frame
+    if kind != KIND_JSON:
+        raise ProtocolError(f"Unerwartete Rahmenart: {kind!r}")
+    result = json.loads(body)
+
+    frame = read_frame(stream)
+    if frame is None:
+        raise ProtocolError("Daten des Ergebnisses fehlen")
+    result["data"] = chunks if result.get("streamed") else decode_value(*frame)
+    return result
+
+
+def encode_job(job: Dict[str, Any], input_data: Any, code: Optional[bytes] = None) -> bytes:
+    """
+    Kodiert einen Auftrag als Folge von Rahmen: Auftragskopf (JSON), optional
+    kompilierter Code und Eingabedaten.
+
+    Args:
+        job: Der Auftragskopf (Skript und Optionen)
+        input_data: Die Eingabedaten
+        code: Der mit marshal serialisierte Code des Skripts
+
+    Returns:
+        Die kodierten Rahmen
+    """
+    return _encode_frames(dict(job, has_code=code is not None), [code], input_data)
+
+
+def encode_batch_job(job: Dict[str, Any], input_data: Any, codes: List[Optional[bytes]]) -> bytes:
+    """
+    Kodiert einen Sammelauftrag, der mehrere Skripte nacheinander auf dieselben Eingabedaten anwendet.
+    Die Skripte stehen als Liste unter "handlers" im Auftragskopf; die Eingabedaten werden nur einmal übertragen.
+
+    Args:
+        job: Der Auftragskopf mit der Liste der Skripte unter "handlers"
+        input_data: Die Eingabedaten
+        codes: Der mit marshal serialisierte Code je Skript (oder None)
+
+    Returns:
+        Die kodierten Rahmen
+    """
+    handlers = [dict(entry, has_code=code is not None) for entry, code in zip(job["handlers"], codes)]
+    return _encode_frames(dict(job, handlers=handlers), codes, input_data)
+
+
+def _encode_frames(header: Dict[str, Any], codes: List[Optional[bytes]], input_data: Any) -> bytes:
+    body = json.dumps(header).encode("utf-8")
+    frames = [pack_frame(KIND_JSON, body), body]
+    for code in codes:
+        if code is not None:
+            frames += [pack_frame(KIND_CODE, code), code]
+    kind, body = encode_value(input_data)
+    frames += [pack_frame(kind, body), body]
+    return b"".join(frames)
+
+
+def _read_code(stream: BinaryIO) -> bytes:
+    frame = read_frame(stream)
+    if frame is None or frame[0] != KIND_CODE:
+        raise ProtocolError("Code des Auftrags fehlt")
+    return frame[1]
+
+
+def read_job(stream: BinaryIO) -> Optional[Tuple[Dict[str, Any], Any, Optional[bytes]]]:
+    """
+    Liest einen mit encode_job() oder encode_batch_job() kodierten Auftrag.
+    Bei Sammelaufträgen wird der Code jedes Skripts unter "code" in dessen Eintrag abgelegt.
+    Die Größe der übertragenen Eingabedaten in Bytes steht unter "input_size" im Auftragskopf.
+
+    Args:
+        stream: Der Quell-Stream
+
+    Returns:
+        Tuple mit (Auftragskopf, Eingabedaten, Code) oder None, wenn der Stream beendet ist
+    """
+    job = read_message(stream)
+    if job is None:
+        return None
+
+    code = None
+    if job.get("has_code"):
+        code = _read_code(stream)
+    for entry in job.get("handlers") or ():
+        entry["code"] = _read_code(stream) if entry.get("has_code") else None
+
+    frame = read_frame(stream)
+    if frame is None:
+        raise ProtocolError("Eingabedaten des Auftrags fehlen")
+    job["input_size"] = len(frame[1])
+    return job, decode_value(*frame), code
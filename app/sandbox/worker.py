@@ -0,0 +1,639 @@
+"""
+Sandbox-Worker für die Ausführung von Datenhandler-Skripten.
+Läuft als eigener Prozess, hält den Interpreter warm und führt nacheinander Aufträge aus,
+die ihm über stdin als Rahmen gesendet werden. Jeder Auftrag läuft in einem eigenen, vom
+Worker abgespaltenen Kindprozess, der Interpreter, importierte Module und geladenen Code
+erbt; was ein Skript am Zustand des Interpreters ändert, endet mit dem Kindprozess.
+Die Ergebnisse werden über einen eigenen Ergebniskanal (--result-fd) zurückgegeben, sodass
+Ausgaben des Benutzerskripts auf stdout/stderr die Ergebnisse nicht verfälschen können. Ohne
+--result-fd dient der ursprüngliche stdout-Deskriptor als Ergebniskanal und Ausgaben landen
+auf stderr.
+
+Für Einzelausführungen liest der Worker einen Auftrag, beantwortet ihn und beendet sich,
+sobald stdin geschlossen wird.
+
+Start: python -u -m app.sandbox.worker [--result-fd FD]
+"""
+
+import argparse
+import cProfile
+import csv
+import io
+import json
+import marshal
+import os
+import pstats
+import resource
+import signal
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.sandbox.binary import BinaryEncodingError
+from app.sandbox.protocol import read_job, write_chunk, write_result
+
+
+# Eingabeformate für gestreamte Handler (STREAM_FORMAT im Skript)
+STREAM_FORMATS = ("lines", "ndjson", "csv", "chunks")
+STREAM_CHUNK_SIZE = 64 * 1024  # Zeichen pro Block im Format "chunks"
+
+# Sortierungen für Profile: Gesamtzeit einschließlich aufgerufener Funktionen bzw. eigene Zeit
+PROFILE_SORTS = {"cumulative": 3, "own": 2}
+
+# Bereits geladener Code, indiziert nach Inhaltsschlüssel (lebt so lange wie der Worker)
+_code_cache: Dict[str, CodeType] = {}
+
+
+def _default_process_data(data):
+    return data
+
+
+class CPULimitExceeded(Exception):
+    """
+    Wird ausgelöst, wenn ein Skript sein CPU-Zeitlimit überschreitet (SIGXCPU).
+    """
+
+
+def _raise_cpu_limit(signum, frame):
+    raise CPULimitExceeded("CPU-Zeitlimit des Handlers überschritten")
+
+
+@contextmanager
+def resource_limits(job: Dict[str, Any]):
+    """
+    Begrenzt Adressraum (RLIMIT_AS) und CPU-Zeit (RLIMIT_CPU) des Prozesses für die Dauer eines Auftrags.
+    Es werden nur die weichen Limits gesetzt und anschließend wiederhergestellt, sodass im selben
+    Prozess weitere Skripte (z.B. eines Sammelauftrags) mit eigenen Limits laufen können. Das
+    Speicherlimit gilt für den gesamten Adressraum einschließlich des Interpreters.
+
+    Args:
+        job: Der Auftragskopf mit max_memory_mb und max_cpu_seconds (jeweils optional)
+    """
+    restore = []
+    try:
+        max_memory_mb = job.get("max_memory_mb")
+        if max_memory_mb:
+            soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+            limit = max_memory_mb * 1024 * 1024
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+            restore.append((resource.RLIMIT_AS, soft, hard))
+
+        max_cpu_seconds = job.get("max_cpu_seconds")
+        if max_cpu_seconds:
+            # RLIMIT_CPU zählt die gesamte CPU-Zeit des Prozesses, daher relativ zum bisherigen Verbrauch
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            limit = int(usage.ru_utime + usage.ru_stime) + 1 + max_cpu_seconds
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            # Das Limit wird vor dem Signal-Handler zurückgesetzt, damit kein weiteres SIGXCPU den Worker beendet
+            restore.append((signal.SIGXCPU, signal.signal(signal.SIGXCPU, _raise_cpu_limit)))
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+            restore.append((resource.RLIMIT_CPU, soft, hard))
+
+        yield
+    finally:
+        for entry in reversed(restore):
+            if len(entry) == 2:
+                signal.signal(*entry)
+            else:
+                resource.setrlimit(entry[0], entry[1:])
+
+
+def summarize_profile(profiler: cProfile.Profile, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fasst ein Profil zu den Funktionen mit dem höchsten Zeitverbrauch zusammen.
+
+    Args:
+        profiler: Der Profiler nach der Ausführung
+        options: Optionen des Auftrags mit top (Anzahl der Funktionen) und sort ("cumulative" oder "own")
+
+    Returns:
+        Dict mit total_time, sort und functions (je Funktion Name, Datei, Zeile, Aufrufe,
+        eigene und kumulierte Zeit in Sekunden)
+    """
+    sort = options.get("sort") if options.get("sort") in PROFILE_SORTS else "cumulative"
+    stats = pstats.Stats(profiler).stats
+    entries = sorted(stats.items(), key=lambda item: item[1][PROFILE_SORTS[sort]], reverse=True)
+
+    functions: List[Dict[str, Any]] = []
+    for (filename, line, name), (primitive_calls, calls, own_time, cumulative_time, _) in entries:
+        if name == "<method 'disable' of '_lsprof.Profiler' objects>":
+            continue
+        functions.append({
+            "function": name,
+            "file": filename,
+            "line": line,
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "own_time": round(own_time, 6),
+            "cumulative_time": round(cumulative_time, 6),
+        })
+        if len(functions) >= (options.get("top") or 20):
+            break
+
+    return {
+        "total_time": round(sum(entry[2] for entry in stats.values()), 6),
+        "sort": sort,
+        "functions": functions,
+    }
+
+
+def _reset_peak_rss():
+    # Setzt den Spitzenwert des Speicherverbrauchs (VmHWM) auf den aktuellen Wert zurück (nur Linux)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> int:
+    # Spitzenwert seit _reset_peak_rss(); ohne /proc der Spitzenwert seit Start des Workers
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_job(
+    job: Dict[str, Any],
+    input_data: Any,
+    code: Optional[bytes] = None,
+    emit: Optional[Callable[[Any], None]] = None,
+    input_cache: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Führt einen Auftrag mit run_job() aus und ergänzt das Ergebnis um Verbrauchswerte unter usage:
+    Laufzeit (wall_time), CPU-Zeit im Benutzer- und Systemmodus (cpu_user, cpu_system),
+    Spitzenwert des Speicherverbrauchs in KiB (max_rss_kb) und Größe der Eingabe (input_bytes).
+    Die Größe der zurückgesendeten Daten (output_bytes) wird beim Senden ergänzt.
+
+    Args:
+        job: Der Auftragskopf
+        input_data: Die Eingabedaten
+        code: Der mit marshal serialisierte Code des Skripts
+        emit: Funktion, die Teilergebnisse gestreamter Handler entgegennimmt
+        input_cache: Zwischenspeicher für den Inhalt der Eingabedatei
+
+    Returns:
+        Das Ergebnis von run_job() mit usage
+    """
+    input_bytes = job.get("input_size")
+    if job.get("input_path") is not None:
+        try:
+            input_bytes = os.path.getsize(job["input_path"])
+        except OSError:
+            input_bytes = None
+
+    _reset_peak_rss()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+
+    result = run_job(job, input_data, code, emit, input_cache)
+
+    wall_time = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    result["usage"] = {
+        "wall_time": round(wall_time, 6),
+        "cpu_user": round(after.ru_utime - before.ru_utime, 6),
+        "cpu_system": round(after.ru_stime - before.ru_stime, 6),
+        "max_rss_kb": _peak_rss_kb(),
+        "input_bytes": input_bytes,
+        "output_bytes": 0,
+    }
+    return result
+
+
+def load_code(job: Dict[str, Any], code: Optional[bytes]) -> CodeType:
+    """
+    Lädt den Code eines Auftrags aus dem Cache, aus dem mitgesendeten marshal-Blob
+    oder kompiliert ihn aus dem Quelltext.
+
+    Args:
+        job: Der Auftragskopf
+        code: Der mit marshal serialisierte Code oder None
+
+    Returns:
+        Das ausführbare Code-Objekt
+    """
+    code_key = job.get("code_key")
+    if code_key in _code_cache:
+        return _code_cache[code_key]
+
+    if code is not None:
+        code_object = marshal.loads(code)
+    else:
+        code_object = compile(job["script"], "<handler>", "exec")
+
+    if code_key:
+        _code_cache[code_key] = code_object
+    return code_object
+
+
+def preload_code(job: Dict[str, Any], code: Optional[bytes]):
+    """
+    Lädt den Code eines Auftrags im Worker selbst in den Cache, bevor der Kindprozess für den
+    Auftrag abgespalten wird. So erben ihn auch alle folgenden Kindprozesse, und der Pool muss
+    ihn nicht erneut übertragen. Es wird nur Code mit Inhaltsschlüssel geladen, nicht ausgeführt.
+
+    Args:
+        job: Der Auftragskopf (bei Sammelaufträgen mit der Liste der Skripte unter "handlers")
+        code: Der mit marshal serialisierte Code des Skripts oder None
+    """
+    entries = job["handlers"] if "handlers" in job else [dict(job, code=code)]
+    for entry in entries:
+        if entry.get("code_key") is None:
+            continue
+        try:
+            load_code(entry, entry.get("code"))
+        except Exception:
+            # Fehler beim Laden werden bei der Ausführung im Kindprozess gemeldet
+            pass
+
+
+def iter_records(source: io.TextIOBase, stream_format: str) -> Iterator[Any]:
+    """
+    Liest die Eingabe eines gestreamten Handlers satzweise.
+
+    Args:
+        source: Die Eingabe als Textstream
+        stream_format: Format der Eingabe (lines, ndjson, csv oder chunks)
+
+    Returns:
+        Iterator über die Datensätze bzw. Blöcke
+    """
+    if stream_format == "lines":
+        return (line.rstrip("\r\n") for line in source)
+    if stream_format == "ndjson":
+        return (json.loads(line) for line in source if line.strip())
+    if stream_format == "csv":
+        return csv.DictReader(source)
+    if stream_format == "chunks":
+        return iter(lambda: source.read(STREAM_CHUNK_SIZE), "")
+    raise ValueError(f"Unbekanntes STREAM_FORMAT: {stream_format!r} (erlaubt: {', '.join(STREAM_FORMATS)})")
+
+
+def _read_input(job: Dict[str, Any], input_cache: Optional[Dict[str, str]]) -> str:
+    # Der Inhalt wird von allen Skripten eines Sammelauftrags geteilt und nur einmal gelesen
+    if input_cache is not None and "text" in input_cache:
+        return input_cache["text"]
+    with open(job["input_path"], "r", encoding=job.get("input_encoding") or "utf-8", errors="replace") as f:
+        text = f.read()
+    if input_cache is not None:
+        input_cache["text"] = text
+    return text
+
+
+def _open_input(job: Dict[str, Any], input_data: Any) -> io.TextIOBase:
+    input_path = job.get("input_path")
+    if input_path is not None:
+        return open(input_path, "r", encoding=job.get("input_encoding") or "utf-8", errors="replace", newline="")
+    if isinstance(input_data, str):
+        return io.StringIO(input_data, newline="")
+    raise ValueError("Gestreamte Handler benötigen Text als Eingabe")
+
+
+def run_job(
+    job: Dict[str, Any],
+    input_data: Any,
+    code: Optional[bytes] = None,
+    emit: Optional[Callable[[Any], None]] = None,
+    input_cache: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Führt einen einzelnen Auftrag in einem frischen Namespace aus.
+
+    Definiert das Skript eine Generatorfunktion process_stream(records), wird die Eingabe
+    satzweise übergeben (Format über STREAM_FORMAT im Skript, Standard "lines") und jedes
+    erzeugte Teilergebnis sofort über emit() weitergereicht. Andernfalls wird process_data()
+    einmal mit der gesamten Eingabe aufgerufen. Eine Eingabedatei (input_path) wird erst nach
+    der Ausführung des Skripts gelesen; auf Modulebene ist input_data dann noch None.
+
+    Enthält der Auftrag "profile" ({"top": N, "sort": ...}), läuft das Skript unter cProfile
+    und das Ergebnis enthält unter profile die N Funktionen mit dem höchsten Zeitverbrauch.
+
+    Args:
+        job: Der Auftragskopf mit Skript und Optionen
+        input_data: Die Eingabedaten
+        code: Der mit marshal serialisierte Code des Skripts
+        emit: Funktion, die Teilergebnisse gestreamter Handler entgegennimmt
+        input_cache: Zwischenspeicher für den Inhalt der Eingabedatei, der von den
+            Skripten eines Sammelauftrags geteilt wird
+
+    Returns:
+        Dict mit success, data und error (bei gestreamten Handlern zusätzlich streamed und chunks)
+    """
+    output = {"success": False, "data": None, "error": None}
+    profiler = cProfile.Profile() if job.get("profile") else None
+
+    try:
+        code_object = load_code(job, code)
+
+        with resource_limits(job):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                # Führe das Skript in einem begrenzten Namespace aus
+                namespace = {"__name__": "__main__", "input_data": input_data, "process_data": _default_process_data}
+                exec(code_object, namespace)
+
+                # Erst nach der Ausführung steht fest, ob das Skript process_stream() definiert;
+                # gestreamte Handler lesen eine Eingabedatei selbst satzweise, alle anderen erhalten sie vollständig
+                streaming = callable(namespace.get("process_stream"))
+                if job.get("input_path") is not None and not streaming:
+                    input_data = _read_input(job, input_cache)
+                    namespace["input_data"] = input_data
+
+                if streaming:
+                    # Ohne Ergebniskanal werden die Teilergebnisse gesammelt und gemeinsam zurückgegeben
+                    chunks = []
+                    sink = emit or chunks.append
+                    count = 0
+                    if isinstance(input_data, (list, tuple)):
+                        records = iter(input_data)
+                        source = None
+                    else:
+                        source = _open_input(job, input_data)
+                        records = iter_records(source, namespace.get("STREAM_FORMAT", "lines"))
+                    try:
+                        for chunk in namespace["process_stream"](records):
+                            sink(chunk)
+                            count += 1
+                    finally:
+                        if source is not None:
+                            source.close()
+                    output.update(success=True, streamed=emit is not None, chunks=count, data=None if emit else chunks)
+                # Überprüfe, ob das Skript eine process_data Funktion definiert hat
+                elif "process_data" in namespace and callable(namespace["process_data"]):
+                    output["data"] = namespace["process_data"](input_data)
+                    output["success"] = True
+                else:
+                    output["error"] = "Das Skript definiert keine process_data Funktion."
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    except Exception as e:
+        output["error"] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+
+    if profiler is not None:
+        output["profile"] = summarize_profile(profiler, job["profile"])
+
+    return output
+
+
+def open_result_channel(result_fd: Optional[int]):
+    """
+    Öffnet den Ergebniskanal des Workers.
+
+    Args:
+        result_fd: Vom Elternprozess übergebener Dateideskriptor oder None
+
+    Returns:
+        Der binäre Stream für die Ergebnisse
+    """
+    if result_fd is not None:
+        return os.fdopen(result_fd, "wb")
+
+    # Ergebniskanal von stdout trennen, damit print() im Benutzerskript die Antworten nicht verfälscht
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return protocol_out
+
+
+def main():
+    """
+    Hauptschleife des Workers: Aufträge lesen, ausführen und Ergebnisse zurücksenden.
+    """
+    parser = argparse.ArgumentParser(description="Sandbox-Worker für Datenhandler")
+    parser.add_argument("--result-fd", type=int, default=None, help="Dateideskriptor für Ergebnisse")
+    args = parser.parse_args()
+
+    protocol_out = CountingStream(open_result_channel(args.result_fd))
+    protocol_in = sys.stdin.buffer
+
+    while True:
+        message = read_job(protocol_in)
+        if message is None:
+            break
+
+        job, input_data, code = message
+        preload_code(job, code)
+        run_isolated(protocol_out, job, input_data, code)
+
+
+def run_message(protocol_out, job: Dict[str, Any], input_data: Any, code: Optional[bytes], max_rss_kb: int):
+    """
+    Führt einen gelesenen Auftrag aus und sendet dessen Ergebnisse.
+
+    Args:
+        protocol_out: Der Ergebniskanal (CountingStream)
+        job: Der Auftragskopf
+        input_data: Die Eingabedaten
+        code: Der mit marshal serialisierte Code des Skripts
+        max_rss_kb: Spitzenwert des Speicherverbrauchs des Workers in KiB
+    """
+    encoding = job.get("result_encoding") or "json"
+    emit = lambda chunk: write_chunk(protocol_out, chunk, encoding)
+
+    if "handlers" in job:
+        run_batch(protocol_out, job, input_data, emit, encoding, max_rss_kb)
+    else:
+        protocol_out.reset()
+        send_result(protocol_out, measure_job(job, input_data, code, emit), encoding, max_rss_kb)
+
+
+def run_batch(
+    protocol_out,
+    job: Dict[str, Any],
+    input_data: Any,
+    emit: Callable[[Any], None],
+    encoding: str,
+    max_rss_kb: int
+):
+    """
+    Führt einen Sammelauftrag aus: alle Skripte nacheinander, je Skript ein eigenes Ergebnis
+    (mit vorangehenden Teilergebnissen). Skripte mit einer Vorstufe ("parent") erhalten deren
+    Ergebnis als Eingabe; es verbleibt im Worker, bis alle Folgestufen gelaufen sind. Ergebnisse
+    von Skripten ohne "emit" werden nicht zurückgesendet.
+
+    Args:
+        protocol_out: Der Ergebniskanal (CountingStream)
+        job: Der Auftragskopf mit der Liste der Skripte unter "handlers" (Vorstufen stehen vor ihren Folgestufen)
+        input_data: Die Eingabedaten
+        emit: Funktion, die Teilergebnisse an den Ergebniskanal sendet
+        encoding: Kodierung für strukturierte Daten
+        max_rss_kb: Spitzenwert des Speicherverbrauchs des Workers in KiB
+    """
+    entries = job["handlers"]
+    pending_children = {}
+    for entry in entries:
+        if entry.get("parent") is not None:
+            pending_children[entry["parent"]] = pending_children.get(entry["parent"], 0) + 1
+
+    base_job = {key: value for key, value in job.items() if key != "handlers"}
+    input_cache = {}
+    values = {}  # Ergebnisse von Vorstufen, solange Folgestufen sie noch benötigen
+    errors = {}
+
+    for index, entry in enumerate(entries):
+        parent = entry.get("parent")
+        entry_job = dict(
+            base_job,
+            script=entry.get("script"),
+            code_key=entry.get("code_key"),
+            max_memory_mb=entry.get("max_memory_mb"),
+            max_cpu_seconds=entry.get("max_cpu_seconds"),
+            profile=entry.get("profile"),
+        )
+        forward = entry.get("emit", True)
+        collected = [] if pending_children.get(index) else None
+
+        def sink(chunk, collected=collected, forward=forward):
+            if collected is not None:
+                collected.append(chunk)
+            if forward:
+                emit(chunk)
+
+        protocol_out.reset()
+        if parent is not None and parent not in values:
+            result = {
+                "success": False,
+                "data": None,
+                "error": f"Die Vorstufe ist fehlgeschlagen: {errors.get(parent) or 'kein Ergebnis'}",
+            }
+        elif parent is not None:
+            # Eingabe ist das Ergebnis der Vorstufe, nicht die Eingabedatei; es wird nicht übertragen
+            entry_job.update(input_path=None, input_size=None)
+            result = measure_job(entry_job, values[parent], entry.get("code"), sink)
+        else:
+            result = measure_job(entry_job, input_data, entry.get("code"), sink, input_cache)
+
+        if result["success"]:
+            if collected is not None:
+                values[index] = collected if result.get("streamed") else result["data"]
+        else:
+            errors[index] = result["error"].splitlines()[0] if result["error"] else None
+
+        # Ergebnis der Vorstufe freigeben, sobald alle Folgestufen gelaufen sind
+        if parent is not None:
+            pending_children[parent] -= 1
+            if not pending_children[parent]:
+                values.pop(parent, None)
+
+        if not forward:
+            result["data"] = None
+        result["index"] = index
+        send_result(protocol_out, result, encoding, max_rss_kb)
+
+
+def send_result(protocol_out, result: Dict[str, Any], encoding: str, max_rss_kb: int):
+    """
+    Sendet ein Ergebnis über den Ergebniskanal.
+    Die seit dem letzten reset() gesendeten Teilergebnisse zählen zu output_bytes.
+
+    Args:
+        protocol_out: Der Ergebniskanal (CountingStream)
+        result: Das Ergebnis mit success, data und error
+        encoding: Kodierung der Ergebnisdaten ("json" oder "binary")
+        max_rss_kb: Spitzenwert des Speicherverbrauchs des Workers in KiB
+    """
+    sys.stdout.flush()
+    if "usage" in result:
+        result["usage"]["output_bytes"] = protocol_out.count
+
+    # Speicherverbrauch melden, damit der Pool den Worker bei Bedarf ersetzen kann
+    result["max_rss_kb"] = max_rss_kb
+
+    try:
+        write_result(protocol_out, result, encoding)
+    except (BinaryEncodingError, RecursionError) as e:
+        # Ergebnis enthält Typen, die weder als JSON noch binär kodiert werden können
+        write_result(protocol_out, {
+            "success": False,
+            "data": None,
+            "error": f"Fehler beim Serialisieren des Ergebnisses: {str(e)}",
+            "max_rss_kb": max_rss_kb,
+            "usage": result.get("usage"),
+            "index": result.get("index"),
+        })
+
+
+def run_isolated(protocol_out, job: Dict[str, Any], input_data: Any, code: Optional[bytes]):
+    """
+    Führt einen Auftrag in einem vom Worker abgespaltenen Kindprozess aus und wartet auf dessen Ende.
+    Der Kindprozess schreibt seine Ergebnisse selbst in den geerbten Ergebniskanal. Änderungen
+    des Skripts an Modulen, Umgebung, Arbeitsverzeichnis, Signal-Handlern oder Limits bleiben
+    so auf den Auftrag beschränkt.
+
+    Endet der Kindprozess mit einem Fehler (z.B. durch ein Signal), ist unklar, welche Ergebnisse
+    bereits gesendet wurden; der Worker beendet sich dann ebenfalls und wird vom Pool ersetzt.
+
+    Args:
+        protocol_out: Der Ergebniskanal (CountingStream)
+        job: Der Auftragskopf
+        input_data: Die Eingabedaten
+        code: Der mit marshal serialisierte Code des Skripts
+    """
+    # Gemeldet wird der Speicherverbrauch des Workers, nicht der des Kindprozesses
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Gepufferte Ausgaben vor dem Abspalten leeren, sonst würden sie doppelt geschrieben
+    sys.stdout.flush()
+    sys.stderr.flush()
+    protocol_out.flush()
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            run_message(protocol_out, job, input_data, code, max_rss_kb)
+            protocol_out.flush()
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(status)
+
+    _, status = os.waitpid(pid, 0)
+    exit_code = os.waitstatus_to_exitcode(status)
+    if exit_code != 0:
+        print(f"Auftrag wurde mit Exit-Code {exit_code} abgebrochen", file=sys.stderr, flush=True)
+        sys.exit(1)
+
+
+class CountingStream:
+    """
+    Zählt die in den Ergebniskanal geschriebenen Bytes, um die Größe jedes Ergebnisses zu melden.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, data) -> int:
+        self.count += memoryview(data).nbytes
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+    def reset(self):
+        self.count = 0
+
+
+if __name__ == "__main__":
+    main()
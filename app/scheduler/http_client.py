@@ -0,0 +1,99 @@
+"""
+Gemeinsamer HTTP-Client für den Datenabruf.
+Hält einen langlebigen httpx.AsyncClient mit Connection-Pool, damit wiederholte Abrufe
+derselben Hosts DNS-, TCP- und TLS-Verbindungen wiederverwenden können.
+"""
+
+from typing import Dict, Optional
+
+import httpx
+from loguru import logger
+
+from app.config.settings import settings
+from app.models.datasource import DataSource
+
+# Globale Client-Instanz, wird vom Scheduler-Lebenszyklus verwaltet
+client: Optional[httpx.AsyncClient] = None
+
+def _http2_available() -> bool:
+    """
+    Prüft, ob das optionale Paket 'h2' für HTTP/2 installiert ist.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Gibt den gemeinsamen HTTP-Client zurück und erstellt ihn bei Bedarf.
+    
+    Returns:
+        httpx.AsyncClient: Der gemeinsam genutzte Client
+    """
+    global client
+    
+    if client is None or client.is_closed:
+        http2 = settings.HTTP_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 ist aktiviert, aber das Paket 'h2' ist nicht installiert - verwende HTTP/1.1")
+            http2 = False
+        
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            http2=http2,
+        )
+        logger.info("HTTP-Client für den Datenabruf erstellt")
+    
+    return client
+
+def get_timeout(datasource: DataSource) -> httpx.Timeout:
+    """
+    Ermittelt das Timeout für den Abruf einer Datenquelle.
+    
+    Args:
+        datasource: Die abzurufende Datenquelle
+        
+    Returns:
+        httpx.Timeout: Das Timeout der Datenquelle oder der Standardwert aus den Einstellungen
+    """
+    timeout = datasource.timeout or settings.HTTP_TIMEOUT
+    return httpx.Timeout(timeout, connect=min(timeout, settings.HTTP_CONNECT_TIMEOUT))
+
+def get_conditional_headers(datasource: DataSource) -> Dict[str, str]:
+    """
+    Erstellt die Header für einen bedingten Abruf anhand der gespeicherten Validatoren.
+    Steht eine erzwungene Verarbeitung an (force_process_every), wird unbedingt abgerufen,
+    da eine Antwort mit Status 304 keine Daten zum Verarbeiten liefert.
+    
+    Args:
+        datasource: Die abzurufende Datenquelle
+        
+    Returns:
+        Dict[str, str]: If-None-Match- und If-Modified-Since-Header, soweit bekannt
+    """
+    headers = {}
+    if datasource.forced_run_due:
+        return headers
+    if datasource.etag:
+        headers["If-None-Match"] = datasource.etag
+    if datasource.last_modified:
+        headers["If-Modified-Since"] = datasource.last_modified
+    return headers
+
+async def close_http_client():
+    """
+    Schließt den gemeinsamen HTTP-Client und alle offenen Verbindungen.
+    """
+    global client
+    
+    if client is not None:
+        await client.aclose()
+        client = None
+        logger.info("HTTP-Client für den Datenabruf geschlossen")
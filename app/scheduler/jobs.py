@@ -1,15 +1,19 @@
-import os
 from datetime import datetime, timedelta
 import httpx
-from pathlib import Path
 import asyncio
 from loguru import logger
 
 from app.config.settings import settings
+from app.models.base import async_session
+from app.models.datasource import FetchStatus
+from app.scheduler.http_client import get_http_client, get_conditional_headers, get_timeout
 from app.services.datasource import DataSourceService
 from app.services.handler import HandlerService
 from app.services.output import OutputService
+from app.services.payload import read_payload
+from app.services.result_cache import result_cache
 from app.services.sandbox import SandboxService
+from app.services.segments import flush_segments
 
 async def fetch_and_process_data(datasource_id: int):
     """
@@ -18,91 +22,180 @@ async def fetch_and_process_data(datasource_id: int):
     Args:
         datasource_id: ID der Datenquelle
     """
-    try:
+    async with async_session() as session:
         # Services instanziieren
-        datasource_service = DataSourceService()
-        handler_service = HandlerService()
-        output_service = OutputService()
         sandbox_service = SandboxService()
+        datasource_service = DataSourceService(session)
+        handler_service = HandlerService(session, sandbox_service)
+        output_service = OutputService(session)
+        datasource = None
+        payload = None
         
-        # Datenquelle abrufen
-        datasource = await datasource_service.get_by_id(datasource_id)
-        if not datasource:
-            logger.error(f"Datenquelle mit ID {datasource_id} nicht gefunden")
-            return
-        
-        logger.info(f"Starte Datenabruf für Datenquelle '{datasource.name}' ({datasource.url})")
-        
-        # Daten abrufen
-        async with httpx.AsyncClient() as client:
-            response = await client.get(datasource.url)
-            response.raise_for_status()
-            data = response.text
-        
-        logger.info(f"Daten erfolgreich abgerufen von {datasource.url}")
-        
-        # Datenhandler und Ausgabekonfiguration abrufen
-        # TODO: Implementiere die Verknüpfung zwischen Datenquellen, Handlern und Ausgaben
-        # Annahme: Wir haben eine Methode, um die zugehörigen Handler und Ausgaben zu finden
-        handlers = await handler_service.get_by_datasource(datasource_id)
-        outputs = await output_service.get_by_datasource(datasource_id)
-        
-        # Daten verarbeiten und speichern
-        for handler in handlers:
-            try:
-                # Daten im Sandbox-Kontext verarbeiten
-                processed_data = await sandbox_service.execute_script(handler.script, data)
-                
-                # Für jede Ausgabekonfiguration speichern
-                for output in outputs:
-                    await output_service.save_data(processed_data, output)
+        try:
+            # Datenquelle abrufen
+            datasource = await datasource_service.get_by_id(datasource_id)
+            if not datasource:
+                logger.error(f"Datenquelle mit ID {datasource_id} nicht gefunden")
+                return
+            
+            logger.info(f"Starte Datenabruf für Datenquelle '{datasource.name}' ({datasource.url})")
+            
+            # Daten über den gemeinsamen HTTP-Client bedingt und blockweise abrufen
+            client = get_http_client()
+            async with client.stream(
+                "GET",
+                datasource.url,
+                headers=get_conditional_headers(datasource),
+                timeout=get_timeout(datasource)
+            ) as response:
+                # Unveränderte Daten müssen weder verarbeitet noch gespeichert werden
+                if response.status_code == 304:
+                    logger.info(f"Daten von {datasource.url} unverändert, Verarbeitung wird übersprungen")
+                    await datasource_service.record_fetch(datasource, FetchStatus.UNCHANGED)
+                    return
                 
-                logger.info(f"Verarbeitung mit Handler '{handler.name}' erfolgreich abgeschlossen")
-            except Exception as e:
-                logger.error(f"Fehler bei der Verarbeitung mit Handler '{handler.name}': {str(e)}")
+                response.raise_for_status()
+                payload = await read_payload(
+                    response,
+                    max_size=datasource.max_size or settings.FETCH_MAX_SIZE,
+                    spill=datasource.stream_to_disk
+                )
+            
+            logger.info(f"Daten erfolgreich abgerufen von {datasource.url} ({payload.size} Bytes)")
+            
+            # Inhaltsgleiche Daten überspringen, auch wenn der Server keine Cache-Header liefert
+            if datasource_service.is_content_unchanged(datasource, payload.digest):
+                logger.info(f"Inhalt von {datasource.url} unverändert, Verarbeitung wird übersprungen")
+                # Neue Validatoren übernehmen, damit der nächste Abruf bedingt erfolgen kann
+                await datasource_service.record_fetch(
+                    datasource,
+                    FetchStatus.UNCHANGED,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+                return
+            
+            # Gespoolte Daten werden als Pfad übergeben und erst in der Sandbox dekodiert
+            if payload.path is not None:
+                data, input_path = None, payload.path
+            else:
+                data, input_path = payload.text(), None
+            
+            # Zugeordnete Datenhandler und aktive Ausgabekonfigurationen abrufen
+            handlers = await handler_service.get_by_datasource(datasource_id)
+            outputs = await output_service.get_by_datasource(datasource_id)
+            
+            # Daten verarbeiten und speichern; die Handler laufen gemeinsam in der Sandbox und
+            # ihre Teilergebnisse werden direkt in alle Ausgabekonfigurationen geschrieben.
+            # Eine erzwungene Verarbeitung unveränderter Daten (force_process_every) führt die
+            # Handler erneut aus, statt ihre Ergebnisse aus dem Ergebnis-Cache zu liefern
+            forced = datasource.content_digest == payload.digest
+            failed = False
+            results = handler_service.stream_handlers(
+                handlers,
+                data,
+                input_path=input_path,
+                input_encoding=payload.encoding,
+                input_digest=payload.digest,
+                datasource_id=datasource_id,
+                use_cache=not forced
+            )
+            async for handler, chunks in results:
+                try:
+                    writers = await output_service.save_stream(chunks, outputs)
+                    errors = [writer for writer in writers if not writer.success]
+                    if errors:
+                        failed = True
+                        for writer in errors:
+                            logger.error(
+                                f"Handler '{handler.name}': Ausgabe '{writer.output.name}' fehlgeschlagen: {writer.error}"
+                            )
+                    else:
+                        logger.info(f"Verarbeitung mit Handler '{handler.name}' erfolgreich abgeschlossen")
+                except Exception as e:
+                    failed = True
+                    logger.error(f"Fehler bei der Verarbeitung mit Handler '{handler.name}': {str(e)}")
+            
+            # Ausgaben mit gebündelter Synchronisierung gemeinsam auf den Datenträger schreiben
+            await output_service.sync_pending()
+            
+            await datasource_service.record_fetch(
+                datasource,
+                FetchStatus.ERROR if failed else FetchStatus.SUCCESS,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                content_digest=payload.digest
+            )
+        
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP-Fehler beim Abrufen der Daten: {str(e)}")
+            await _record_fetch_error(datasource_service, datasource)
+        except Exception as e:
+            logger.error(f"Unerwarteter Fehler bei der Verarbeitung: {str(e)}")
+            await _record_fetch_error(datasource_service, datasource)
+        finally:
+            if payload is not None:
+                payload.cleanup()
+
+async def _record_fetch_error(datasource_service: DataSourceService, datasource):
+    """
+    Vermerkt einen fehlgeschlagenen Abruf an der Datenquelle, sofern sie bereits geladen wurde.
+    """
+    if datasource is None:
+        return
     
-    except httpx.HTTPError as e:
-        logger.error(f"HTTP-Fehler beim Abrufen der Daten: {str(e)}")
+    try:
+        await datasource_service.record_fetch(datasource, FetchStatus.ERROR)
     except Exception as e:
-        logger.error(f"Unerwarteter Fehler bei der Verarbeitung: {str(e)}")
+        logger.error(f"Fehler beim Speichern des Abrufstatus: {str(e)}")
 
 async def cleanup_old_files():
     """
     Bereinigt alte Dateien basierend auf den Aufbewahrungsregeln.
     """
     try:
-        output_service = OutputService()
+        # Abgelaufene Einträge des Ergebnis-Caches entfernen
+        removed = result_cache.purge_expired()
+        if removed:
+            logger.info(f"{removed} abgelaufene Einträge aus dem Ergebnis-Cache entfernt")
         
-        # Alle Ausgabekonfigurationen mit Zeitstempel-Strategie und Aufbewahrungsdauer abrufen
-        outputs = await output_service.get_all_with_retention()
+        # Alte Einträge der Ausführungshistorie der Handler entfernen
+        async with async_session() as session:
+            handler_service = HandlerService(session, SandboxService())
+            removed = await handler_service.purge_runs(
+                datetime.now() - timedelta(days=settings.HANDLER_RUN_RETENTION_DAYS)
+            )
+            if removed:
+                logger.info(f"{removed} alte Einträge aus der Ausführungshistorie der Handler entfernt")
         
-        for output in outputs:
-            if not output.active:
-                continue
-                
-            output_path = Path(output.path)
-            if not output_path.exists() or not output_path.is_dir():
-                logger.warning(f"Ausgabepfad '{output.path}' existiert nicht oder ist kein Verzeichnis")
-                continue
+        async with async_session() as session:
+            output_service = OutputService(session)
             
-            # Berechne das Datum, ab dem Dateien gelöscht werden sollen
-            cutoff_date = datetime.now() - timedelta(days=output.retention_days)
+            # Alle Ausgabekonfigurationen mit Zeitstempel-Strategie und Aufbewahrungsdauer abrufen
+            outputs = await output_service.get_all_with_retention()
             
-            # Durchsuche Dateien im Ausgabeverzeichnis
-            for file_path in output_path.glob("*"):
-                if not file_path.is_file():
+            for output in outputs:
+                if not output.active:
                     continue
                 
-                # Überprüfe die Dateierstellungszeit
-                file_creation_time = datetime.fromtimestamp(file_path.stat().st_ctime)
-                
-                if file_creation_time < cutoff_date:
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"Alte Datei gelöscht: {file_path}")
-                    except Exception as e:
-                        logger.error(f"Fehler beim Löschen der Datei {file_path}: {str(e)}")
+                # Abgelaufene Dateien über den Dateiindex löschen
+                try:
+                    deleted = await output_service.clean_old_files(output.id)
+                    if deleted:
+                        logger.info(f"{deleted} alte Dateien der Ausgabe '{output.name}' gelöscht")
+                except Exception as e:
+                    logger.error(f"Fehler beim Löschen alter Dateien der Ausgabe '{output.name}': {str(e)}")
         
         logger.info("Bereinigung alter Dateien abgeschlossen")
     except Exception as e:
-        logger.error(f"Fehler bei der Bereinigung alter Dateien: {str(e)}")
\ No newline at end of file
+        logger.error(f"Fehler bei der Bereinigung alter Dateien: {str(e)}")
+
+async def flush_output_segments():
+    """
+    Schreibt gesammelte Daten von Ausgaben mit der append-Strategie, die seit
+    OUTPUT_APPEND_FLUSH_INTERVAL nicht mehr geschrieben wurden.
+    """
+    try:
+        await flush_segments()
+    except Exception as e:
+        logger.error(f"Fehler beim Schreiben der Ausgabesegmente: {str(e)}")
\ No newline at end of file
@@ -8,7 +8,11 @@ from loguru import logger
 from app.config.settings import settings
 from app.models.base import get_session
 from app.models.datasource import DataSource
-from app.scheduler.jobs import fetch_and_process_data, cleanup_old_files
+from app.scheduler.http_client import close_http_client
+from app.scheduler.jobs import fetch_and_process_data, cleanup_old_files, flush_output_segments
+from app.services.object_storage import close_s3_client
+from app.services.sandbox_pool import shutdown_worker_pool
+from app.services.segments import close_segments
 
 # Globale Scheduler-Instanz
 scheduler = None
@@ -65,6 +69,20 @@ async def schedule_cleanup_job():
     
     logger.info("Bereinigungsjob geplant: Täglich um Mitternacht")
 
+async def schedule_flush_job():
+    """
+    Plant den Job, der gesammelte Daten von Ausgabesegmenten regelmäßig schreibt.
+    """
+    scheduler.add_job(
+        flush_output_segments,
+        IntervalTrigger(seconds=settings.OUTPUT_APPEND_FLUSH_INTERVAL),
+        id="flush_output_segments",
+        replace_existing=True,
+        misfire_grace_time=settings.SCHEDULER_MISFIRE_GRACE_TIME
+    )
+    
+    logger.info(f"Schreiben der Ausgabesegmente geplant: Alle {settings.OUTPUT_APPEND_FLUSH_INTERVAL} Sekunden")
+
 async def start_scheduler():
     """
     Startet den Scheduler und plant alle Jobs.
@@ -78,6 +96,7 @@ async def start_scheduler():
         # Jobs planen
         await schedule_datasource_jobs()
         await schedule_cleanup_job()
+        await schedule_flush_job()
         
         # Scheduler starten
         scheduler.start()
@@ -95,6 +114,14 @@ async def stop_scheduler():
         logger.info("Stoppe Scheduler")
         scheduler.shutdown()
         scheduler = None
+        
+        # Gesammelte Daten der Ausgabesegmente schreiben
+        await close_segments()
+        
+        # Gemeinsame HTTP-Clients und Sandbox-Worker schließen
+        await close_http_client()
+        await close_s3_client()
+        await shutdown_worker_pool()
         logger.info("Scheduler gestoppt")
     else:
         logger.warning("Scheduler läuft nicht")
@@ -115,6 +142,7 @@ async def reload_scheduler():
         # Jobs neu planen
         await schedule_datasource_jobs()
         await schedule_cleanup_job()
+        await schedule_flush_job()
         
         logger.info("Scheduler-Jobs aktualisiert")
     else:
@@ -0,0 +1,95 @@
+"""
+Cache für kompilierte Handler-Skripte.
+Skripte werden einmalig kompiliert und als marshal-Blob zwischengespeichert, sodass
+die Sandbox-Prozesse den Code laden können, ohne ihn bei jeder Ausführung neu zu kompilieren.
+"""
+
+import logging
+import marshal
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from app.config.settings import settings
+from app.utils.hashing import compute_digest
+
+logger = logging.getLogger(__name__)
+
+# Dateiname, unter dem Handler-Code in Tracebacks erscheint
+CODE_FILENAME = "<handler>"
+
+
+class CompiledScript:
+    """
+    Ein kompiliertes Skript mit eindeutigem Inhaltsschlüssel.
+    """
+
+    def __init__(self, code_key: str, code: bytes):
+        """
+        Args:
+            code_key: Digest des Skripts, identifiziert den Code in den Sandbox-Workern
+            code: Der mit marshal serialisierte Code
+        """
+        self.code_key = code_key
+        self.code = code
+
+
+class BytecodeCache:
+    """
+    LRU-Cache für kompilierte Skripte, indiziert nach (Handler-ID, Version) oder Skript-Digest.
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries: Maximale Anzahl zwischengespeicherter Skripte
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CompiledScript]" = OrderedDict()
+
+    def get(self, script_content: str, cache_key: Optional[Tuple[int, int]] = None) -> Optional[CompiledScript]:
+        """
+        Gibt das kompilierte Skript zurück und kompiliert es bei Bedarf.
+
+        Args:
+            script_content: Der Inhalt des Skripts
+            cache_key: (Handler-ID, Version); ohne Angabe wird der Digest des Skripts verwendet
+
+        Returns:
+            Das kompilierte Skript oder None, wenn es nicht kompiliert werden kann
+            (der Fehler wird dann bei der Ausführung in der Sandbox gemeldet)
+        """
+        digest = None
+        if cache_key is None:
+            digest = compute_digest(script_content.encode("utf-8"))
+            cache_key = ("script", digest)
+
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            self._entries.move_to_end(cache_key)
+            return entry
+
+        try:
+            code = marshal.dumps(compile(script_content, CODE_FILENAME, "exec"))
+        except (SyntaxError, ValueError):
+            return None
+
+        entry = CompiledScript(digest or compute_digest(script_content.encode("utf-8")), code)
+        self._entries[cache_key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, handler_id: int):
+        """
+        Entfernt alle zwischengespeicherten Versionen eines Handlers.
+
+        Args:
+            handler_id: ID des Handlers
+        """
+        for key in [key for key in self._entries if key[0] == handler_id]:
+            del self._entries[key]
+        logger.info(f"Bytecode-Cache für Handler {handler_id} invalidiert")
+
+
+# Globale Cache-Instanz
+bytecode_cache = BytecodeCache(settings.SANDBOX_BYTECODE_CACHE_SIZE)
@@ -2,16 +2,21 @@
 Dienst für die Verwaltung von Datenquellen.
 """
 
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Optional, Type, TypeVar
 
 from app.models.base import get_session
-from app.models.datasource import DataSource, DataSourceCreate, DataSourceUpdate
+from app.models.datasource import DataSource, DataSourceCreate, DataSourceUpdate, FetchStatus
+from app.models.handler import Handler
+from app.models.output import Output
 from app.utils.validators import validate_url
 
+LinkedModel = TypeVar("LinkedModel", Handler, Output)
+
 class DataSourceService:
     """
     Service-Klasse für die Verwaltung von Datenquellen.
@@ -31,7 +36,7 @@ class DataSourceService:
             DataSource: Die erstellte Datenquelle
         """
         # URL validieren
-        await validate_url(str(datasource.url))
+        await self._validate_url(str(datasource.url))
         
         # Datenquelle erstellen
         db_datasource = DataSource(
@@ -39,8 +44,14 @@ class DataSourceService:
             url=str(datasource.url),
             description=datasource.description,
             start_time=datasource.start_time,
-            frequency=timedelta(seconds=datasource.frequency)
+            frequency=timedelta(seconds=datasource.frequency),
+            timeout=datasource.timeout,
+            stream_to_disk=datasource.stream_to_disk,
+            max_size=datasource.max_size,
+            force_process_every=datasource.force_process_every
         )
+        db_datasource.handlers = await self._load_linked(Handler, datasource.handler_ids, "Datenhandler")
+        db_datasource.outputs = await self._load_linked(Output, datasource.output_ids, "Ausgabekonfiguration")
         
         self.session.add(db_datasource)
         await self.session.commit()
@@ -97,13 +108,21 @@ class DataSourceService:
         
         # URL validieren, falls eine neue angegeben wurde
         if "url" in update_data:
-            await validate_url(str(update_data["url"]))
+            await self._validate_url(str(update_data["url"]))
             update_data["url"] = str(update_data["url"])
         
         # Frequenz in Timedelta umwandeln, falls angegeben
         if "frequency" in update_data:
             update_data["frequency"] = timedelta(seconds=update_data["frequency"])
         
+        # Zuordnungen werden vollständig ersetzt
+        handler_ids = update_data.pop("handler_ids", None)
+        if handler_ids is not None:
+            db_datasource.handlers = await self._load_linked(Handler, handler_ids, "Datenhandler")
+        output_ids = update_data.pop("output_ids", None)
+        if output_ids is not None:
+            db_datasource.outputs = await self._load_linked(Output, output_ids, "Ausgabekonfiguration")
+        
         # Update durchführen
         for key, value in update_data.items():
             setattr(db_datasource, key, value)
@@ -125,4 +144,92 @@ class DataSourceService:
             raise HTTPException(status_code=404, detail="Datenquelle nicht gefunden")
         
         await self.session.delete(db_datasource)
+        await self.session.commit()
+    
+    @staticmethod
+    async def _validate_url(url: str) -> None:
+        # Die Prüfung ruft die URL synchron ab und läuft daher in einem Thread
+        valid, error = await asyncio.to_thread(validate_url, url)
+        if not valid:
+            raise HTTPException(status_code=400, detail=error)
+    
+    async def _load_linked(self, model: Type[LinkedModel], ids: List[int], label: str) -> List[LinkedModel]:
+        """
+        Lädt die einer Datenquelle zuzuordnenden Handler bzw. Ausgaben.
+        
+        Args:
+            model: Handler oder Output
+            ids: IDs der zuzuordnenden Datensätze
+            label: Bezeichnung für die Fehlermeldung
+            
+        Returns:
+            List: Die Datensätze
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        result = await self.session.execute(select(model).where(model.id.in_(ids)))
+        found = result.scalars().all()
+        missing = set(ids) - {item.id for item in found}
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{label} nicht gefunden: {', '.join(str(id) for id in sorted(missing))}"
+            )
+        return found
+    
+    def is_content_unchanged(self, datasource: DataSource, content_digest: str) -> bool:
+        """
+        Prüft, ob die abgerufenen Daten bereits verarbeitet wurden.
+        Ist force_process_every gesetzt, wird die Verarbeitung spätestens jeden N-ten Lauf erzwungen.
+        
+        Args:
+            datasource: Die abgerufene Datenquelle
+            content_digest: Digest der abgerufenen Daten
+            
+        Returns:
+            bool: True, wenn die Verarbeitung übersprungen werden kann
+        """
+        if datasource.content_digest != content_digest:
+            return False
+        
+        return not datasource.forced_run_due
+    
+    async def record_fetch(
+        self,
+        datasource: DataSource,
+        status: FetchStatus,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_digest: Optional[str] = None
+    ) -> None:
+        """
+        Speichert das Ergebnis eines Datenabrufs.
+        Die Validatoren für bedingte Anfragen werden nur nach einer erfolgreichen Verarbeitung
+        oder bei unverändertem Inhalt übernommen, damit fehlgeschlagene Läufe beim nächsten Abruf
+        wiederholt werden.
+        
+        Args:
+            datasource: Die abgerufene Datenquelle
+            status: Ergebnis des Abrufs
+            etag: ETag-Header der Antwort
+            last_modified: Last-Modified-Header der Antwort
+            content_digest: Digest der verarbeiteten Daten
+        """
+        datasource.last_fetch_at = datetime.now()
+        datasource.last_fetch_status = status
+        
+        if status == FetchStatus.SUCCESS:
+            datasource.etag = etag
+            datasource.last_modified = last_modified
+            datasource.content_digest = content_digest
+            datasource.unchanged_runs = 0
+        elif status == FetchStatus.UNCHANGED:
+            # Der Inhalt entspricht dem zuletzt verarbeiteten, neue Validatoren sind daher gültig
+            if etag is not None:
+                datasource.etag = etag
+            if last_modified is not None:
+                datasource.last_modified = last_modified
+            datasource.unchanged_runs = (datasource.unchanged_runs or 0) + 1
+        
         await self.session.commit()
\ No newline at end of file
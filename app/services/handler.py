@@ -2,14 +2,19 @@
 Dienst für die Verwaltung von Datenhandlern.
 """
 
+from datetime import datetime
 from fastapi import Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, delete, func, case
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 
+from app.config.settings import settings
 from app.models.base import get_session
+from app.models.datasource import datasource_handlers
 from app.models.handler import Handler, HandlerCreate, HandlerUpdate
-from app.services.sandbox import SandboxService
+from app.models.handler_run import HandlerRun, HandlerRunSummary, ProfileSort
+from app.services.bytecode_cache import bytecode_cache
+from app.services.sandbox import RunCallback, SandboxError, SandboxService
 
 class HandlerService:
     """
@@ -34,11 +39,18 @@ class HandlerService:
         Returns:
             Handler: Der erstellte Datenhandler
         """
+        if handler.parent_id is not None:
+            await self._validate_parent(None, handler.parent_id)
+        
         # Handler erstellen
         db_handler = Handler(
             name=handler.name,
             description=handler.description,
             script=handler.script,
+            parent_id=handler.parent_id,
+            max_memory_mb=handler.max_memory_mb,
+            max_cpu_seconds=handler.max_cpu_seconds,
+            profile=handler.profile,
             version=1
         )
         
@@ -77,6 +89,25 @@ class HandlerService:
         result = await self.session.execute(query)
         return result.scalars().first()
     
+    async def get_by_datasource(self, datasource_id: int) -> List[Handler]:
+        """
+        Gibt die Datenhandler zurück, die einer Datenquelle zugeordnet sind.
+        
+        Args:
+            datasource_id: ID der Datenquelle
+            
+        Returns:
+            List[Handler]: Liste der zugeordneten Datenhandler
+        """
+        query = (
+            select(Handler)
+            .join(datasource_handlers, datasource_handlers.c.handler_id == Handler.id)
+            .where(datasource_handlers.c.datasource_id == datasource_id)
+            .order_by(Handler.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+    
     async def update(self, handler_id: int, handler_update: HandlerUpdate) -> Handler:
         """
         Aktualisiert einen vorhandenen Datenhandler.
@@ -95,9 +126,13 @@ class HandlerService:
         # Aktualisierbare Felder
         update_data = handler_update.dict(exclude_unset=True)
         
-        # Wenn das Skript geändert wird, erhöhen wir die Version
+        if update_data.get("parent_id") is not None:
+            await self._validate_parent(handler_id, update_data["parent_id"])
+        
+        # Wenn das Skript geändert wird, erhöhen wir die Version und verwerfen den kompilierten Code
         if "script" in update_data and update_data["script"] != db_handler.script:
             db_handler.version += 1
+            bytecode_cache.invalidate(handler_id)
         
         # Update durchführen
         for key, value in update_data.items():
@@ -119,33 +154,412 @@ class HandlerService:
         if db_handler is None:
             raise HTTPException(status_code=404, detail="Datenhandler nicht gefunden")
         
+        # Handler, die als Vorstufe dienen, dürfen nicht gelöscht werden
+        query = select(Handler.id).where(Handler.parent_id == handler_id).limit(1)
+        result = await self.session.execute(query)
+        if result.first() is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Der Datenhandler wird von anderen Handlern als Vorstufe verwendet"
+            )
+        
+        # Ausführungshistorie und Zuordnungen zu Datenquellen entfernen
+        await self.session.execute(delete(HandlerRun).where(HandlerRun.handler_id == handler_id))
+        await self.session.execute(delete(datasource_handlers).where(datasource_handlers.c.handler_id == handler_id))
         await self.session.delete(db_handler)
         await self.session.commit()
+        
+        bytecode_cache.invalidate(handler_id)
+    
+    async def _validate_parent(self, handler_id: Optional[int], parent_id: int) -> None:
+        """
+        Prüft, ob ein Handler als Vorstufe verwendet werden kann.
+        
+        Args:
+            handler_id: ID des Handlers, der die Vorstufe erhalten soll (None bei neuen Handlern)
+            parent_id: ID der Vorstufe
+        """
+        seen = set()
+        current_id = parent_id
+        while current_id is not None:
+            if current_id == handler_id or current_id in seen:
+                raise HTTPException(status_code=400, detail="Die Vorstufe würde einen Zyklus bilden")
+            seen.add(current_id)
+            
+            current = await self.get_by_id(current_id)
+            if current is None:
+                raise HTTPException(status_code=400, detail="Vorstufe nicht gefunden")
+            current_id = current.parent_id
     
-    async def test_handler(self, handler: Handler, test_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def get_pipeline(self, handlers: List[Handler]) -> List[Tuple[Handler, Optional[int], bool]]:
         """
-        Testet einen Datenhandler mit Testdaten.
+        Ordnet Datenhandler als Pipeline an. Vorstufen, die nicht selbst in der Liste enthalten
+        sind, werden nachgeladen und nur als Zwischenstufe ausgeführt. Gemeinsame Vorstufen
+        erscheinen nur einmal.
+        
+        Args:
+            handlers: Die auszuführenden Datenhandler
+            
+        Returns:
+            List[Tuple[Handler, Optional[int], bool]]: Je Stufe der Handler, der Index seiner Vorstufe
+            und ob sein Ergebnis geliefert werden soll; Vorstufen stehen vor ihren Folgestufen
+        """
+        requested = {handler.id for handler in handlers}
+        stages: List[Tuple[Handler, Optional[int], bool]] = []
+        positions: Dict[int, int] = {}
+        
+        async def add(handler: Handler, path: Tuple[int, ...]) -> int:
+            if handler.id in positions:
+                return positions[handler.id]
+            if handler.id in path:
+                raise ValueError(f"Zyklische Vorstufen bei Handler '{handler.name}'")
+            
+            parent_index = None
+            if handler.parent_id is not None:
+                parent = await self.get_by_id(handler.parent_id)
+                if parent is None:
+                    raise ValueError(f"Vorstufe von Handler '{handler.name}' nicht gefunden")
+                parent_index = await add(parent, path + (handler.id,))
+            
+            positions[handler.id] = len(stages)
+            stages.append((handler, parent_index, handler.id in requested))
+            return positions[handler.id]
+        
+        for handler in handlers:
+            await add(handler, ())
+        
+        return stages
+    
+    async def test_handler(
+        self,
+        handler: Handler,
+        test_data: Dict[str, Any],
+        profile: bool = False,
+        top: Optional[int] = None,
+        sort: ProfileSort = ProfileSort.CUMULATIVE
+    ) -> Dict[str, Any]:
+        """
+        Testet einen Datenhandler mit Testdaten. Vorstufen des Handlers werden nacheinander
+        ausgeführt, jede Stufe erhält das Ergebnis der vorherigen.
         
         Args:
             handler: Der zu testende Datenhandler
             test_data: Die Testdaten
+            profile: Ob der Handler (ohne Vorstufen) unter einem Profiler ausgeführt werden soll
+            top: Anzahl der Funktionen im Profil (Standard: SANDBOX_PROFILE_TOP_N)
+            sort: Sortierung der Funktionen im Profil
             
         Returns:
-            Dict[str, Any]: Die Ergebnisse der Testausführung
+            Dict[str, Any]: Das Ergebnis (result), die Verbrauchswerte der Ausführung des
+            Handlers (usage, leer bei Treffern im Ergebnis-Cache) und das Profil (profile)
         """
+        stages = [stage for stage, _, _ in await self.get_pipeline([handler])]
+        data: Any = test_data
+        for stage in stages[:-1]:
+            try:
+                data = await self.sandbox_service.execute_script(
+                    stage.script,
+                    data,
+                    cache_key=(stage.id, stage.version),
+                    limits=self._limits(stage)
+                )
+            except SandboxError as e:
+                raise SandboxError(f"Die Vorstufe '{stage.name}' ist fehlgeschlagen: {str(e)}")
+        
         # Sandbox-Service nutzen, um den Handler mit Testdaten auszuführen
-        return await self.sandbox_service.execute_script(handler.script, test_data)
+        runs = []
+        result = await self.sandbox_service.execute_script(
+            handler.script,
+            data,
+            cache_key=(handler.id, handler.version),
+            limits=self._limits(handler),
+            on_run=runs.append,
+            profile=self._profile_options(profile, top, sort)
+        )
+        return {
+            "result": result,
+            "usage": runs[-1]["usage"] if runs else None,
+            "profile": runs[-1]["profile"] if runs else None,
+        }
     
-    async def execute_handler(self, handler: Handler, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute_handler(
+        self,
+        handler: Handler,
+        data: Dict[str, Any],
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        input_digest: Optional[str] = None,
+        datasource_id: Optional[int] = None,
+        profile: bool = False,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
         """
-        Führt einen Datenhandler mit Daten aus.
+        Führt einen Datenhandler mit Daten aus und speichert die Verbrauchswerte in der Ausführungshistorie.
         
         Args:
             handler: Der auszuführende Datenhandler
             data: Die zu verarbeitenden Daten
+            input_path: Pfad zu einer Datei mit den Daten (ersetzt data)
+            input_encoding: Zeichenkodierung der Datei
+            input_digest: Digest der Daten für den Ergebnis-Cache
+            datasource_id: ID der Datenquelle für die Ausführungshistorie
+            profile: Ausführung profilieren (auch ohne gesetztes profile am Handler)
+            use_cache: Ergebnis aus dem Ergebnis-Cache verwenden, falls vorhanden
             
         Returns:
             Dict[str, Any]: Die Ergebnisse der Ausführung
         """
         # Sandbox-Service nutzen, um den Handler mit den Daten auszuführen
-        return await self.sandbox_service.execute_script(handler.script, data)
\ No newline at end of file
+        try:
+            return await self.sandbox_service.execute_script(
+                handler.script,
+                data,
+                input_path=input_path,
+                input_encoding=input_encoding,
+                cache_key=(handler.id, handler.version),
+                input_digest=input_digest,
+                limits=self._limits(handler),
+                on_run=self._run_recorder(handler, datasource_id),
+                profile=self._profile_options(profile or handler.profile),
+                use_cache=use_cache
+            )
+        finally:
+            await self.session.commit()
+    
+    def stream_handler(
+        self,
+        handler: Handler,
+        data: Any,
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        input_digest: Optional[str] = None,
+        datasource_id: Optional[int] = None,
+        profile: bool = False,
+        use_cache: bool = True
+    ) -> AsyncIterator[Any]:
+        """
+        Führt einen Datenhandler aus und liefert dessen Ergebnis in Teilen, sobald sie eintreffen.
+        Handler mit process_stream(records) verarbeiten die Eingabe satzweise. Die Verbrauchswerte
+        werden der Sitzung hinzugefügt und mit dem nächsten Commit gespeichert.
+        
+        Args:
+            handler: Der auszuführende Datenhandler
+            data: Die zu verarbeitenden Daten
+            input_path: Pfad zu einer Datei mit den Daten (ersetzt data)
+            input_encoding: Zeichenkodierung der Datei
+            input_digest: Digest der Daten für den Ergebnis-Cache
+            datasource_id: ID der Datenquelle für die Ausführungshistorie
+            profile: Ausführung profilieren (auch ohne gesetztes profile am Handler)
+            use_cache: Ergebnis aus dem Ergebnis-Cache verwenden, falls vorhanden
+            
+        Returns:
+            AsyncIterator[Any]: Die Teilergebnisse der Ausführung
+        """
+        return self.sandbox_service.execute_stream(
+            handler.script,
+            data,
+            input_path=input_path,
+            input_encoding=input_encoding,
+            cache_key=(handler.id, handler.version),
+            input_digest=input_digest,
+            limits=self._limits(handler),
+            on_run=self._run_recorder(handler, datasource_id),
+            profile=self._profile_options(profile or handler.profile),
+            use_cache=use_cache
+        )
+    
+    async def stream_handlers(
+        self,
+        handlers: List[Handler],
+        data: Any,
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        input_digest: Optional[str] = None,
+        datasource_id: Optional[int] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[Tuple[Handler, AsyncIterator[Any]]]:
+        """
+        Führt mehrere Datenhandler mit denselben Daten aus. Ist SANDBOX_BATCH_HANDLERS aktiviert,
+        laufen alle Handler in einem einzigen Sandbox-Auftrag, sodass die Daten nur einmal
+        übertragen werden. Die Teilergebnisse jedes Handlers müssen gelesen werden, bevor der
+        nächste Handler geliefert wird.
+        
+        Handler mit Vorstufe erhalten deren Ergebnis statt der Daten. Pipelines laufen immer in
+        einem Sandbox-Auftrag, damit Zwischenergebnisse im Worker bleiben und gemeinsame
+        Vorstufen nur einmal berechnet werden.
+        
+        Die Verbrauchswerte jeder Ausführung (auch von Zwischenstufen) werden in der
+        Ausführungshistorie gespeichert, sobald die Teilergebnisse eines Handlers gelesen wurden;
+        bei Handlern mit gesetztem profile zusammen mit ihrem Profil. Treffer im Ergebnis-Cache
+        werden ohne Verbrauchswerte als zwischengespeichert vermerkt.
+        
+        Args:
+            handlers: Die auszuführenden Datenhandler
+            data: Die zu verarbeitenden Daten
+            input_path: Pfad zu einer Datei mit den Daten (ersetzt data)
+            input_encoding: Zeichenkodierung der Datei
+            input_digest: Digest der Daten für den Ergebnis-Cache
+            datasource_id: ID der Datenquelle für die Ausführungshistorie
+            use_cache: Ergebnisse aus dem Ergebnis-Cache verwenden, falls vorhanden
+            
+        Returns:
+            AsyncIterator[Tuple[Handler, AsyncIterator[Any]]]: Je Handler dessen Teilergebnisse
+        """
+        stages = await self.get_pipeline(handlers)
+        pipeline = any(parent is not None for _, parent, _ in stages)
+        
+        if not pipeline and (not settings.SANDBOX_BATCH_HANDLERS or len(handlers) < 2):
+            for handler in handlers:
+                yield handler, self.stream_handler(
+                    handler, data, input_path, input_encoding, input_digest, datasource_id, use_cache=use_cache
+                )
+                await self.session.commit()
+            return
+        
+        recorders = [self._run_recorder(handler, datasource_id) for handler, _, _ in stages]
+        batch = self.sandbox_service.execute_batch(
+            [(handler.script, (handler.id, handler.version)) for handler, _, _ in stages],
+            data,
+            input_path=input_path,
+            input_encoding=input_encoding,
+            input_digest=input_digest,
+            parents=[parent for _, parent, _ in stages],
+            emit=[emit for _, _, emit in stages],
+            limits=[self._limits(handler) for handler, _, _ in stages],
+            on_run=lambda index, run: recorders[index](run),
+            profile=[self._profile_options(handler.profile) for handler, _, _ in stages],
+            use_cache=use_cache
+        )
+        async for index, chunks in batch:
+            yield stages[index][0], chunks
+            await self.session.commit()
+        await self.session.commit()
+    
+    @staticmethod
+    def _limits(handler: Handler) -> Dict[str, Optional[int]]:
+        # Ressourcenlimits des Handlers für die Sandbox
+        return {"max_memory_mb": handler.max_memory_mb, "max_cpu_seconds": handler.max_cpu_seconds}
+    
+    @staticmethod
+    def _profile_options(
+        profile: bool,
+        top: Optional[int] = None,
+        sort: ProfileSort = ProfileSort.CUMULATIVE
+    ) -> Optional[Dict[str, Any]]:
+        # Optionen für die Profilierung in der Sandbox oder None, wenn nicht profiliert wird
+        if not profile:
+            return None
+        return {"top": top or settings.SANDBOX_PROFILE_TOP_N, "sort": ProfileSort(sort).value}
+    
+    def _run_recorder(self, handler: Handler, datasource_id: Optional[int]) -> RunCallback:
+        """
+        Erstellt einen Rückruf, der jede Ausführung eines Handlers als HandlerRun der Sitzung hinzufügt.
+        
+        Args:
+            handler: Der ausgeführte Datenhandler
+            datasource_id: ID der Datenquelle oder None
+            
+        Returns:
+            RunCallback: Der Rückruf für den SandboxService
+        """
+        def record(run: Dict[str, Any]) -> None:
+            usage = run["usage"] or {}
+            self.session.add(HandlerRun(
+                handler_id=handler.id,
+                handler_version=handler.version,
+                datasource_id=datasource_id,
+                success=run["success"],
+                error=run["error"].splitlines()[0][:500] if run["error"] else None,
+                wall_time=usage.get("wall_time"),
+                cpu_user=usage.get("cpu_user"),
+                cpu_system=usage.get("cpu_system"),
+                max_rss_kb=usage.get("max_rss_kb"),
+                input_bytes=usage.get("input_bytes"),
+                output_bytes=usage.get("output_bytes"),
+                profile=run.get("profile"),
+                cached=run.get("cached", False)
+            ))
+        return record
+    
+    async def get_runs(self, handler_id: int, skip: int = 0, limit: int = 100) -> List[HandlerRun]:
+        """
+        Gibt die Ausführungshistorie eines Datenhandlers zurück, neueste zuerst.
+        
+        Args:
+            handler_id: ID des Datenhandlers
+            skip: Anzahl der zu überspringenden Datensätze
+            limit: Maximale Anzahl der zurückzugebenden Datensätze
+            
+        Returns:
+            List[HandlerRun]: Liste von Ausführungen
+        """
+        query = (
+            select(HandlerRun)
+            .where(HandlerRun.handler_id == handler_id)
+            .order_by(HandlerRun.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+    
+    async def get_run_summary(self, since: Optional[datetime] = None, limit: int = 20) -> List[HandlerRunSummary]:
+        """
+        Fasst die Ausführungshistorie je Handler zusammen, nach verbrauchter CPU-Zeit absteigend sortiert.
+        
+        Args:
+            since: Nur Ausführungen ab diesem Zeitpunkt berücksichtigen
+            limit: Maximale Anzahl der zurückzugebenden Handler
+            
+        Returns:
+            List[HandlerRunSummary]: Verbrauchswerte je Handler
+        """
+        total_cpu_time = func.sum(HandlerRun.cpu_user + HandlerRun.cpu_system)
+        query = (
+            select(
+                HandlerRun.handler_id,
+                func.count(HandlerRun.id),
+                func.sum(case((HandlerRun.success.is_(False), 1), else_=0)),
+                func.avg(HandlerRun.wall_time),
+                total_cpu_time,
+                func.max(HandlerRun.max_rss_kb),
+                func.sum(HandlerRun.input_bytes),
+                func.sum(HandlerRun.output_bytes),
+                func.sum(case((HandlerRun.cached.is_(True), 1), else_=0))
+            )
+            .group_by(HandlerRun.handler_id)
+            .order_by(total_cpu_time.desc())
+            .limit(limit)
+        )
+        if since is not None:
+            query = query.where(HandlerRun.created_at >= since)
+        
+        result = await self.session.execute(query)
+        return [
+            HandlerRunSummary(
+                handler_id=row[0],
+                runs=row[1],
+                failures=row[2] or 0,
+                avg_wall_time=row[3],
+                total_cpu_time=row[4],
+                max_rss_kb=row[5],
+                total_input_bytes=row[6],
+                total_output_bytes=row[7],
+                cache_hits=row[8] or 0
+            )
+            for row in result.all()
+        ]
+    
+    async def purge_runs(self, before: datetime) -> int:
+        """
+        Entfernt Einträge der Ausführungshistorie, die älter als der angegebene Zeitpunkt sind.
+        
+        Args:
+            before: Zeitpunkt, vor dem Einträge entfernt werden
+            
+        Returns:
+            int: Anzahl der entfernten Einträge
+        """
+        result = await self.session.execute(delete(HandlerRun).where(HandlerRun.created_at < before))
+        await self.session.commit()
+        return result.rowcount
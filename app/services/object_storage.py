@@ -0,0 +1,240 @@
+"""
+Ausgaben in einen S3-kompatiblen Objektspeicher.
+Die Objekte erhalten dieselben Schlüssel wie die Dateien unter OUTPUT_DIR (relativer Pfad mit
+Zeitstempel und Kompressionsendung). Große Ergebnisse werden als Multipart-Upload gestreamt:
+Sobald ein Teil von S3_PART_SIZE Bytes gesammelt ist, wird er hochgeladen, während bereits die
+nächsten Blöcke eintreffen; bis zu S3_MAX_CONCURRENT_PARTS Teile je Objekt gleichzeitig.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from app.config.settings import settings
+from app.models.output import Output
+from app.utils.s3 import MIN_PART_SIZE, S3Client, S3Error
+
+logger = logging.getLogger(__name__)
+
+# Tag, mit dem Objekte ihrer Ausgabe zugeordnet werden (für Lebenszyklusregeln)
+OUTPUT_TAG = "data-fetch-output"
+
+# Globale Client-Instanz, wird vom Lebenszyklus der Anwendung bzw. des Schedulers verwaltet
+client: Optional[S3Client] = None
+
+# Zuletzt gesetzte Lebenszyklusregel je Bucket und Regel-ID (Präfix, Tage)
+_expiration_rules: Dict[Tuple[str, str], Tuple[str, int]] = {}
+
+
+def get_s3_client() -> S3Client:
+    """
+    Gibt den gemeinsamen Client für den Objektspeicher zurück und erstellt ihn bei Bedarf.
+
+    Returns:
+        S3Client: Der gemeinsam genutzte Client
+
+    Raises:
+        S3Error: Wenn kein Endpunkt konfiguriert ist
+    """
+    global client
+
+    if client is None or client.client.is_closed:
+        if not settings.S3_ENDPOINT_URL:
+            raise S3Error("Für Ausgaben in den Objektspeicher muss S3_ENDPOINT_URL konfiguriert sein")
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.S3_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.S3_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.S3_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        )
+        client = S3Client(
+            settings.S3_ENDPOINT_URL,
+            http_client,
+            region=settings.S3_REGION,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            max_retries=settings.S3_MAX_RETRIES
+        )
+        logger.info(f"Client für den Objektspeicher {settings.S3_ENDPOINT_URL} erstellt")
+
+    return client
+
+
+async def close_s3_client():
+    """
+    Schließt den gemeinsamen Client für den Objektspeicher und alle offenen Verbindungen.
+    """
+    global client
+
+    if client is not None:
+        await client.client.aclose()
+        client = None
+        logger.info("Client für den Objektspeicher geschlossen")
+
+
+def get_bucket(output: Output) -> str:
+    """
+    Bestimmt den Bucket einer Ausgabe.
+
+    Args:
+        output: Die Ausgabekonfiguration
+
+    Returns:
+        str: Bucket der Ausgabe oder S3_BUCKET
+    """
+    bucket = output.bucket or settings.S3_BUCKET
+    if not bucket:
+        raise S3Error(f"Für die Ausgabe '{output.name}' ist kein Bucket festgelegt")
+    return bucket
+
+
+def object_key(path: str) -> str:
+    """
+    Bestimmt den Schlüssel eines Objekts aus dem Pfad, den die Datei unter OUTPUT_DIR hätte.
+
+    Args:
+        path: Vollständiger Pfad der Datei
+
+    Returns:
+        str: Der Schlüssel
+    """
+    return os.path.relpath(path, settings.OUTPUT_DIR).replace(os.sep, "/")
+
+
+class S3UploadFile:
+    """
+    Schreibvorgang in ein Objekt mit derselben Schnittstelle wie AtomicFile. Kleine Ergebnisse
+    werden beim Abschluss mit einer Anfrage hochgeladen, größere als Multipart-Upload. Das Objekt
+    wird erst beim Abschluss sichtbar; bei einem Abbruch werden hochgeladene Teile verworfen.
+    """
+
+    def __init__(self, output: Output, path: str):
+        """
+        Args:
+            output: Die Ausgabekonfiguration
+            path: Pfad, den die Datei unter OUTPUT_DIR hätte (bestimmt den Schlüssel)
+        """
+        self.output = output
+        self.key = object_key(path)
+        self.path = path
+        self.size = 0
+        self.part_size = max(settings.S3_PART_SIZE, MIN_PART_SIZE)
+        self._client: Optional[S3Client] = None
+        self._bucket: Optional[str] = None
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: Dict[int, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(settings.S3_MAX_CONCURRENT_PARTS)
+
+    @property
+    def _headers(self) -> Dict[str, str]:
+        return {"x-amz-tagging": urlencode({OUTPUT_TAG: str(self.output.id)})}
+
+    async def open(self) -> "S3UploadFile":
+        self._client = get_s3_client()
+        self._bucket = get_bucket(self.output)
+        self.path = f"s3://{self._bucket}/{self.key}"
+        return self
+
+    async def write(self, data: bytes):
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._upload_part(part)
+
+    async def commit(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        if self._upload_id is None:
+            await self._client.put_object(self._bucket, self.key, data, headers=self._headers)
+            return
+
+        # Letzter Teil darf kleiner als MIN_PART_SIZE sein
+        if data:
+            await self._upload_part(data)
+        await asyncio.gather(*self._tasks)
+        await self._client.complete_multipart_upload(
+            self._bucket, self.key, self._upload_id, sorted(self._parts.items())
+        )
+        self._upload_id = None
+        self._tasks.clear()
+
+    async def abort(self):
+        self._buffer.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._upload_id is not None:
+            upload_id, self._upload_id = self._upload_id, None
+            try:
+                await self._client.abort_multipart_upload(self._bucket, self.key, upload_id)
+            except S3Error as e:
+                # Nicht abgeschlossene Uploads werden sonst erst von einer Lebenszyklusregel entfernt
+                logger.warning(f"Multipart-Upload von {self.path} konnte nicht abgebrochen werden: {str(e)}")
+
+    async def _upload_part(self, data: bytes):
+        if self._upload_id is None:
+            self._upload_id = await self._client.create_multipart_upload(
+                self._bucket, self.key, headers=self._headers
+            )
+        # Wartet, bis ein Platz frei ist; so sammeln sich höchstens S3_MAX_CONCURRENT_PARTS Teile im Speicher
+        await self._slots.acquire()
+        for task in self._tasks:
+            if task.done() and task.exception() is not None:
+                self._slots.release()
+                raise task.exception()
+        number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._send_part(number, data)))
+
+    async def _send_part(self, number: int, data: bytes):
+        try:
+            self._parts[number] = await self._client.upload_part(
+                self._bucket, self.key, self._upload_id, number, data
+            )
+        finally:
+            self._slots.release()
+
+
+async def apply_expiration_rule(output: Output, prefix: str) -> bool:
+    """
+    Überträgt die Aufbewahrungsdauer einer Ausgabe als Lebenszyklusregel in ihren Bucket,
+    sodass der Server abgelaufene Objekte selbst löscht. Die Regel gilt nur für Objekte mit
+    dem Präfix und dem Tag der Ausgabe und wird nur bei Änderungen neu gesetzt.
+
+    Args:
+        output: Die Ausgabekonfiguration
+        prefix: Gemeinsames Präfix der Schlüssel der Ausgabe
+
+    Returns:
+        bool: False, wenn der Objektspeicher keine Lebenszyklusregeln unterstützt
+    """
+    bucket = get_bucket(output)
+    rule_id = f"{OUTPUT_TAG}-{output.id}"
+    rule = (prefix, output.retention_days)
+    if _expiration_rules.get((bucket, rule_id)) == rule:
+        return True
+    try:
+        await get_s3_client().set_expiration_rule(
+            bucket, rule_id, prefix, output.retention_days, tags={OUTPUT_TAG: str(output.id)}
+        )
+    except S3Error as e:
+        if e.status_code not in (400, 403, 501):
+            raise
+        logger.warning(
+            f"Lebenszyklusregel für die Ausgabe '{output.name}' kann nicht gesetzt werden, "
+            f"abgelaufene Objekte werden nur bei der Bereinigung gelöscht: {str(e)}"
+        )
+        return False
+    _expiration_rules[(bucket, rule_id)] = rule
+    logger.info(f"Lebenszyklusregel für die Ausgabe '{output.name}' gesetzt ({output.retention_days} Tage)")
+    return True
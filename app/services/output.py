@@ -3,16 +3,30 @@ Dienst für die Verwaltung von Ausgabekonfigurationen.
 """
 
 import os
-import aiofiles
-from datetime import datetime
+import re
+import json
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
 from fastapi import Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict, Any, BinaryIO
+from typing import List, Optional, Dict, Any, AsyncIterable, BinaryIO, Pattern, Tuple
 
 from app.models.base import get_session
-from app.models.output import Output, OutputCreate, OutputUpdate, OutputStrategy
+from app.models.datasource import datasource_outputs
+from app.models.output import Output, OutputCreate, OutputUpdate, OutputStrategy, OutputLayout, OutputSink, FsyncPolicy
+from app.models.output_file import OutputFile
 from app.config.settings import settings
+from app.services.object_storage import apply_expiration_rule, get_bucket, get_s3_client, object_key
+from app.services.output_writer import OutputWriter, OutputWriteError
+from app.services.segments import release_segment
+from app.utils.atomic_file import fsync_paths
+from app.utils.blob_store import collect_garbage
+from app.utils.compression import EXTENSIONS, LEVELS
+from app.utils.delta import DeltaError, apply, encode, keyframe_path, read_file, write_file
+
+logger = logging.getLogger(__name__)
 
 class OutputService:
     """
@@ -22,6 +36,7 @@ class OutputService:
     def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
         self.base_output_dir = settings.OUTPUT_DIR
+        self.pending_sync: List[str] = []  # Dateien mit FsyncPolicy.BATCH, die noch synchronisiert werden müssen
     
     async def create(self, output: OutputCreate) -> Output:
         """
@@ -40,7 +55,16 @@ class OutputService:
             path=output.path,
             strategy=output.strategy,
             retention_days=output.retention_days,
-            active=output.active
+            active=output.active,
+            fsync_policy=output.fsync_policy,
+            compression=output.compression,
+            compression_level=output.compression_level,
+            layout=output.layout,
+            segment_max_mb=output.segment_max_mb,
+            segment_max_minutes=output.segment_max_minutes,
+            keyframe_interval=output.keyframe_interval,
+            sink=output.sink,
+            bucket=output.bucket
         )
         
         self.session.add(db_output)
@@ -48,8 +72,9 @@ class OutputService:
         await self.session.refresh(db_output)
         
         # Zielverzeichnis erstellen, falls es nicht existiert
-        output_dir = os.path.join(self.base_output_dir, os.path.dirname(output.path))
-        os.makedirs(output_dir, exist_ok=True)
+        if db_output.sink == OutputSink.LOCAL:
+            output_dir = os.path.join(self.base_output_dir, os.path.dirname(output.path))
+            os.makedirs(output_dir, exist_ok=True)
         
         return db_output
     
@@ -68,6 +93,21 @@ class OutputService:
         result = await self.session.execute(query)
         return result.scalars().all()
     
+    async def get_all_with_retention(self) -> List[Output]:
+        """
+        Gibt alle Ausgabekonfigurationen mit Aufbewahrungsdauer zurück (TIMESTAMP-, APPEND-
+        und DELTA-Strategie).
+        
+        Returns:
+            List[Output]: Liste von Ausgabekonfigurationen
+        """
+        query = select(Output).where(
+            Output.strategy.in_([OutputStrategy.TIMESTAMP, OutputStrategy.APPEND, OutputStrategy.DELTA]),
+            Output.retention_days.is_not(None)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+    
     async def get_by_id(self, output_id: int) -> Optional[Output]:
         """
         Gibt eine Ausgabekonfiguration anhand ihrer ID zurück.
@@ -82,6 +122,25 @@ class OutputService:
         result = await self.session.execute(query)
         return result.scalars().first()
     
+    async def get_by_datasource(self, datasource_id: int) -> List[Output]:
+        """
+        Gibt die aktiven Ausgabekonfigurationen zurück, die einer Datenquelle zugeordnet sind.
+        
+        Args:
+            datasource_id: ID der Datenquelle
+            
+        Returns:
+            List[Output]: Liste der zugeordneten Ausgabekonfigurationen
+        """
+        query = (
+            select(Output)
+            .join(datasource_outputs, datasource_outputs.c.output_id == Output.id)
+            .where(datasource_outputs.c.datasource_id == datasource_id, Output.active.is_(True))
+            .order_by(Output.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+    
     async def update(self, output_id: int, output_update: OutputUpdate) -> Output:
         """
         Aktualisiert eine Ausgabekonfiguration.
@@ -102,11 +161,44 @@ class OutputService:
         for key, value in update_data.items():
             setattr(db_output, key, value)
         
+        # Aufteilung nach Datum nur für zeitgestempelte Dateien und Segmente
+        if db_output.strategy == OutputStrategy.OVERWRITE and db_output.layout == OutputLayout.DATE:
+            if update_data.get('layout') == OutputLayout.DATE:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Bei der 'overwrite'-Strategie ist keine Aufteilung nach Datum möglich"
+                )
+            db_output.layout = OutputLayout.FLAT
+        
+        # Segmente und Deltas nur lokal, Objektspeicher nur mit Bucket
+        if db_output.sink == OutputSink.S3:
+            if db_output.strategy in (OutputStrategy.APPEND, OutputStrategy.DELTA):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Die Strategien 'append' und 'delta' sind nur für lokale Ausgaben möglich"
+                )
+            if not (db_output.bucket or settings.S3_BUCKET):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Für Ausgaben in den Objektspeicher muss ein Bucket festgelegt sein (oder S3_BUCKET)"
+                )
+        
+        # Kompressionsstufe muss zum (ggf. unveränderten) Verfahren passen
+        if db_output.compression is None:
+            db_output.compression_level = None
+        elif db_output.compression_level is not None:
+            minimum, maximum, _ = LEVELS[db_output.compression]
+            if not minimum <= db_output.compression_level <= maximum:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Die Kompressionsstufe für {db_output.compression} muss zwischen {minimum} und {maximum} liegen"
+                )
+        
         await self.session.commit()
         await self.session.refresh(db_output)
         
         # Wenn der Pfad geändert wurde, erstelle den neuen Ordner
-        if 'path' in update_data:
+        if 'path' in update_data and db_output.sink == OutputSink.LOCAL:
             output_dir = os.path.join(self.base_output_dir, os.path.dirname(db_output.path))
             os.makedirs(output_dir, exist_ok=True)
         
@@ -123,6 +215,9 @@ class OutputService:
         if not db_output:
             raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
         
+        # Einträge im Dateiindex und Zuordnungen entfernen; die Dateien selbst bleiben erhalten
+        await self.session.execute(delete(OutputFile).where(OutputFile.output_id == output_id))
+        await self.session.execute(delete(datasource_outputs).where(datasource_outputs.c.output_id == output_id))
         await self.session.delete(db_output)
         await self.session.commit()
     
@@ -141,28 +236,280 @@ class OutputService:
         if not db_output:
             raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
         
+        # Daten atomar in die Datei schreiben
+        return await self.save_data(data, db_output)
+    
+    async def save_data(self, data: Any, output: Output) -> str:
+        """
+        Speichert das Ergebnis eines Datenhandlers in einer Ausgabe.
+        
+        Args:
+            data: Die zu speichernden Daten
+            output: Die Ausgabekonfiguration
+            
+        Returns:
+            str: Pfad zur geschriebenen Datei
+            
+        Raises:
+            OutputWriteError: Wenn die Ausgabe nicht geschrieben werden konnte
+        """
+        async def single_chunk():
+            yield data
+        
+        writer, = await self.save_stream(single_chunk(), [output])
+        if not writer.success:
+            raise OutputWriteError(writer.error)
+        return writer.path
+    
+    async def save_stream(self, chunks: AsyncIterable[Any], outputs: List[Output]) -> List[OutputWriter]:
+        """
+        Schreibt die Teilergebnisse eines Datenhandlers in alle Ausgaben, sobald sie eintreffen.
+        Jedes Teilergebnis wird einmal serialisiert und gleichzeitig an alle Ausgaben übergeben
+        (höchstens OUTPUT_MAX_CONCURRENCY Schreibvorgänge zugleich); jede Ausgabe puffert bis zu
+        OUTPUT_WRITER_BUFFER_SIZE Bytes, sodass eine langsame Ausgabe die übrigen nicht aufhält. Die Daten landen zunächst in
+        einer temporären Datei im Zielverzeichnis, die erst nach dem letzten Teilergebnis atomar die
+        eigentliche Datei ersetzt. Schlägt eine Ausgabe fehl, bleibt ihre bisherige Datei erhalten
+        und die übrigen Ausgaben werden weiter geschrieben; schlägt der Handler fehl, werden alle
+        Ausgaben verworfen.
+        
+        Args:
+            chunks: Asynchroner Iterator über die Teilergebnisse
+            outputs: Die Ausgabekonfigurationen
+            
+        Returns:
+            List[OutputWriter]: Ergebnis je Ausgabe mit Pfad, Dauer, Größe und ggf. Fehler
+        """
+        now = datetime.now()
+        keyframes = {
+            output.id: await self._delta_base(output)
+            for output in outputs if output.strategy == OutputStrategy.DELTA
+        }
+        writers = [
+            OutputWriter(
+                output,
+                self._resolve_path(output, now),
+                self._fsync_policy(output) == FsyncPolicy.FILE,
+                blob_root=self._blob_root(output),
+                delta_base=self.get_file_path(keyframes[output.id]) if keyframes.get(output.id) else None
+            )
+            for output in outputs
+        ]
+        try:
+            for writer in writers:
+                await writer.open()
+            
+            # Kleine Teilergebnisse sammeln, damit nicht für jedes einzeln geschrieben wird
+            buffer = bytearray()
+            async for chunk in chunks:
+                buffer += self.serialize_chunk(chunk)
+                if len(buffer) >= settings.OUTPUT_BUFFER_SIZE:
+                    block = bytes(buffer)
+                    buffer.clear()
+                    await asyncio.gather(*(writer.put(block) for writer in writers))
+            if buffer:
+                block = bytes(buffer)
+                await asyncio.gather(*(writer.put(block) for writer in writers))
+            
+            await asyncio.gather(*(writer.close() for writer in writers))
+        except BaseException:
+            # Unvollständige Dateien verwerfen
+            for writer in writers:
+                await writer.abort()
+            raise
+        
+        for writer in writers:
+            if writer.success:
+                logger.info(
+                    f"Ausgabe '{writer.output.name}' geschrieben: {writer.path} "
+                    f"({writer.bytes_written} Bytes, {writer.duration:.3f} s, davon {writer.write_time:.3f} s Schreiben"
+                    f"{', Inhalt unverändert' if writer.deduplicated else ''})"
+                )
+                if writer.output.sink == OutputSink.LOCAL and self._fsync_policy(writer.output) == FsyncPolicy.BATCH:
+                    self.pending_sync.append(writer.path)
+        
+        # Objekte im Objektspeicher werden über ihr Präfix aufgelistet und nicht indiziert
+        await self._index_files(
+            [writer for writer in writers if writer.success and writer.output.sink == OutputSink.LOCAL],
+            now,
+            keyframes
+        )
+        return writers
+    
+    async def _index_files(
+        self,
+        writers: List[OutputWriter],
+        now: datetime,
+        keyframes: Dict[int, Optional[OutputFile]]
+    ) -> None:
+        """
+        Trägt geschriebene Dateien in den Dateiindex ein bzw. aktualisiert ihren Eintrag.
+        
+        Args:
+            writers: Die erfolgreich abgeschlossenen Schreibvorgänge
+            now: Zeitpunkt des Schreibens (wie im Dateinamen)
+            keyframes: Keyframe je Ausgabe mit DELTA-Strategie, zu dem Deltas gespeichert wurden
+        """
+        if not writers:
+            return
+        
+        paths = {os.path.relpath(writer.path, self.base_output_dir): writer for writer in writers}
+        query = select(OutputFile).where(OutputFile.path.in_(paths))
+        result = await self.session.execute(query)
+        existing = {output_file.path: output_file for output_file in result.scalars().all()}
+        
+        for path, writer in paths.items():
+            output_file = existing.get(path)
+            if output_file is None:
+                output_file = OutputFile(path=path)
+                self.session.add(output_file)
+            output_file.output_id = writer.output.id
+            output_file.size = writer.size
+            output_file.digest = writer.digest
+            output_file.base_id = keyframes[writer.output.id].id if writer.is_delta else None
+            output_file.created_at = now
+        await self.session.commit()
+    
+    async def sync_pending(self) -> None:
+        """
+        Synchronisiert alle seit dem letzten Aufruf geschriebenen Dateien mit FsyncPolicy.BATCH
+        auf den Datenträger. Sollte am Ende jedes Laufs aufgerufen werden.
+        """
+        if not self.pending_sync:
+            return
+        
+        paths, self.pending_sync = self.pending_sync, []
+        try:
+            await asyncio.to_thread(fsync_paths, paths)
+        except OSError as e:
+            logger.error(f"Fehler beim Synchronisieren der Ausgabedateien: {str(e)}")
+    
+    async def _delta_base(self, output: Output) -> Optional[OutputFile]:
+        """
+        Bestimmt den Keyframe, zu dem die nächste Version einer Ausgabe mit DELTA-Strategie
+        gespeichert wird.
+        
+        Args:
+            output: Die Ausgabekonfiguration
+            
+        Returns:
+            Optional[OutputFile]: Der Keyframe oder None, wenn ein neuer Keyframe fällig ist
+        """
+        query = (
+            select(OutputFile)
+            .where(OutputFile.output_id == output.id, OutputFile.base_id.is_(None))
+            .order_by(OutputFile.created_at.desc())
+            .limit(1)
+        )
+        result = await self.session.execute(query)
+        keyframe = result.scalars().first()
+        if keyframe is None or not os.path.exists(self.get_file_path(keyframe)):
+            return None
+        
+        query = select(func.count()).select_from(OutputFile).where(OutputFile.base_id == keyframe.id)
+        result = await self.session.execute(query)
+        interval = output.keyframe_interval or settings.OUTPUT_DELTA_KEYFRAME_INTERVAL
+        if result.scalar() + 1 >= interval:
+            return None
+        return keyframe
+    
+    def get_file_path(self, output_file: OutputFile) -> str:
+        """
+        Bestimmt den absoluten Pfad einer indizierten Datei.
+        
+        Args:
+            output_file: Die Datei
+            
+        Returns:
+            str: Der Pfad
+        """
+        return os.path.join(self.base_output_dir, output_file.path)
+    
+    def _blob_root(self, output: Output) -> Optional[str]:
+        # Zeitgestempelte Dateien mit gleichem Inhalt teilen sich einen Blob
+        if output.strategy == OutputStrategy.TIMESTAMP and output.sink == OutputSink.LOCAL and settings.OUTPUT_DEDUPLICATE:
+            return str(self.base_output_dir)
+        return None
+    
+    async def collect_blobs(self, digests: Optional[List[str]] = None) -> int:
+        """
+        Entfernt Blobs, auf die nach dem Löschen alter Dateien keine Ausgabedatei mehr verweist.
+        
+        Args:
+            digests: Nur diese Blobs prüfen (ohne Angabe wird der gesamte Blob-Speicher durchsucht)
+        
+        Returns:
+            int: Anzahl der entfernten Blobs
+        """
+        removed, freed = await asyncio.to_thread(collect_garbage, str(self.base_output_dir), digests)
+        if removed:
+            logger.info(f"{removed} nicht mehr verwendete Blobs entfernt ({freed} Bytes)")
+        return removed
+    
+    @staticmethod
+    def _fsync_policy(output: Output) -> FsyncPolicy:
+        # Einstellung der Ausgabe oder globaler Standard
+        return FsyncPolicy(output.fsync_policy or settings.OUTPUT_FSYNC_POLICY)
+    
+    @staticmethod
+    def serialize_chunk(chunk: Any) -> bytes:
+        """
+        Wandelt ein (Teil-)Ergebnis eines Datenhandlers in Bytes um.
+        Bytes und Texte werden unverändert geschrieben, alle anderen Werte als JSON-Zeile.
+        
+        Args:
+            chunk: Das Ergebnis
+            
+        Returns:
+            bytes: Die zu schreibenden Daten
+        """
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            return bytes(chunk)
+        if isinstance(chunk, str):
+            return chunk.encode("utf-8")
+        return (json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8")
+    
+    def _resolve_path(self, db_output: Output, now: Optional[datetime] = None) -> str:
+        """
+        Bestimmt den Pfad der nächsten Datei einer Ausgabe.
+        
+        Args:
+            db_output: Die Ausgabekonfiguration
+            now: Zeitpunkt für den Zeitstempel (Standard: jetzt)
+            
+        Returns:
+            str: Vollständiger Pfad der Datei
+        """
         # Vollständigen Pfad erstellen
         full_path = os.path.join(self.base_output_dir, db_output.path)
         
-        # Pfad mit Zeitstempel für die Strategie TIMESTAMP
-        if db_output.strategy == OutputStrategy.TIMESTAMP:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Pfad mit Zeitstempel für die Strategien TIMESTAMP und DELTA bzw. den Beginn eines Segments (APPEND)
+        if db_output.strategy != OutputStrategy.OVERWRITE:
+            now = now or datetime.now()
             filename, extension = os.path.splitext(full_path)
-            full_path = f"{filename}_{timestamp}{extension}"
-        
-        # Verzeichnis erstellen, falls es nicht existiert
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if db_output.layout == OutputLayout.DATE:
+                # Ein Verzeichnis je Tag, z.B. data/2024/05/17/data_120000.json
+                partition = os.path.join(filename, now.strftime("%Y/%m/%d"))
+                full_path = os.path.join(partition, f"{os.path.basename(filename)}_{now.strftime('%H%M%S')}{extension}")
+            else:
+                full_path = f"{filename}_{now.strftime('%Y%m%d_%H%M%S')}{extension}"
         
-        # Daten in die Datei schreiben
-        async with aiofiles.open(full_path, 'wb') as file:
-            await file.write(data)
+        # Endung des Kompressionsverfahrens anhängen (z.B. data.json.gz)
+        if db_output.compression:
+            full_path += EXTENSIONS[db_output.compression]
         
         return full_path
     
     async def clean_old_files(self, output_id: int) -> int:
         """
         Löscht alte Dateien basierend auf der Aufbewahrungsdauer.
-        Diese Funktion sollte regelmäßig für alle Ausgaben mit TIMESTAMP-Strategie aufgerufen werden.
+        Diese Funktion sollte regelmäßig für alle Ausgaben mit TIMESTAMP-, APPEND- oder
+        DELTA-Strategie aufgerufen werden. Bei Segmenten zählt der letzte Schreibvorgang.
+        Läuft ein Keyframe ab, von dem noch Deltas abhängen, wird zuvor die älteste dieser
+        Versionen zum neuen Keyframe und die übrigen werden auf ihn umgestellt.
+        Abgelaufene Dateien werden über den Dateiindex ermittelt, sodass der Aufwand nur von der
+        Anzahl der abgelaufenen Dateien abhängt. Blobs deduplizierter Dateien werden entfernt,
+        sobald keine Datei mehr auf sie verweist. Ausgaben im Objektspeicher werden über ihr
+        Präfix aufgelistet.
         
         Args:
             output_id: ID der Ausgabekonfiguration
@@ -174,36 +521,348 @@ class OutputService:
         if not db_output:
             raise HTTPException(status_code=404, detail="Ausgabekonfiguration nicht gefunden")
         
-        # Nur für Ausgaben mit TIMESTAMP-Strategie und definierter Aufbewahrungsdauer
-        if db_output.strategy != OutputStrategy.TIMESTAMP or not db_output.retention_days:
+        # Nur für Ausgaben mit TIMESTAMP-, APPEND- oder DELTA-Strategie und definierter Aufbewahrungsdauer
+        if db_output.strategy == OutputStrategy.OVERWRITE or not db_output.retention_days:
             return 0
         
-        # Verzeichnis und Basisnamen der Dateien bestimmen
-        output_dir = os.path.dirname(os.path.join(self.base_output_dir, db_output.path))
-        base_filename = os.path.basename(db_output.path)
-        filename, extension = os.path.splitext(base_filename)
+        cutoff = datetime.now() - timedelta(days=db_output.retention_days)
         
-        # Alle Dateien im Verzeichnis durchgehen
+        if db_output.sink == OutputSink.S3:
+            return await self._clean_objects(db_output, cutoff)
+        
+        # Ein seit der Aufbewahrungsdauer nicht mehr beschriebenes Segment vor dem Löschen schließen
+        if db_output.strategy == OutputStrategy.APPEND:
+            await release_segment(db_output.id, before=cutoff)
+        
+        # Abgelaufene Keyframes durch die ältesten verbleibenden Versionen ersetzen
+        if db_output.strategy == OutputStrategy.DELTA:
+            await self._rebase_deltas(db_output, cutoff)
         deleted_count = 0
-        now = datetime.now()
+        digests = []
+        
+        # Vollständig abgelaufene Tage werden je Tagesverzeichnis auf einmal entfernt
+        if db_output.layout == OutputLayout.DATE:
+            deleted_count, digests = await self._drop_partitions(db_output, cutoff)
+        
+        # Übrige abgelaufene Dateien (angebrochener Tag, Dateien aus der flachen Struktur) einzeln löschen
+        query = (
+            select(OutputFile)
+            .where(OutputFile.output_id == output_id, OutputFile.created_at < cutoff)
+            .order_by(OutputFile.created_at)
+        )
+        result = await self.session.execute(query)
+        expired = result.scalars().all()
+        
+        deleted_ids = []
+        for output_file in expired:
+            try:
+                os.remove(os.path.join(self.base_output_dir, output_file.path))
+                deleted_count += 1
+            except FileNotFoundError:
+                # Bereits manuell entfernt; nur der Indexeintrag wird gelöscht
+                pass
+            except OSError as e:
+                logger.error(f"Fehler beim Löschen der Datei {output_file.path}: {str(e)}")
+                continue
+            deleted_ids.append(output_file.id)
+        
+        if deleted_ids:
+            await self.session.execute(delete(OutputFile).where(OutputFile.id.in_(deleted_ids)))
+            await self.session.commit()
+        
+        digests += [output_file.digest for output_file in expired if output_file.digest]
+        if digests:
+            await self.collect_blobs(digests)
+        
+        return deleted_count
+    
+    def _object_pattern(self, db_output: Output) -> Tuple[str, Pattern]:
+        """
+        Bestimmt das gemeinsame Präfix der Objekte einer Ausgabe und das Muster ihrer Schlüssel
+        (wie bei _resolve_path), damit Objekte anderer Ausgaben mit ähnlichem Namen unberührt bleiben.
         
-        for file in os.listdir(output_dir):
-            if file.startswith(filename) and file.endswith(extension) and "_" in file:
-                # Extrahiere den Zeitstempel aus dem Dateinamen
-                try:
-                    timestamp_str = file.replace(filename + "_", "").replace(extension, "")
-                    file_timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    
-                    # Berechne das Alter der Datei in Tagen
-                    age_days = (now - file_timestamp).days
-                    
-                    # Lösche Dateien, die älter als die Aufbewahrungsdauer sind
-                    if age_days > db_output.retention_days:
-                        file_path = os.path.join(output_dir, file)
-                        os.remove(file_path)
-                        deleted_count += 1
-                except (ValueError, Exception):
-                    # Bei Fehlern (z.B. unpassender Dateiname) überspringen
-                    continue
-        
-        return deleted_count
\ No newline at end of file
+        Args:
+            db_output: Die Ausgabekonfiguration
+            
+        Returns:
+            Tuple[str, Pattern]: Präfix und Muster der Schlüssel
+        """
+        filename, extension = os.path.splitext(os.path.join(self.base_output_dir, db_output.path))
+        root = object_key(filename)
+        compression = "(?:" + "|".join(re.escape(ext) for ext in EXTENSIONS.values()) + ")?"
+        if db_output.layout == OutputLayout.DATE:
+            prefix = root + "/"
+            name = re.escape(os.path.basename(filename)) + r"_\d{6}"
+            pattern = re.escape(prefix) + r"\d{4}/\d{2}/\d{2}/" + name
+        else:
+            prefix = root + "_"
+            pattern = re.escape(prefix) + r"\d{8}_\d{6}"
+        return prefix, re.compile(pattern + re.escape(extension) + compression)
+    
+    async def _clean_objects(self, db_output: Output, cutoff: datetime) -> int:
+        """
+        Löscht abgelaufene Objekte einer Ausgabe im Objektspeicher. Die Aufbewahrungsdauer wird
+        zusätzlich als Lebenszyklusregel gesetzt, sodass der Server abgelaufene Objekte selbst
+        entfernt; die Auflistung nach Präfix löscht, was die Regel (noch) nicht erfasst hat.
+        
+        Args:
+            db_output: Die Ausgabekonfiguration
+            cutoff: Objekte vor diesem Zeitpunkt sind abgelaufen
+            
+        Returns:
+            int: Anzahl der gelöschten Objekte
+        """
+        prefix, pattern = self._object_pattern(db_output)
+        bucket = get_bucket(db_output)
+        await apply_expiration_rule(db_output, prefix)
+        
+        client = get_s3_client()
+        cutoff = cutoff.astimezone(timezone.utc)
+        expired = [
+            obj.key async for obj in client.list_objects(bucket, prefix)
+            if obj.last_modified < cutoff and pattern.fullmatch(obj.key)
+        ]
+        if not expired:
+            return 0
+        return await client.delete_objects(bucket, expired)
+    
+    async def _drop_partitions(self, db_output: Output, cutoff: datetime) -> Tuple[int, List[str]]:
+        """
+        Entfernt die Dateien vollständig abgelaufener Tage einer nach Datum aufgeteilten Ausgabe,
+        je Tag mit einem Aufruf samt ihrer Indexeinträge. Ausgaben mit gleichem Pfad ohne Endung
+        (z.B. feed.json und feed.csv) teilen sich die Tagesverzeichnisse; gelöscht werden daher nur
+        die im Index erfassten Dateien dieser Ausgabe und anschließend leere Verzeichnisse.
+        
+        Args:
+            db_output: Die Ausgabekonfiguration
+            cutoff: Dateien vor diesem Zeitpunkt sind abgelaufen
+            
+        Returns:
+            Tuple[int, List[str]]: Anzahl der gelöschten Dateien und Hashes ihrer Blobs
+        """
+        root = os.path.splitext(db_output.path)[0]
+        boundary = datetime.combine(cutoff.date(), time.min)
+        conditions = [
+            OutputFile.output_id == db_output.id,
+            OutputFile.created_at < boundary,
+            OutputFile.path.startswith(root + os.sep, autoescape=True),
+        ]
+        query = select(func.date(OutputFile.created_at)).where(*conditions).distinct()
+        result = await self.session.execute(query)
+        days = sorted(date.fromisoformat(day) for day in result.scalars().all())
+        
+        deleted_count = 0
+        digests = []
+        for day in days:
+            start = datetime.combine(day, time.min)
+            day_conditions = conditions + [OutputFile.created_at >= start, OutputFile.created_at < start + timedelta(days=1)]
+            partition = os.path.join(self.base_output_dir, root, day.strftime("%Y/%m/%d"))
+            
+            result = await self.session.execute(select(OutputFile.path, OutputFile.digest).where(*day_conditions))
+            files = result.all()
+            failed = await asyncio.to_thread(
+                self._remove_partition_files,
+                partition,
+                [os.path.join(self.base_output_dir, path) for path, _ in files]
+            )
+            for path, error in failed:
+                logger.error(f"Fehler beim Löschen der Datei {path}: {error}")
+            
+            # Indexeinträge nicht gelöschter Dateien bleiben für den nächsten Lauf erhalten
+            failed_paths = {os.path.relpath(path, self.base_output_dir) for path, _ in failed}
+            removed = [(path, digest) for path, digest in files if path not in failed_paths]
+            if not removed:
+                continue
+            digests += {digest for _, digest in removed if digest}
+            result = await self.session.execute(
+                delete(OutputFile).where(*day_conditions, OutputFile.path.in_([path for path, _ in removed]))
+            )
+            deleted_count += result.rowcount
+            await self.session.commit()
+            logger.info(f"{len(removed)} Dateien der Ausgabe '{db_output.name}' aus {partition} entfernt")
+        
+        return deleted_count, digests
+    
+    @staticmethod
+    def _remove_partition_files(partition: str, paths: List[str]) -> List[Tuple[str, str]]:
+        """
+        Löscht Dateien eines Tagesverzeichnisses und danach das Tages-, Monats- und
+        Jahresverzeichnis, soweit sie leer sind.
+        
+        Args:
+            partition: Das Tagesverzeichnis
+            paths: Vollständige Pfade der zu löschenden Dateien
+            
+        Returns:
+            List[Tuple[str, str]]: Nicht gelöschte Dateien mit Fehlermeldung
+        """
+        failed = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Bereits manuell entfernt; nur der Indexeintrag wird gelöscht
+                pass
+            except OSError as e:
+                failed.append((path, str(e)))
+        
+        # Verzeichnisse mit Dateien anderer Ausgaben bleiben bestehen
+        for directory in (partition, os.path.dirname(partition), os.path.dirname(os.path.dirname(partition))):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+        return failed
+    
+    async def _rebase_deltas(self, db_output: Output, cutoff: datetime) -> int:
+        """
+        Ersetzt abgelaufene Keyframes, von denen noch nicht abgelaufene Deltas abhängen: Die
+        älteste dieser Versionen wird vollständig gespeichert und die übrigen werden als Delta
+        zu ihr neu kodiert. Die abgelaufenen Dateien werden anschließend normal gelöscht.
+        
+        Args:
+            db_output: Die Ausgabekonfiguration
+            cutoff: Dateien vor diesem Zeitpunkt sind abgelaufen
+            
+        Returns:
+            int: Anzahl der neu geschriebenen Keyframes
+        """
+        query = select(OutputFile).where(
+            OutputFile.output_id == db_output.id,
+            OutputFile.base_id.is_(None),
+            OutputFile.created_at < cutoff
+        )
+        result = await self.session.execute(query)
+        expired_keyframes = result.scalars().all()
+        
+        fsync = self._fsync_policy(db_output) != FsyncPolicy.NONE
+        rebased = 0
+        for keyframe in expired_keyframes:
+            query = (
+                select(OutputFile)
+                .where(OutputFile.base_id == keyframe.id, OutputFile.created_at >= cutoff)
+                .order_by(OutputFile.created_at)
+            )
+            result = await self.session.execute(query)
+            dependents = result.scalars().all()
+            if not dependents:
+                continue
+            
+            try:
+                base = await asyncio.to_thread(read_file, self.get_file_path(keyframe))
+            except FileNotFoundError:
+                # Die Deltas sind ohne ihren Keyframe ohnehin nicht mehr wiederherstellbar
+                logger.error(f"Keyframe {keyframe.path} der Ausgabe '{db_output.name}' fehlt, {len(dependents)} Deltas können nicht umgestellt werden")
+                continue
+            first, others = dependents[0], dependents[1:]
+            
+            # Älteste verbleibende Version als neuen Keyframe speichern
+            content = await self._reconstruct(base, first)
+            old_path = self.get_file_path(first)
+            new_path = keyframe_path(old_path)
+            first.size = await write_file(new_path, content, fsync=fsync, level=db_output.compression_level)
+            first.path = os.path.relpath(new_path, self.base_output_dir)
+            first.base_id = None
+            await self.session.commit()
+            os.remove(old_path)
+            
+            # Übrige Deltas auf den neuen Keyframe umstellen
+            for output_file in others:
+                version = await self._reconstruct(base, output_file)
+                delta = await asyncio.to_thread(encode, content, version)
+                output_file.size = await write_file(
+                    self.get_file_path(output_file), delta, fsync=fsync, level=db_output.compression_level
+                )
+                output_file.base_id = first.id
+                await self.session.commit()
+            
+            rebased += 1
+            logger.info(
+                f"Keyframe {keyframe.path} der Ausgabe '{db_output.name}' abgelaufen, "
+                f"{first.path} ist neuer Keyframe für {len(others)} Deltas"
+            )
+        return rebased
+    
+    async def _reconstruct(self, base: bytes, output_file: OutputFile) -> bytes:
+        # Version aus dem Inhalt ihres Keyframes und ihrem Delta wiederherstellen
+        data = await asyncio.to_thread(read_file, self.get_file_path(output_file))
+        return await asyncio.to_thread(apply, base, data)
+    
+    async def get_files(self, output_id: int, skip: int = 0, limit: int = 100) -> List[OutputFile]:
+        """
+        Gibt die geschriebenen Dateien einer Ausgabe zurück, die neuesten zuerst.
+        
+        Args:
+            output_id: ID der Ausgabekonfiguration
+            skip: Anzahl der zu überspringenden Datensätze
+            limit: Maximale Anzahl der zurückzugebenden Datensätze
+            
+        Returns:
+            List[OutputFile]: Liste der Dateien
+        """
+        query = (
+            select(OutputFile)
+            .where(OutputFile.output_id == output_id)
+            .order_by(OutputFile.created_at.desc(), OutputFile.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+    
+    async def get_file(self, output_id: int, file_id: int) -> OutputFile:
+        """
+        Gibt eine geschriebene Datei einer Ausgabe zurück.
+        
+        Args:
+            output_id: ID der Ausgabekonfiguration
+            file_id: ID der Datei
+            
+        Returns:
+            OutputFile: Die Datei
+        """
+        output_file = await self.session.get(OutputFile, file_id)
+        if output_file is None or output_file.output_id != output_id:
+            raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+        return output_file
+    
+    async def get_latest_file(self, output_id: int) -> OutputFile:
+        """
+        Gibt die zuletzt geschriebene Datei einer Ausgabe zurück.
+        
+        Args:
+            output_id: ID der Ausgabekonfiguration
+            
+        Returns:
+            OutputFile: Die Datei
+        """
+        files = await self.get_files(output_id, limit=1)
+        if not files:
+            raise HTTPException(status_code=404, detail="Für diese Ausgabe wurde noch keine Datei geschrieben")
+        return files[0]
+    
+    async def read_version(self, output_id: int, file_id: int) -> bytes:
+        """
+        Liest eine gespeicherte Version einer Ausgabe entpackt und, falls sie als Delta
+        gespeichert ist, aus ihrem Keyframe wiederhergestellt.
+        
+        Args:
+            output_id: ID der Ausgabekonfiguration
+            file_id: ID der Datei
+            
+        Returns:
+            bytes: Der Inhalt der Version
+        """
+        output_file = await self.get_file(output_id, file_id)
+        
+        try:
+            if output_file.base_id is None:
+                return await asyncio.to_thread(read_file, self.get_file_path(output_file))
+            
+            keyframe = await self.session.get(OutputFile, output_file.base_id)
+            base = await asyncio.to_thread(read_file, self.get_file_path(keyframe))
+            return await self._reconstruct(base, output_file)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Datei nicht mehr vorhanden")
+        except DeltaError as e:
+            raise HTTPException(status_code=500, detail=f"Version kann nicht wiederhergestellt werden: {str(e)}")
@@ -0,0 +1,229 @@
+"""
+Nebenläufiges Schreiben eines Ergebnisses in mehrere Ausgaben.
+Jede Ausgabe erhält einen eigenen Schreib-Task mit einem eigenen, auf
+OUTPUT_WRITER_BUFFER_SIZE Bytes begrenzten Puffer, sodass die Ausgaben parallel geschrieben werden,
+eine langsame Ausgabe die anderen nicht ausbremst und ein Fehler einer Ausgabe die anderen nicht
+betrifft.
+Die Daten werden nur einmal serialisiert und als gemeinsame Blöcke an alle Ausgaben verteilt.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Dict, Optional
+
+from app.config.settings import settings
+from app.models.output import Output, OutputSink, OutputStrategy
+from app.services.object_storage import S3UploadFile
+from app.services.segments import SegmentFile
+from app.utils.atomic_file import AtomicFile
+from app.utils.blob_store import ContentAddressedFile
+from app.utils.compression import Compressor
+from app.utils.delta import DeltaFile
+
+logger = logging.getLogger(__name__)
+
+# Begrenzt die Anzahl gleichzeitiger Schreibvorgänge (je Event-Loop)
+_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(settings.OUTPUT_MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+
+class OutputWriteError(Exception):
+    """
+    Wird ausgelöst, wenn eine Ausgabe nicht geschrieben werden konnte.
+    """
+
+
+class OutputWriter:
+    """
+    Schreibt Blöcke eines Ergebnisses in eine Ausgabe und erfasst Dauer und Fehler.
+    """
+
+    def __init__(
+        self,
+        output: Output,
+        path: str,
+        fsync: bool,
+        blob_root: Optional[str] = None,
+        delta_base: Optional[str] = None
+    ):
+        """
+        Args:
+            output: Die Ausgabekonfiguration
+            path: Pfad der zu schreibenden Datei
+            fsync: Ob die Datei beim Abschluss synchronisiert wird
+            blob_root: Verzeichnis des Blob-Speichers, wenn identische Inhalte dedupliziert werden
+            delta_base: Pfad des Keyframes, zu dem ein Delta gespeichert werden soll
+        """
+        self.output = output
+        self.path = path
+        self.compressor: Optional[Compressor] = None
+        if output.sink == OutputSink.S3:
+            # Objekt im Objektspeicher statt einer Datei unter OUTPUT_DIR
+            self.file = S3UploadFile(output, path)
+        elif output.strategy == OutputStrategy.APPEND:
+            # Das Segment komprimiert die gesammelten Daten selbst
+            self.file = SegmentFile(output, path, fsync=fsync)
+        elif output.strategy == OutputStrategy.DELTA:
+            # Keyframe bzw. Delta wird erst beim Abschluss erstellt und komprimiert
+            self.file = DeltaFile(
+                path,
+                base_path=delta_base,
+                max_ratio=settings.OUTPUT_DELTA_MAX_RATIO,
+                fsync=fsync,
+                level=output.compression_level
+            )
+        elif blob_root is None:
+            self.file = AtomicFile(path, fsync=fsync)
+        else:
+            self.file = ContentAddressedFile(path, blob_root, fsync=fsync)
+        self.error: Optional[str] = None
+        self.bytes_written = 0
+        self.duration = 0.0  # Sekunden vom Öffnen bis zum Abschluss
+        self.write_time = 0.0  # Sekunden, in denen tatsächlich komprimiert und geschrieben wurde
+        self._started = 0.0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = 0  # Bytes in der Warteschlange, die noch nicht geschrieben wurden
+        self._drained = asyncio.Event()  # Wird gesetzt, sobald ein Block geschrieben wurde
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    @property
+    def deduplicated(self) -> bool:
+        # Ob die Datei als Hardlink auf einen vorhandenen Blob angelegt wurde
+        return getattr(self.file, "deduplicated", False)
+
+    @property
+    def size(self) -> int:
+        # Größe der Datei; bei Segmenten einschließlich früherer Läufe
+        return getattr(self.file, "size", self.bytes_written)
+
+    @property
+    def is_delta(self) -> bool:
+        # Ob die Version als Delta zu einem Keyframe gespeichert wurde
+        return getattr(self.file, "is_delta", False)
+
+    @property
+    def digest(self) -> Optional[str]:
+        # SHA-256 des Inhalts (nur bei Ausgaben mit Blob-Speicher)
+        return getattr(self.file, "digest", None)
+
+    async def open(self) -> "OutputWriter":
+        """
+        Öffnet die Datei und startet den Schreib-Task. Fehler werden in error vermerkt.
+
+        Returns:
+            OutputWriter: Der Writer
+        """
+        self._started = time.perf_counter()
+        try:
+            if self.output.compression and self.output.strategy not in (OutputStrategy.APPEND, OutputStrategy.DELTA):
+                self.compressor = Compressor(self.output.compression, self.output.compression_level)
+            if self.output.sink != OutputSink.S3:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            await self.file.open()
+            self.path = self.file.path
+        except Exception as e:
+            self._fail(e)
+            return self
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def put(self, block: bytes):
+        """
+        Übergibt einen Block zum Schreiben. Ist der Puffer der Ausgabe voll, wird gewartet, bis
+        genügend Blöcke geschrieben wurden. Fehlgeschlagene Ausgaben ignorieren weitere Blöcke.
+
+        Args:
+            block: Der Block (wird von allen Ausgaben gemeinsam verwendet und nicht verändert)
+        """
+        # Ein einzelner Block wird auch dann angenommen, wenn er größer als der Puffer ist
+        while self._pending and self._pending + len(block) > settings.OUTPUT_WRITER_BUFFER_SIZE:
+            if self._task is None or not self.success:
+                break
+            self._drained.clear()
+            await self._drained.wait()
+        if self._task is not None and self.success:
+            self._pending += len(block)
+            self._queue.put_nowait(block)
+
+    async def close(self):
+        """
+        Schreibt die restlichen Blöcke und ersetzt die Zieldatei.
+        """
+        if self._task is None:
+            return
+        if self.success:
+            self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self.duration = time.perf_counter() - self._started
+
+    async def abort(self):
+        """
+        Bricht das Schreiben ab und verwirft die temporäre Datei.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except BaseException:
+                pass
+            self._task = None
+        await self.file.abort()
+
+    async def _run(self):
+        try:
+            while True:
+                block = await self._queue.get()
+                async with _get_semaphore():
+                    started = time.perf_counter()
+                    if block is None:
+                        await self._write(b"", final=True)
+                        await self.file.commit()
+                        # Deltas erhalten ihren Pfad erst beim Abschluss
+                        self.path = self.file.path
+                    else:
+                        await self._write(block)
+                        self._pending -= len(block)
+                        self._drained.set()
+                    self.write_time += time.perf_counter() - started
+                if block is None:
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(e)
+            await self.file.abort()
+            # Wartende Blöcke verwerfen und den Leser wecken, damit er nicht an einem vollen Puffer hängen bleibt
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._pending = 0
+            self._drained.set()
+
+    async def _write(self, block: bytes, final: bool = False):
+        if self.compressor is None:
+            data = block
+        elif final:
+            data = await asyncio.to_thread(lambda: self.compressor.compress(block) + self.compressor.flush())
+        else:
+            data = await asyncio.to_thread(self.compressor.compress, block)
+        if data:
+            await self.file.write(data)
+            self.bytes_written += len(data)
+
+    def _fail(self, error: Exception):
+        self.error = f"{type(error).__name__}: {str(error)}"
+        self.duration = time.perf_counter() - self._started
+        logger.error(f"Fehler beim Schreiben der Ausgabe '{self.output.name}' ({self.path}): {self.error}")
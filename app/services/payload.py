@@ -0,0 +1,146 @@
+"""
+Abgerufene Nutzdaten einer Datenquelle.
+Die Daten werden blockweise gelesen und entweder im Speicher gehalten oder in eine
+Spill-Datei unter TEMP_DIR geschrieben, sodass der Speicherbedarf des Workers
+unabhängig von der Größe der Antwort begrenzt bleibt.
+"""
+
+import io
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+import aiofiles
+import httpx
+from loguru import logger
+
+from app.config.settings import settings
+from app.utils.hashing import new_hasher
+
+
+class PayloadTooLargeError(Exception):
+    """
+    Wird ausgelöst, wenn die Antwort die maximale Größe der Datenquelle überschreitet.
+    """
+
+
+class Payload:
+    """
+    Nutzdaten eines Abrufs, entweder im Speicher oder als Spill-Datei.
+    Die Dekodierung in Text erfolgt erst bei Bedarf.
+    """
+
+    def __init__(
+        self,
+        content: Optional[bytes] = None,
+        path: Optional[str] = None,
+        size: int = 0,
+        digest: Optional[str] = None,
+        encoding: str = "utf-8"
+    ):
+        """
+        Initialisiert die Nutzdaten.
+
+        Args:
+            content: Die Daten im Speicher (None bei Spill-Datei)
+            path: Pfad zur Spill-Datei (None bei Daten im Speicher)
+            size: Größe der Daten in Bytes
+            digest: Digest der Daten
+            encoding: Zeichenkodierung für die Dekodierung in Text
+        """
+        self.content = content
+        self.path = path
+        self.size = size
+        self.digest = digest
+        self.encoding = encoding
+
+    def open(self) -> BinaryIO:
+        """
+        Öffnet die Daten zum blockweisen Lesen.
+
+        Returns:
+            BinaryIO: Ein Datei-Handle auf die Spill-Datei oder ein Puffer im Speicher
+        """
+        if self.path is not None:
+            return open(self.path, "rb")
+        return io.BytesIO(self.content or b"")
+
+    def text(self) -> str:
+        """
+        Dekodiert die Daten vollständig in Text.
+
+        Returns:
+            str: Die dekodierten Daten
+        """
+        with self.open() as f:
+            return f.read().decode(self.encoding, errors="replace")
+
+    def cleanup(self):
+        """
+        Löscht die Spill-Datei, falls vorhanden.
+        """
+        if self.path is None:
+            return
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Fehler beim Löschen der Spill-Datei {self.path}: {e}")
+        self.path = None
+
+
+async def read_payload(response: httpx.Response, max_size: int, spill: bool = False) -> Payload:
+    """
+    Liest den Body einer gestreamten Antwort blockweise ein.
+
+    Args:
+        response: Die gestreamte Antwort (aus client.stream())
+        max_size: Maximale Größe der Daten in Bytes
+        spill: Ob die Daten in eine Spill-Datei unter TEMP_DIR geschrieben werden sollen
+
+    Returns:
+        Payload: Die gelesenen Nutzdaten
+
+    Raises:
+        PayloadTooLargeError: Wenn die Antwort größer als max_size ist
+    """
+    # Zu große Antworten bereits anhand des Content-Length-Headers ablehnen
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise PayloadTooLargeError(
+            f"Antwort ist mit {content_length} Bytes größer als das Limit von {max_size} Bytes"
+        )
+
+    hasher = new_hasher()
+    size = 0
+    encoding = response.charset_encoding or "utf-8"
+
+    if not spill:
+        chunks = []
+        async for chunk in response.aiter_bytes(settings.FETCH_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise PayloadTooLargeError(f"Antwort überschreitet das Limit von {max_size} Bytes")
+            hasher.update(chunk)
+            chunks.append(chunk)
+        return Payload(content=b"".join(chunks), size=size, digest=hasher.hexdigest(), encoding=encoding)
+
+    os.makedirs(settings.TEMP_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".payload", dir=settings.TEMP_DIR)
+    os.close(fd)
+
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in response.aiter_bytes(settings.FETCH_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise PayloadTooLargeError(f"Antwort überschreitet das Limit von {max_size} Bytes")
+                hasher.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    return Payload(path=path, size=size, digest=hasher.hexdigest(), encoding=encoding)
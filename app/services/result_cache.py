@@ -0,0 +1,365 @@
+"""
+Cache für Ergebnisse von Datenhandlern.
+Ergebnisse werden nach (Skript-Digest, Eingabe-Digest) indiziert, sodass identische Eingaben
+für dasselbe Skript nicht erneut in der Sandbox verarbeitet werden müssen. Der Cache besteht
+aus einer LRU-Stufe im Speicher und einer Stufe auf der Festplatte unter TEMP_DIR, die auch
+einen Neustart der Anwendung überdauert. Beide Stufen sind in Größe und Alter begrenzt.
+
+Die Ergebnisse werden in der Binärkodierung der Sandbox gespeichert; jeder Treffer liefert
+daher eine eigene Kopie, die der Aufrufer gefahrlos verändern kann.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import aiofiles
+
+from app.config.settings import settings
+from app.sandbox import binary
+
+logger = logging.getLogger(__name__)
+
+# Kennzeichnung gespeicherter Ergebnisse: ein einzelnes Ergebnis oder eine Folge von Teilergebnissen
+_SINGLE = b"D"
+_STREAMED = b"S"
+
+# Dateiendung der Einträge auf der Festplatte
+_SUFFIX = ".bin"
+
+
+class CachedResult:
+    """
+    Ein zwischengespeichertes Ergebnis.
+    """
+
+    def __init__(self, blob: bytes):
+        """
+        Args:
+            blob: Kennzeichnung und kodierte Werte
+        """
+        self.blob = blob
+
+    @property
+    def streamed(self) -> bool:
+        return self.blob[:1] == _STREAMED
+
+    def chunks(self) -> Iterator[Any]:
+        """
+        Dekodiert die gespeicherten Werte (bei einzelnen Ergebnissen genau einen).
+
+        Returns:
+            Iterator über die Werte
+        """
+        return binary.iter_loads(memoryview(self.blob)[1:])
+
+    def value(self) -> Any:
+        """
+        Dekodiert das Ergebnis; Teilergebnisse werden als Liste zurückgegeben.
+
+        Returns:
+            Das Ergebnis
+        """
+        chunks = list(self.chunks())
+        return chunks if self.streamed else chunks[0]
+
+
+class ResultRecorder:
+    """
+    Kodiert die Teilergebnisse einer laufenden Ausführung für den Cache.
+    Überschreiten sie die maximale Eintragsgröße, wird die Aufzeichnung abgebrochen.
+    """
+
+    def __init__(self, max_size: int, streamed: bool = True):
+        """
+        Args:
+            max_size: Maximale Größe eines Eintrags in Bytes
+            streamed: Ob eine Folge von Teilergebnissen aufgezeichnet wird
+        """
+        self.max_size = max_size
+        self._buffer: Optional[bytearray] = bytearray(_STREAMED if streamed else _SINGLE)
+
+    @property
+    def active(self) -> bool:
+        return self._buffer is not None
+
+    def add(self, value: Any):
+        """
+        Zeichnet einen Wert auf.
+
+        Args:
+            value: Das (Teil-)Ergebnis
+        """
+        if self._buffer is None:
+            return
+        try:
+            self._buffer += binary.dumps(value)
+        except (binary.BinaryEncodingError, RecursionError):
+            self._buffer = None
+            return
+        if len(self._buffer) > self.max_size:
+            self._buffer = None
+
+    def result(self) -> Optional[CachedResult]:
+        """
+        Returns:
+            Das aufgezeichnete Ergebnis oder None, wenn es nicht zwischengespeichert werden kann
+        """
+        if self._buffer is None:
+            return None
+        return CachedResult(bytes(self._buffer))
+
+
+class ResultCache:
+    """
+    Zweistufiger Ergebnis-Cache (Speicher und Festplatte) mit Größen- und Altersgrenzen.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_entries: int,
+        max_memory_bytes: int,
+        max_disk_bytes: int,
+        max_entry_bytes: int,
+        max_age: float
+    ):
+        """
+        Args:
+            directory: Verzeichnis der Festplattenstufe
+            max_entries: Maximale Anzahl von Einträgen im Speicher
+            max_memory_bytes: Maximale Größe aller Einträge im Speicher
+            max_disk_bytes: Maximale Größe aller Einträge auf der Festplatte
+            max_entry_bytes: Maximale Größe eines einzelnen Eintrags
+            max_age: Maximales Alter eines Eintrags in Sekunden
+        """
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_age = max_age
+
+        # Speicherstufe: Schlüssel -> (Zeitpunkt der Erstellung, Eintrag)
+        self._memory: "OrderedDict[str, Tuple[float, CachedResult]]" = OrderedDict()
+        self._memory_bytes = 0
+        # Index der Festplattenstufe: Schlüssel -> (Zeitpunkt der Erstellung, Größe); wird beim ersten Zugriff geladen
+        self._disk: Optional["OrderedDict[str, Tuple[float, int]]"] = None
+        self._disk_bytes = 0
+
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def make_key(script_digest: str, input_digest: str) -> str:
+        """
+        Bildet den Cache-Schlüssel für ein Skript und eine Eingabe.
+
+        Args:
+            script_digest: Digest des Skripts
+            input_digest: Digest der Eingabedaten
+
+        Returns:
+            Der Schlüssel
+        """
+        return f"{script_digest}-{input_digest}"
+
+    def recorder(self, streamed: bool = True) -> ResultRecorder:
+        """
+        Erstellt einen Recorder für das Ergebnis einer laufenden Ausführung.
+
+        Args:
+            streamed: Ob eine Folge von Teilergebnissen aufgezeichnet wird
+
+        Returns:
+            ResultRecorder: Der Recorder
+        """
+        return ResultRecorder(self.max_entry_bytes, streamed)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.max_age
+
+    def _load_disk_index(self) -> "OrderedDict[str, Tuple[float, int]]":
+        if self._disk is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(_SUFFIX)], stat.st_size))
+            entries.sort()
+            self._disk = OrderedDict((key, (mtime, size)) for mtime, key, size in entries)
+            self._disk_bytes = sum(size for _, _, size in entries)
+        return self._disk
+
+    def _remember(self, key: str, created_at: float, entry: CachedResult):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[1].blob)
+        self._memory[key] = (created_at, entry)
+        self._memory_bytes += len(entry.blob)
+        while self._memory and (
+            len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.blob)
+            self.counters["evictions"] += 1
+
+    def _forget_disk(self, key: str):
+        _, size = self._disk.pop(key)
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def get(self, key: str) -> Optional[CachedResult]:
+        """
+        Sucht ein Ergebnis zuerst im Speicher und dann auf der Festplatte.
+
+        Args:
+            key: Der Cache-Schlüssel
+
+        Returns:
+            Das Ergebnis oder None bei einem Fehlschlag
+        """
+        cached = self._memory.get(key)
+        if cached is not None:
+            created_at, entry = cached
+            if not self._expired(created_at):
+                self._memory.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["memory_hits"] += 1
+                return entry
+            self._memory_bytes -= len(self._memory.pop(key)[1].blob)
+            self.counters["expirations"] += 1
+
+        disk = self._load_disk_index()
+        if key in disk:
+            created_at, _ = disk[key]
+            if self._expired(created_at):
+                self._forget_disk(key)
+                self.counters["expirations"] += 1
+            else:
+                try:
+                    async with aiofiles.open(self._path(key), "rb") as file:
+                        entry = CachedResult(await file.read())
+                except OSError:
+                    self._forget_disk(key)
+                else:
+                    self._remember(key, created_at, entry)
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                    return entry
+
+        self.counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, entry: Optional[CachedResult]):
+        """
+        Speichert ein Ergebnis im Speicher und auf der Festplatte.
+
+        Args:
+            key: Der Cache-Schlüssel
+            entry: Das Ergebnis oder None, wenn es nicht zwischengespeichert werden kann
+        """
+        if entry is None or len(entry.blob) > self.max_entry_bytes:
+            self.counters["skipped"] += 1
+            return
+
+        created_at = time.time()
+        self._remember(key, created_at, entry)
+        self.counters["stores"] += 1
+
+        disk = self._load_disk_index()
+        path = self._path(key)
+        try:
+            async with aiofiles.open(f"{path}.tmp", "wb") as file:
+                await file.write(entry.blob)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Ergebnis konnte nicht im Cache gespeichert werden: {str(e)}")
+            return
+
+        if key in disk:
+            self._disk_bytes -= disk.pop(key)[1]
+        disk[key] = (created_at, len(entry.blob))
+        self._disk_bytes += len(entry.blob)
+
+        # Älteste Einträge entfernen, bis die Größengrenze eingehalten wird
+        while disk and self._disk_bytes > self.max_disk_bytes:
+            self._forget_disk(next(iter(disk)))
+            self.counters["evictions"] += 1
+
+    def purge_expired(self) -> int:
+        """
+        Entfernt abgelaufene Einträge aus beiden Stufen.
+
+        Returns:
+            int: Anzahl der entfernten Einträge
+        """
+        removed = 0
+        for key in [key for key, (created_at, _) in self._memory.items() if self._expired(created_at)]:
+            self._memory_bytes -= len(self._memory.pop(key)[1].blob)
+            removed += 1
+
+        disk = self._load_disk_index()
+        # Der Index ist nach Erstellungszeit sortiert
+        while disk and self._expired(next(iter(disk.values()))[0]):
+            self._forget_disk(next(iter(disk)))
+            removed += 1
+
+        self.counters["expirations"] += removed
+        return removed
+
+    def clear(self):
+        """
+        Leert beide Stufen des Caches.
+        """
+        self._memory.clear()
+        self._memory_bytes = 0
+        disk = self._load_disk_index()
+        for key in list(disk):
+            self._forget_disk(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Gibt Zähler und Füllstand des Caches zurück.
+
+        Returns:
+            Dict mit den Zählern sowie Anzahl und Größe der Einträge je Stufe
+        """
+        disk = self._load_disk_index()
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return dict(
+            self.counters,
+            hit_ratio=self.counters["hits"] / lookups if lookups else 0.0,
+            memory_entries=len(self._memory),
+            memory_bytes=self._memory_bytes,
+            disk_entries=len(disk),
+            disk_bytes=self._disk_bytes,
+        )
+
+
+# Globale Cache-Instanz
+result_cache = ResultCache(
+    directory=Path(settings.TEMP_DIR) / "result_cache",
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    max_memory_bytes=settings.RESULT_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+    max_disk_bytes=settings.RESULT_CACHE_MAX_DISK_MB * 1024 * 1024,
+    max_entry_bytes=settings.RESULT_CACHE_MAX_ENTRY_MB * 1024 * 1024,
+    max_age=settings.RESULT_CACHE_MAX_AGE,
+)
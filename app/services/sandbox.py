@@ -4,19 +4,110 @@ Stellt eine isolierte Umgebung bereit, in der Datenhandler-Skripte ausgeführt w
 ohne das Hauptsystem zu gefährden.
 """
 
+import asyncio
+import functools
 import os
-import sys
-import json
 import tempfile
 import subprocess
 import logging
-from typing import Dict, Any, Optional, Tuple
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
 
 from app.config.settings import settings
+from app.sandbox.protocol import ProtocolError, encode_job, read_result
+from app.sandbox import binary
+from app.services.bytecode_cache import bytecode_cache
+from app.services.result_cache import result_cache
+from app.utils.hashing import compute_digest
+from app.services.sandbox_pool import (
+    ResultStream,
+    SandboxWorker,
+    WorkerTimeoutError,
+    get_worker_pool,
+    kill_process_group,
+    open_result_pipe,
+    worker_command,
+    worker_env,
+)
 
 logger = logging.getLogger(__name__)
 # settings = get_settings()
 
+# Begrenzt die Anzahl gleichzeitig laufender Sandbox-Ausführungen (je Event-Loop)
+_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(settings.SANDBOX_MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+
+async def _iterate(values) -> AsyncIterator[Any]:
+    for value in values:
+        yield value
+
+
+async def _failing(error: Exception) -> AsyncIterator[Any]:
+    raise error
+    yield
+
+
+@asynccontextmanager
+async def _single_job(worker: SandboxWorker, job: Dict[str, Any], input_data: Any, timeout: float, code: Optional[bytes]):
+    stream = await worker.stream(job, input_data, timeout, code)
+    yield stream
+
+
+# Rückruf für jede Ausführung in der Sandbox; erhält success, error, die Verbrauchswerte unter usage,
+# bei profilierten Ausführungen das Profil unter profile und cached für Ergebnisse aus dem Ergebnis-Cache
+RunCallback = Callable[[Dict[str, Any]], None]
+
+
+def _report_run(on_run: Optional[RunCallback], output: Optional[Dict[str, Any]], error: Optional[str] = None):
+    """
+    Meldet eine Ausführung in der Sandbox an einen Rückruf.
+
+    Args:
+        on_run: Der Rückruf oder None
+        output: Die Antwort des Sandbox-Prozesses oder None, wenn keine vorliegt
+        error: Fehlermeldung, falls keine Antwort vorliegt
+    """
+    usage = output.get("usage") if output is not None else None
+    if usage:
+        logger.debug(
+            f"Sandbox-Ausführung: {usage['wall_time']:.3f} s, CPU {usage['cpu_user'] + usage['cpu_system']:.3f} s, "
+            f"Speicher {usage['max_rss_kb'] // 1024} MB"
+        )
+    if on_run is None:
+        return
+    on_run({
+        "success": bool(output and output.get("success")),
+        "error": output.get("error") if output is not None else error,
+        "usage": usage,
+        "profile": output.get("profile") if output is not None else None,
+        "cached": False,
+    })
+
+
+def _report_cache_hit(on_run: Optional[RunCallback]):
+    """
+    Meldet ein aus dem Ergebnis-Cache geliefertes Ergebnis an einen Rückruf (ohne Verbrauchswerte).
+
+    Args:
+        on_run: Der Rückruf oder None
+    """
+    if on_run is not None:
+        on_run({"success": True, "error": None, "usage": None, "profile": None, "cached": True})
+
+
+class SandboxError(Exception):
+    """
+    Wird ausgelöst, wenn ein Skript in der Sandbox nicht erfolgreich ausgeführt werden konnte.
+    """
+
 
 class SandboxService:
     """
@@ -24,164 +115,730 @@ class SandboxService:
     Verwendet einen isolierten Prozess mit eingeschränkten Rechten.
     """
 
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: Optional[int] = None):
         """
         Initialisiert den SandboxService.
 
         Args:
-            timeout: Maximale Ausführungszeit in Sekunden (Standard: 30)
+            timeout: Maximale Ausführungszeit in Sekunden (Standard: SANDBOX_TIMEOUT)
         """
-        self.timeout = timeout
+        self.timeout = timeout or settings.SANDBOX_TIMEOUT
         self.temp_dir = settings.TEMP_DIR or tempfile.gettempdir()
         os.makedirs(self.temp_dir, exist_ok=True)
 
-    def _create_temp_script(self, script_content: str) -> str:
+    def _prepare_job(
+        self,
+        script_content: str,
+        input_path: Optional[str],
+        input_encoding: str,
+        cache_key: Optional[Tuple[int, int]],
+        limits: Optional[Dict[str, Optional[int]]] = None,
+        profile: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[bytes]]:
         """
-        Erstellt eine temporäre Skriptdatei mit dem angegebenen Inhalt.
+        Erstellt den Kopf eines Sandbox-Auftrags und lädt den kompilierten Code aus dem Bytecode-Cache.
+        Ist kompilierter Code vorhanden, wird der Quelltext nicht mitgesendet.
 
         Args:
-            script_content: Der Inhalt des Skripts
+            script_content: Der Inhalt des auszuführenden Skripts
+            input_path: Pfad zu einer Datei mit den Eingabedaten
+            input_encoding: Zeichenkodierung der Eingabedatei
+            cache_key: (Handler-ID, Version) für den Bytecode-Cache
+            limits: Ressourcenlimits des Handlers (max_memory_mb, max_cpu_seconds)
+            profile: Optionen für die Profilierung (top, sort) oder None
 
         Returns:
-            Der Pfad zur temporären Skriptdatei
+            Tuple mit (Auftragskopf, mit marshal serialisierter Code oder None)
         """
-        fd, temp_path = tempfile.mkstemp(suffix='.py', dir=self.temp_dir)
-        with os.fdopen(fd, 'w') as f:
-            f.write(script_content)
-        return temp_path
+        compiled = bytecode_cache.get(script_content, cache_key)
+        job = {
+            "script": None if compiled else script_content,
+            "code_key": compiled.code_key if compiled else None,
+            "input_path": input_path,
+            "input_encoding": input_encoding,
+            "result_encoding": settings.SANDBOX_RESULT_ENCODING,
+            "max_memory_mb": (limits or {}).get("max_memory_mb"),
+            "max_cpu_seconds": (limits or {}).get("max_cpu_seconds"),
+            "profile": profile,
+        }
+        return job, compiled.code if compiled else None
 
-    def _create_wrapper_script(self, script_path: str, input_data: Dict[str, Any]) -> str:
+    def execute(
+        self,
+        script_content: str,
+        input_data: Dict[str, Any],
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        cache_key: Optional[Tuple[int, int]] = None,
+        limits: Optional[Dict[str, Optional[int]]] = None,
+        on_run: Optional[RunCallback] = None,
+        profile: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
         """
-        Erstellt ein Wrapper-Skript, das das Hauptskript mit den übergebenen Daten ausführt
-        und die Ausgabe im JSON-Format zurückgibt.
+        Führt ein Skript mit den angegebenen Eingabedaten in einer Sandbox aus.
+        Blockiert bis zum Ende der Ausführung; aus asynchronem Code sollte
+        execute_async() bzw. execute_script() verwendet werden.
 
         Args:
-            script_path: Pfad zum Hauptskript
-            input_data: Eingabedaten für das Skript
+            script_content: Der Inhalt des auszuführenden Skripts
+            input_data: Die Eingabedaten für das Skript
+            input_path: Pfad zu einer Datei mit den Eingabedaten, die erst im Sandbox-Prozess gelesen wird
+            input_encoding: Zeichenkodierung der Eingabedatei
+            cache_key: (Handler-ID, Version) für den Bytecode-Cache
+            limits: Ressourcenlimits des Handlers (max_memory_mb, max_cpu_seconds)
+            on_run: Rückruf mit Erfolg, Fehler und Verbrauchswerten der Ausführung
+            profile: Optionen für die Profilierung (top, sort); das Profil wird an on_run übergeben
 
         Returns:
-            Der Pfad zum Wrapper-Skript
-        """
-        wrapper_content = f"""
-import json
-import sys
-import traceback
-from pathlib import Path
-
-# Eingabedaten
-input_data = {json.dumps(input_data)}
-
-# Ausgabedaten
-output = {{"success": False, "data": None, "error": None}}
-
-try:
-    # Skript laden und ausführen
-    script_path = "{script_path}"
-    script_dir = Path(script_path).parent
-    sys.path.insert(0, str(script_dir))
-    
-    # Definiere eine process_data Funktion, die vom Skript aufgerufen werden kann
-    def process_data(data):
-        return data
-    
-    # Führe das Skript in einem begrenzten Namespace aus
-    namespace = {{"__name__": "__main__", "input_data": input_data, "process_data": process_data}}
-    with open(script_path, 'r') as f:
-        exec(f.read(), namespace)
-    
-    # Überprüfe, ob das Skript eine process_data Funktion definiert hat
-    if "process_data" in namespace and callable(namespace["process_data"]):
-        result = namespace["process_data"](input_data)
-        output["data"] = result
-        output["success"] = True
-    else:
-        output["error"] = "Das Skript definiert keine process_data Funktion."
-except Exception as e:
-    output["error"] = f"{{type(e).__name__}}: {{str(e)}}\\n{{traceback.format_exc()}}"
-
-# Ausgabe als JSON
-print(json.dumps(output))
-"""
-        fd, wrapper_path = tempfile.mkstemp(suffix='_wrapper.py', dir=self.temp_dir)
-        with os.fdopen(fd, 'w') as f:
-            f.write(wrapper_content)
-        return wrapper_path
+            Tuple mit (Erfolg, Ausgabedaten, Fehlermeldung)
+        """
+        job, code = self._prepare_job(script_content, input_path, input_encoding, cache_key, limits, profile)
+        output = self._run_process(job, input_data, code)
+        _report_run(on_run, output)
+        return self._unpack_output(output)
 
-    def execute(self, script_content: str, input_data: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    def _run_process(self, job: Dict[str, Any], input_data: Any, code: Optional[bytes]) -> Dict[str, Any]:
         """
-        Führt ein Skript mit den angegebenen Eingabedaten in einer Sandbox aus.
+        Führt einen Auftrag blockierend in einem eigens gestarteten Sandbox-Prozess aus.
+
+        Args:
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten für das Skript
+            code: Der mit marshal serialisierte Code des Skripts
+
+        Returns:
+            Die Antwort mit success, data und error
+        """
+        try:
+            logger.info("Führe Skript in Sandbox aus")
+            
+            # Skript in einem separaten Prozess ausführen, Ergebnisse landen in einer anonymen Datei
+            with tempfile.TemporaryFile(dir=self.temp_dir) as result_file:
+                process = subprocess.Popen(
+                    worker_command(result_file.fileno()),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=worker_env(),
+                    pass_fds=(result_file.fileno(),),
+                    start_new_session=True
+                )
+                
+                # Auf Abschluss des Prozesses warten (mit Timeout)
+                try:
+                    stdout, stderr = process.communicate(encode_job(job, input_data, code), timeout=self.timeout)
+                except subprocess.TimeoutExpired:
+                    kill_process_group(process.pid)
+                    process.communicate()
+                    return self._failure(f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden.")
+                
+                result_file.seek(0)
+                try:
+                    output = read_result(result_file)
+                except (ProtocolError, ValueError):
+                    output = None
+            
+            return self._parse_process_output(process.returncode, output, stdout, stderr)
+            
+        except Exception as e:
+            logger.exception("Fehler bei der Ausführung des Skripts in der Sandbox")
+            return self._failure(f"Interner Fehler bei der Skriptausführung: {str(e)}")
+
+    async def execute_async(
+        self,
+        script_content: str,
+        input_data: Dict[str, Any],
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        cache_key: Optional[Tuple[int, int]] = None,
+        limits: Optional[Dict[str, Optional[int]]] = None,
+        on_run: Optional[RunCallback] = None,
+        profile: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Führt ein Skript asynchron in einer Sandbox aus, ohne die Event-Loop zu blockieren.
+        Die Anzahl gleichzeitiger Ausführungen ist durch SANDBOX_MAX_CONCURRENCY begrenzt.
 
         Args:
             script_content: Der Inhalt des auszuführenden Skripts
             input_data: Die Eingabedaten für das Skript
+            input_path: Pfad zu einer Datei mit den Eingabedaten, die erst im Sandbox-Prozess gelesen wird
+            input_encoding: Zeichenkodierung der Eingabedatei
+            cache_key: (Handler-ID, Version) für den Bytecode-Cache
+            limits: Ressourcenlimits des Handlers (max_memory_mb, max_cpu_seconds)
+            on_run: Rückruf mit Erfolg, Fehler und Verbrauchswerten der Ausführung
+            profile: Optionen für die Profilierung (top, sort); das Profil wird an on_run übergeben
 
         Returns:
             Tuple mit (Erfolg, Ausgabedaten, Fehlermeldung)
         """
-        try:
-            # Temporäre Skriptdateien erstellen
-            script_path = self._create_temp_script(script_content)
-            wrapper_path = self._create_wrapper_script(script_path, input_data)
-
-            # Kommando zum Ausführen des Wrapper-Skripts mit eingeschränkten Rechten
-            cmd = [
-                sys.executable,
-                "-u",  # Unbuffered output
-                wrapper_path
-            ]
-
-            logger.info(f"Führe Skript in Sandbox aus: {script_path}")
+        job, code = self._prepare_job(script_content, input_path, input_encoding, cache_key, limits, profile)
+        
+        async with _get_semaphore():
+            pool = await get_worker_pool()
+            if pool is not None:
+                output = await self._execute_in_pool(pool, job, input_data, code)
+            else:
+                output = await self._execute_once(job, input_data, code)
+        
+        _report_run(on_run, output)
+        return self._unpack_output(output)
+
+    async def execute_script(
+        self,
+        script_content: str,
+        input_data: Dict[str, Any],
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        cache_key: Optional[Tuple[int, int]] = None,
+        input_digest: Optional[str] = None,
+        limits: Optional[Dict[str, Optional[int]]] = None,
+        on_run: Optional[RunCallback] = None,
+        profile: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> Any:
+        """
+        Führt ein Skript asynchron in einer Sandbox aus und gibt dessen Ergebnis zurück.
+        Ergebnisse werden im Ergebnis-Cache abgelegt und bei identischem Skript und identischer
+        Eingabe von dort geliefert.
+
+        Args:
+            script_content: Der Inhalt des auszuführenden Skripts
+            input_data: Die Eingabedaten für das Skript
+            input_path: Pfad zu einer Datei mit den Eingabedaten, die erst im Sandbox-Prozess gelesen wird
+            input_encoding: Zeichenkodierung der Eingabedatei
+            cache_key: (Handler-ID, Version) für den Bytecode-Cache
+            input_digest: Digest der Eingabedaten; ohne Angabe wird er aus input_data berechnet
+                (Eingaben über input_path werden ohne Digest nicht zwischengespeichert)
+            limits: Ressourcenlimits des Handlers (max_memory_mb, max_cpu_seconds)
+            on_run: Rückruf mit Erfolg, Fehler und Verbrauchswerten der Ausführung
+                (bei Treffern im Ergebnis-Cache mit cached und ohne Verbrauchswerte)
+            profile: Optionen für die Profilierung (top, sort); das Profil wird an on_run übergeben.
+                Profilierte Ausführungen umgehen den Ergebnis-Cache.
+            use_cache: Ergebnis aus dem Ergebnis-Cache liefern, falls vorhanden; andernfalls wird
+                das Skript in jedem Fall ausgeführt und sein Ergebnis neu abgelegt
+
+        Returns:
+            Any: Das Ergebnis der process_data Funktion
+
+        Raises:
+            SandboxError: Wenn die Ausführung fehlgeschlagen ist
+        """
+        result_key = None
+        if profile is None:
+            result_key = self._result_key(script_content, input_data, input_path, input_encoding, input_digest, "data")
+        if result_key is not None and use_cache:
+            cached = await result_cache.get(result_key)
+            if cached is not None:
+                _report_cache_hit(on_run)
+                return cached.value()
+        
+        success, data, error = await self.execute_async(
+            script_content, input_data, input_path, input_encoding, cache_key, limits, on_run, profile
+        )
+        if not success:
+            raise SandboxError(error)
+        
+        if result_key is not None:
+            recorder = result_cache.recorder(streamed=False)
+            recorder.add(data)
+            await result_cache.put(result_key, recorder.result())
+        return data
+
+    async def execute_stream(
+        self,
+        script_content: str,
+        input_data: Any,
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        cache_key: Optional[Tuple[int, int]] = None,
+        input_digest: Optional[str] = None,
+        limits: Optional[Dict[str, Optional[int]]] = None,
+        on_run: Optional[RunCallback] = None,
+        profile: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[Any]:
+        """
+        Führt ein Skript asynchron in einer Sandbox aus und liefert dessen Ergebnis in Teilen,
+        sobald sie eintreffen.
+
+        Definiert das Skript process_stream(records), erhält es die Eingabe satzweise und jedes
+        erzeugte Teilergebnis wird einzeln geliefert. Bei process_data() wird das gesamte Ergebnis
+        als einziges Teilergebnis geliefert. Das Zeitlimit gilt ab dem Senden des Auftrags bis zum
+        letzten Teilergebnis.
+        Vollständig gelieferte Ergebnisse werden im Ergebnis-Cache abgelegt.
+
+        Args:
+            script_content: Der Inhalt des auszuführenden Skripts
+            input_data: Die Eingabedaten für das Skript
+            input_path: Pfad zu einer Datei mit den Eingabedaten, die erst im Sandbox-Prozess gelesen wird
+            input_encoding: Zeichenkodierung der Eingabedatei
+            cache_key: (Handler-ID, Version) für den Bytecode-Cache
+            input_digest: Digest der Eingabedaten; ohne Angabe wird er aus input_data berechnet
+                (Eingaben über input_path werden ohne Digest nicht zwischengespeichert)
+            limits: Ressourcenlimits des Handlers (max_memory_mb, max_cpu_seconds)
+            on_run: Rückruf mit Erfolg, Fehler und Verbrauchswerten der Ausführung
+                (bei Treffern im Ergebnis-Cache mit cached und ohne Verbrauchswerte)
+            profile: Optionen für die Profilierung (top, sort); das Profil wird an on_run übergeben.
+                Profilierte Ausführungen umgehen den Ergebnis-Cache.
+            use_cache: Ergebnis aus dem Ergebnis-Cache liefern, falls vorhanden; andernfalls wird
+                das Skript in jedem Fall ausgeführt und sein Ergebnis neu abgelegt
+
+        Returns:
+            Asynchroner Iterator über die Teilergebnisse
+
+        Raises:
+            SandboxError: Wenn die Ausführung fehlgeschlagen ist
+        """
+        result_key = None
+        if profile is None:
+            result_key = self._result_key(script_content, input_data, input_path, input_encoding, input_digest, "stream")
+        if result_key is not None and use_cache:
+            cached = await result_cache.get(result_key)
+            if cached is not None:
+                _report_cache_hit(on_run)
+                for chunk in cached.chunks():
+                    yield chunk
+                return
+        
+        job, code = self._prepare_job(script_content, input_path, input_encoding, cache_key, limits, profile)
+        
+        async with self._open_stream(job, input_data, code) as stream:
+            async for chunk in self._read_chunks(stream, result_key, on_run):
+                yield chunk
+
+    async def execute_batch(
+        self,
+        scripts: List[Tuple[str, Optional[Tuple[int, int]]]],
+        input_data: Any,
+        input_path: Optional[str] = None,
+        input_encoding: str = "utf-8",
+        input_digest: Optional[str] = None,
+        parents: Optional[List[Optional[int]]] = None,
+        emit: Optional[List[bool]] = None,
+        limits: Optional[List[Optional[Dict[str, Optional[int]]]]] = None,
+        on_run: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+        profile: Optional[List[Optional[Dict[str, Any]]]] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[Tuple[int, AsyncIterator[Any]]]:
+        """
+        Wendet mehrere Skripte in einem einzigen Sandbox-Auftrag auf dieselben Eingabedaten an.
+        Die Eingabedaten werden nur einmal übertragen; die Skripte laufen nacheinander im selben
+        Worker, jeweils in einem eigenen Namespace.
+
+        Über parents lassen sich Skripte zu Pipelines verketten: ein Skript mit Vorstufe erhält
+        statt der Eingabedaten das Ergebnis der Vorstufe. Zwischenergebnisse verbleiben im Worker
+        und werden nur zurückgesendet, wenn das Skript laut emit selbst ein Ergebnis liefern soll;
+        gemeinsame Vorstufen werden nur einmal ausgeführt.
+
+        Für jedes Skript mit Ergebnis wird (Index, Teilergebnisse) geliefert. Die Teilergebnisse
+        verhalten sich wie bei execute_stream() und lösen am Ende SandboxError aus, wenn das Skript
+        (oder eine seiner Vorstufen) fehlgeschlagen ist; die übrigen Skripte werden davon nicht
+        beeinflusst. Sie müssen gelesen werden, bevor das nächste Skript angefordert wird (nicht
+        gelesene Teilergebnisse werden verworfen). Ergebnisse aus dem Ergebnis-Cache werden zuerst geliefert.
+        Das Zeitlimit gilt für den gesamten Sammelauftrag, nicht je Skript.
+
+        Args:
+            scripts: Liste von (Skript, (Handler-ID, Version) für den Bytecode-Cache)
+            input_data: Die Eingabedaten für die Skripte
+            input_path: Pfad zu einer Datei mit den Eingabedaten, die erst im Sandbox-Prozess gelesen wird
+            input_encoding: Zeichenkodierung der Eingabedatei
+            input_digest: Digest der Eingabedaten für den Ergebnis-Cache
+            parents: Index der Vorstufe je Skript oder None (Vorstufen stehen vor ihren Folgestufen)
+            emit: Ob das Ergebnis des jeweiligen Skripts geliefert werden soll (Standard: alle)
+            limits: Ressourcenlimits je Skript (max_memory_mb, max_cpu_seconds)
+            on_run: Rückruf mit dem Index des Skripts sowie Erfolg, Fehler und Verbrauchswerten
+                jeder Ausführung (auch von Zwischenstufen und Treffern im Ergebnis-Cache)
+            profile: Optionen für die Profilierung je Skript (top, sort) oder None; profilierte
+                Skripte umgehen den Ergebnis-Cache
+            use_cache: Ergebnisse aus dem Ergebnis-Cache liefern, falls vorhanden; andernfalls
+                werden alle Skripte ausgeführt und ihre Ergebnisse neu abgelegt
+
+        Returns:
+            Asynchroner Iterator über (Index des Skripts, Teilergebnisse)
+        """
+        parents = parents or [None] * len(scripts)
+        emit = emit or [True] * len(scripts)
+        limits = limits or [None] * len(scripts)
+        profile = profile or [None] * len(scripts)
+        has_children = {parent for parent in parents if parent is not None}
+        
+        # Nur Endstufen können aus dem Cache bedient werden; Vorstufen werden für ihre Folgestufen benötigt.
+        # Der Schlüssel umfasst die Skripte der gesamten Kette, da sie das Ergebnis bestimmen.
+        pending = []
+        result_keys = {}
+        for index in range(len(scripts)):
+            if index in has_children or not emit[index] or profile[index] is not None:
+                pending.append(index)
+                continue
             
-            # Skript in einem separaten Prozess ausführen
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+            result_keys[index] = self._result_key(
+                self._chain_script(scripts, parents, index),
+                input_data, input_path, input_encoding, input_digest, "stream"
             )
-            
-            # Auf Abschluss des Prozesses warten (mit Timeout)
+            cached = None
+            if result_keys[index] is not None and use_cache:
+                cached = await result_cache.get(result_keys[index])
+            if cached is not None:
+                if on_run is not None:
+                    _report_cache_hit(functools.partial(on_run, index))
+                yield index, _iterate(cached.chunks())
+            else:
+                pending.append(index)
+        
+        # Vorstufen, deren Folgestufen alle aus dem Cache bedient wurden, müssen nur laufen, wenn sie selbst ein Ergebnis liefern
+        needed = set()
+        for index in reversed(pending):
+            if emit[index] or index in needed:
+                needed.add(index)
+                if parents[index] is not None:
+                    needed.add(parents[index])
+        pending = [index for index in pending if index in needed]
+        if not pending:
+            return
+        
+        positions = {index: position for position, index in enumerate(pending)}
+        entries, codes = [], []
+        for index in pending:
+            script_content, cache_key = scripts[index]
+            entry, code = self._prepare_job(
+                script_content, input_path, input_encoding, cache_key, limits[index], profile[index]
+            )
+            entries.append({
+                "script": entry["script"],
+                "code_key": entry["code_key"],
+                "max_memory_mb": entry["max_memory_mb"],
+                "max_cpu_seconds": entry["max_cpu_seconds"],
+                "profile": entry["profile"],
+                "parent": positions[parents[index]] if parents[index] is not None else None,
+                "emit": emit[index],
+            })
+            codes.append(code)
+        job = {
+            "handlers": entries,
+            "input_path": input_path,
+            "input_encoding": input_encoding,
+            "result_encoding": settings.SANDBOX_RESULT_ENCODING,
+        }
+        
+        logger.info(f"Führe {len(pending)} Skripte in einem Sandbox-Auftrag aus")
+        async with self._open_stream(job, input_data, codes) as stream:
+            available = True
+            for position, index in enumerate(pending):
+                index_on_run = functools.partial(on_run, index) if on_run is not None else None
+                if position and available:
+                    try:
+                        available = await stream.next_result()
+                    except (WorkerTimeoutError, ProtocolError, ValueError, OSError):
+                        available = False
+                
+                if not emit[index]:
+                    # Zwischenstufe: Ergebnis verbleibt im Worker, nur der Status wird gelesen
+                    if available:
+                        try:
+                            async for _ in self._read_chunks(stream, on_run=index_on_run):
+                                pass
+                        except SandboxError as e:
+                            logger.warning(f"Vorstufe einer Pipeline fehlgeschlagen: {str(e).splitlines()[0]}")
+                    continue
+                
+                if not available:
+                    # Nach einem Abbruch des Workers können die übrigen Skripte nicht mehr laufen
+                    yield index, _failing(SandboxError("Sandbox-Prozess wurde vor der Ausführung des Skripts beendet"))
+                    continue
+                
+                chunks = self._read_chunks(stream, result_keys.get(index), index_on_run)
+                try:
+                    yield index, chunks
+                finally:
+                    await chunks.aclose()
+
+    @staticmethod
+    def _chain_script(
+        scripts: List[Tuple[str, Optional[Tuple[int, int]]]],
+        parents: List[Optional[int]],
+        index: int
+    ) -> str:
+        # Skripte einer Pipeline von der Wurzel bis zum angegebenen Skript
+        chain = []
+        while index is not None:
+            chain.append(scripts[index][0])
+            index = parents[index]
+        return "\0".join(reversed(chain))
+
+    @asynccontextmanager
+    async def _open_stream(self, job: Dict[str, Any], input_data: Any, code) -> AsyncIterator[ResultStream]:
+        """
+        Sendet einen Auftrag an einen Worker des Pools oder an einen eigens gestarteten Worker
+        und stellt dessen Antwort als Stream bereit.
+
+        Args:
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten
+            code: Der mit marshal serialisierte Code (bei Sammelaufträgen eine Liste je Skript)
+
+        Returns:
+            Kontextmanager mit dem ResultStream
+
+        Raises:
+            SandboxError: Wenn der Auftrag nicht gesendet werden konnte
+        """
+        async with _get_semaphore(), AsyncExitStack() as stack:
             try:
-                stdout, stderr = process.communicate(timeout=self.timeout)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                stdout, stderr = process.communicate()
-                return False, None, f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden."
+                pool = await get_worker_pool()
+                if pool is not None:
+                    context = pool.stream(job, input_data, self.timeout, code)
+                else:
+                    # Ohne Pool dient ein eigens gestarteter Worker für genau diesen Auftrag
+                    worker = await SandboxWorker.start()
+                    stack.push_async_callback(worker.stop)
+                    context = _single_job(worker, job, input_data, self.timeout, code)
+                stream = await stack.enter_async_context(context)
+            except WorkerTimeoutError:
+                raise SandboxError(f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden.")
+            except (ProtocolError, RuntimeError, OSError) as e:
+                logger.exception("Fehler beim Senden des Auftrags an die Sandbox")
+                raise SandboxError(f"Interner Fehler bei der Skriptausführung: {str(e)}")
             
-            # Ausgabe verarbeiten
-            if process.returncode != 0:
-                return False, None, f"Skript wurde mit Exit-Code {process.returncode} beendet: {stderr}"
+            yield stream
+
+    async def _read_chunks(
+        self,
+        stream: ResultStream,
+        result_key: Optional[str] = None,
+        on_run: Optional[RunCallback] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Liest die Teilergebnisse des aktuellen Ergebnisses aus einem Antwort-Stream.
+        Das Ergebnis von process_data() wird als einziges Teilergebnis geliefert.
+
+        Args:
+            stream: Der Antwort-Stream
+            result_key: Schlüssel, unter dem das vollständige Ergebnis im Ergebnis-Cache abgelegt wird
+            on_run: Rückruf mit Erfolg, Fehler und Verbrauchswerten der Ausführung
+
+        Returns:
+            Asynchroner Iterator über die Teilergebnisse
+
+        Raises:
+            SandboxError: Wenn die Ausführung fehlgeschlagen ist
+        """
+        recorder = result_cache.recorder() if result_key is not None else None
+        try:
+            async for chunk in stream:
+                if recorder is not None:
+                    recorder.add(chunk)
+                yield chunk
+        except WorkerTimeoutError:
+            error = f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden."
+            _report_run(on_run, None, error)
+            raise SandboxError(error)
+        except (ProtocolError, ValueError, OSError) as e:
+            logger.exception("Fehler beim Lesen der Ergebnisse aus der Sandbox")
+            error = f"Interner Fehler bei der Skriptausführung: {str(e)}"
+            _report_run(on_run, None, error)
+            raise SandboxError(error)
+        
+        output = stream.result
+        if output is None:
+            error = "Sandbox-Prozess wurde ohne Ergebnis beendet"
+            captured = await stream.captured_output()
+            if captured:
+                error = f"{error}: {captured}"
+            _report_run(on_run, None, error)
+            raise SandboxError(error)
+        _report_run(on_run, output)
+        success, data, error = self._unpack_output(output)
+        if not success:
+            raise SandboxError(error)
+        if not output.get("streamed") and data is not None:
+            if recorder is not None:
+                recorder.add(data)
+            yield data
+        
+        if recorder is not None:
+            await result_cache.put(result_key, recorder.result())
+
+    def _result_key(
+        self,
+        script_content: str,
+        input_data: Any,
+        input_path: Optional[str],
+        input_encoding: str,
+        input_digest: Optional[str],
+        mode: str
+    ) -> Optional[str]:
+        """
+        Bildet den Schlüssel für den Ergebnis-Cache.
+
+        Args:
+            script_content: Der Inhalt des Skripts
+            input_data: Die Eingabedaten
+            input_path: Pfad zu einer Datei mit den Eingabedaten
+            input_encoding: Zeichenkodierung der Eingabe
+            input_digest: Bekannter Digest der Eingabedaten
+            mode: Art der Ausführung ("data" oder "stream"), da sich die Ergebnisse unterscheiden
+
+        Returns:
+            Der Schlüssel oder None, wenn das Ergebnis nicht zwischengespeichert werden soll
+        """
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        
+        if input_digest is not None:
+            input_digest = f"{input_digest}.{input_encoding}"
+        elif input_path is None:
+            # Typ voranstellen, damit z.B. der Text "1" und die Zahl 1 nicht denselben Digest erhalten
+            if isinstance(input_data, str):
+                input_digest = compute_digest(b"s" + input_data.encode("utf-8"))
+            else:
+                try:
+                    input_digest = compute_digest(b"b" + binary.dumps(input_data))
+                except (binary.BinaryEncodingError, RecursionError):
+                    return None
+        else:
+            return None
+        
+        script_digest = compute_digest(script_content.encode("utf-8"))
+        return result_cache.make_key(script_digest, f"{input_digest}.{mode}")
+
+    async def _execute_once(
+        self,
+        job: Dict[str, Any],
+        input_data: Dict[str, Any],
+        code: Optional[bytes]
+    ) -> Dict[str, Any]:
+        """
+        Führt einen Auftrag in einem eigens dafür gestarteten Sandbox-Prozess aus.
+        Auftrag und Eingabedaten werden als Rahmen über stdin übertragen, das Ergebnis
+        wird über eine eigene Pipe gelesen.
+
+        Args:
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten für das Skript
+            code: Der mit marshal serialisierte Code des Skripts
+
+        Returns:
+            Die Antwort mit success, data und error
+        """
+        try:
+            logger.info("Führe Skript in Sandbox aus")
             
-            # JSON-Ausgabe parsen
+            write_fd, results, transport = await open_result_pipe()
             try:
-                output = json.loads(stdout)
-                if output["success"]:
-                    return True, output["data"], None
-                else:
-                    return False, None, output["error"]
-            except json.JSONDecodeError:
-                return False, None, f"Fehler beim Verarbeiten der Skriptausgabe: {stdout}"
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *worker_command(write_fd),
+                        stdin=asyncio.subprocess.PIPE,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        env=worker_env(),
+                        pass_fds=(write_fd,),
+                        start_new_session=True
+                    )
+                finally:
+                    os.close(write_fd)
+                
+                # Auf Abschluss des Prozesses warten (mit Timeout)
+                try:
+                    (stdout, stderr), output = await asyncio.wait_for(
+                        asyncio.gather(
+                            process.communicate(encode_job(job, input_data, code)),
+                            self._read_result_safe(results)
+                        ),
+                        self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    kill_process_group(process.pid)
+                    await process.wait()
+                    return self._failure(f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden.")
+            finally:
+                transport.close()
+            
+            return self._parse_process_output(process.returncode, output, stdout, stderr)
             
         except Exception as e:
             logger.exception("Fehler bei der Ausführung des Skripts in der Sandbox")
-            return False, None, f"Interner Fehler bei der Skriptausführung: {str(e)}"
-        finally:
-            # Temporäre Dateien aufräumen
-            self._cleanup_temp_files(script_path, wrapper_path)
-    
-    def _cleanup_temp_files(self, *file_paths):
+            return self._failure(f"Interner Fehler bei der Skriptausführung: {str(e)}")
+
+    async def _read_result_safe(self, results) -> Optional[Dict[str, Any]]:
+        try:
+            return await ResultStream(results).collect()
+        except (ProtocolError, ValueError):
+            return None
+
+    async def _execute_in_pool(
+        self,
+        pool,
+        job: Dict[str, Any],
+        input_data: Dict[str, Any],
+        code: Optional[bytes]
+    ) -> Dict[str, Any]:
         """
-        Löscht temporäre Dateien.
+        Führt einen Auftrag auf einem vorgestarteten Worker des Sandbox-Pools aus.
 
         Args:
-            *file_paths: Pfade zu den zu löschenden Dateien
+            pool: Der Worker-Pool
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten für das Skript
+            code: Der mit marshal serialisierte Code des Skripts
+
+        Returns:
+            Die Antwort mit success, data und error
         """
-        for path in file_paths:
-            try:
-                if path and os.path.exists(path):
-                    os.unlink(path)
-            except Exception as e:
-                logger.warning(f"Fehler beim Löschen der temporären Datei {path}: {e}")
+        try:
+            return await pool.run(job, input_data, self.timeout, code)
+        except WorkerTimeoutError:
+            return self._failure(f"Skriptausführung überschritt das Zeitlimit von {self.timeout} Sekunden.")
+        except Exception as e:
+            logger.exception("Fehler bei der Ausführung des Skripts im Sandbox-Pool")
+            return self._failure(f"Interner Fehler bei der Skriptausführung: {str(e)}")
+
+    def _parse_process_output(
+        self,
+        returncode: int,
+        output: Optional[Dict[str, Any]],
+        stdout: bytes,
+        stderr: bytes
+    ) -> Dict[str, Any]:
+        """
+        Wertet das Ergebnis eines beendeten Sandbox-Prozesses aus.
+
+        Args:
+            returncode: Exit-Code des Prozesses
+            output: Das aus dem Ergebniskanal gelesene Ergebnis oder None
+            stdout: Ausgabe auf stdout
+            stderr: Ausgabe auf stderr
+
+        Returns:
+            Die Antwort mit success, data und error
+        """
+        if returncode != 0:
+            return self._failure(f"Skript wurde mit Exit-Code {returncode} beendet: {stderr.decode(errors='replace')}", output)
+        
+        if output is None:
+            return self._failure(f"Fehler beim Verarbeiten der Skriptausgabe: {(stdout + stderr).decode(errors='replace')}")
+        
+        return output
+
+    @staticmethod
+    def _failure(error: str, output: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Antwort für Ausführungen, die ohne verwertbares Ergebnis endeten; vorhandene Verbrauchswerte bleiben erhalten
+        return {"success": False, "data": None, "error": error, "usage": output.get("usage") if output else None}
+
+    def _unpack_output(self, output: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Wandelt die Antwort eines Sandbox-Prozesses in das Ergebnistupel um.
+
+        Args:
+            output: Die Antwort mit success, data und error
+
+        Returns:
+            Tuple mit (Erfolg, Ausgabedaten, Fehlermeldung)
+        """
+        if output["success"]:
+            return True, output["data"], None
+        return False, None, output["error"]
 
     def test_script(self, script_content: str, test_data: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
         """
@@ -0,0 +1,648 @@
+"""
+Pool vorgestarteter Sandbox-Worker.
+Die Worker halten den Python-Interpreter warm, sodass pro Handler-Ausführung kein neuer
+Prozess gestartet werden muss. Worker werden nach einer festen Anzahl von Aufträgen,
+bei Überschreitung eines Speicherlimits sowie nach Fehlern oder Zeitüberschreitungen ersetzt.
+Jeder Auftrag läuft in einem eigenen, vom Worker abgespaltenen Kindprozess (siehe app.sandbox.worker).
+Die Kommunikation erfolgt über asyncio-Subprozesse, sodass die Event-Loop nie blockiert.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.sandbox.protocol import (
+    FRAME_HEADER,
+    KIND_JSON,
+    ProtocolError,
+    decode_chunk,
+    decode_value,
+    encode_batch_job,
+    encode_job,
+    is_chunk,
+)
+
+logger = logging.getLogger(__name__)
+
+# Blockgröße beim Lesen aus dem Ergebniskanal
+STREAM_READ_SIZE = 64 * 1024
+
+# Aufbewahrte Ausgaben eines Workers auf stdout/stderr je Auftrag (die letzten Bytes)
+OUTPUT_CAPTURE_SIZE = 64 * 1024
+
+# Wartezeit auf restliche Ausgaben eines beendeten Workers in Sekunden
+OUTPUT_DRAIN_TIMEOUT = 1.0
+
+# Kommando zum Start eines Sandbox-Workers
+WORKER_COMMAND = [sys.executable, "-u", "-m", "app.sandbox.worker"]
+
+
+def worker_env() -> Dict[str, str]:
+    """
+    Erstellt die Umgebung für Sandbox-Prozesse, in der das Paket app.sandbox importierbar ist.
+
+    Returns:
+        Dict mit den Umgebungsvariablen
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(settings.BASE_DIR), env.get("PYTHONPATH")])
+    )
+    return env
+
+
+def worker_command(result_fd: int) -> List[str]:
+    """
+    Erstellt das Kommando für einen Sandbox-Worker mit eigenem Ergebniskanal.
+
+    Args:
+        result_fd: Dateideskriptor, auf den der Worker seine Ergebnisse schreibt
+
+    Returns:
+        Das Kommando als Liste
+    """
+    return WORKER_COMMAND + ["--result-fd", str(result_fd)]
+
+
+def kill_process_group(pid: int):
+    """
+    Beendet einen Sandbox-Prozess zusammen mit den Kindprozessen, die er für seine Aufträge
+    abgespalten hat. Sandbox-Prozesse werden dafür in einer eigenen Sitzung gestartet
+    (start_new_session), deren Prozessgruppe die PID des Sandbox-Prozesses trägt.
+
+    Args:
+        pid: PID des Sandbox-Prozesses
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def open_result_pipe() -> Tuple[int, asyncio.StreamReader, asyncio.ReadTransport]:
+    """
+    Erstellt eine Pipe für den Ergebniskanal eines Sandbox-Prozesses.
+    Das Schreibende wird an den Prozess vererbt und muss nach dessen Start geschlossen werden.
+
+    Returns:
+        Tuple mit (Schreibende, Reader für das Leseende, Transport des Leseendes)
+    """
+    read_fd, write_fd = os.pipe()
+    reader = asyncio.StreamReader()
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader),
+        os.fdopen(read_fd, "rb", buffering=0)
+    )
+    return write_fd, reader, transport
+
+
+class WorkerTimeoutError(Exception):
+    """
+    Wird ausgelöst, wenn ein Worker einen Auftrag nicht rechtzeitig abschließt.
+    """
+
+
+class CapturedOutput:
+    """
+    Sammelt die Ausgaben eines Sandbox-Prozesses auf stdout und stderr. Die Pipes werden laufend
+    geleert, damit ein Skript mit vielen Ausgaben den Prozess nicht blockiert; aufbewahrt werden
+    die letzten OUTPUT_CAPTURE_SIZE Bytes seit dem letzten reset().
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        """
+        Args:
+            process: Der mit stdout=PIPE und stderr=PIPE gestartete Sandbox-Prozess
+        """
+        self.buffer = bytearray()
+        self.tasks = [
+            asyncio.create_task(self._drain(pipe))
+            for pipe in (process.stdout, process.stderr)
+            if pipe is not None
+        ]
+
+    async def _drain(self, pipe: asyncio.StreamReader):
+        while True:
+            data = await pipe.read(STREAM_READ_SIZE)
+            if not data:
+                return
+            self.buffer += data
+            if len(self.buffer) > OUTPUT_CAPTURE_SIZE:
+                del self.buffer[:-OUTPUT_CAPTURE_SIZE]
+
+    def reset(self):
+        """
+        Verwirft die bisher gesammelten Ausgaben (vor jedem Auftrag).
+        """
+        self.buffer.clear()
+
+    async def text(self) -> str:
+        """
+        Gibt die gesammelten Ausgaben zurück. Ist der Prozess beendet, werden die restlichen
+        Ausgaben bis zu OUTPUT_DRAIN_TIMEOUT Sekunden lang abgewartet.
+
+        Returns:
+            Die Ausgaben als Text
+        """
+        if self.tasks:
+            await asyncio.wait(self.tasks, timeout=OUTPUT_DRAIN_TIMEOUT)
+        return self.buffer.decode(errors="replace").strip()
+
+    async def close(self):
+        """
+        Beendet das Leeren der Pipes.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class ResultStream:
+    """
+    Liest die Antwort auf einen Auftrag aus dem Ergebniskanal eines Sandbox-Prozesses.
+    Teilergebnisse gestreamter Handler werden beim Iterieren geliefert, sobald sie eintreffen;
+    anschließend steht das abschließende Ergebnis in result.
+
+    Bei Sammelaufträgen folgen mehrere Ergebnisse aufeinander; mit next_result() wird
+    zum nächsten gewechselt.
+
+    Für alle Ergebnisse eines Auftrags gilt eine gemeinsame Frist, die mit dem Senden des
+    Auftrags beginnt; sie umfasst wie bei einer Einzelausführung auch die Zeit, die der
+    Aufrufer für die Verarbeitung der Teilergebnisse benötigt.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        deadline: Optional[float] = None,
+        expected: int = 1,
+        process: Optional[asyncio.subprocess.Process] = None,
+        output: Optional[CapturedOutput] = None
+    ):
+        """
+        Args:
+            reader: Reader für den Ergebniskanal
+            deadline: Frist für den gesamten Auftrag (Zeitpunkt der Event-Loop) oder None
+            expected: Anzahl der erwarteten Ergebnisse
+            process: Der antwortende Sandbox-Prozess
+            output: Die Ausgaben des Sandbox-Prozesses auf stdout/stderr
+        """
+        self.reader = reader
+        self.deadline = deadline
+        self.expected = expected
+        self.process = process
+        self.output = output
+        self.result: Optional[Dict[str, Any]] = None
+        self.finished = False
+        self.chunks = 0
+        self.received = 0
+        self.failures = 0
+        self.aborted = False  # Nach Zeitüberschreitung oder Protokollfehler kann nicht weiter gelesen werden
+        self._buffer = bytearray()
+
+    @property
+    def complete(self) -> bool:
+        """
+        True, wenn alle erwarteten Ergebnisse gelesen wurden.
+        """
+        return self.received >= self.expected
+
+    async def next_result(self) -> bool:
+        """
+        Wechselt zum nächsten Ergebnis eines Sammelauftrags. Nicht gelesene Teilergebnisse
+        des aktuellen Ergebnisses werden verworfen.
+
+        Returns:
+            True, wenn ein weiteres Ergebnis folgt
+        """
+        async for _ in self:
+            pass
+        if self.complete or self.result is None or self.aborted:
+            return False
+
+        self.result = None
+        self.finished = False
+        self.chunks = 0
+        return True
+
+    async def _wait(self, awaitable):
+        timeout = None
+        if self.deadline is not None:
+            timeout = max(self.deadline - asyncio.get_running_loop().time(), 0)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise WorkerTimeoutError()
+
+    async def _read_exactly(self, size: int) -> Optional[bytes]:
+        # Kleine Rahmen werden aus einem gemeinsamen Puffer gelesen, damit bei vielen
+        # Teilergebnissen nicht für jeden Rahmen auf den Reader gewartet werden muss
+        if not self._buffer and size >= STREAM_READ_SIZE:
+            try:
+                return await self._wait(self.reader.readexactly(size))
+            except asyncio.IncompleteReadError:
+                return None
+
+        while len(self._buffer) < size:
+            data = await self._wait(self.reader.read(max(STREAM_READ_SIZE, size - len(self._buffer))))
+            if not data:
+                return None
+            self._buffer += data
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def _read_frame(self) -> Optional[Tuple[bytes, bytes]]:
+        header = await self._read_exactly(FRAME_HEADER.size)
+        if header is None:
+            return None
+
+        kind, length = FRAME_HEADER.unpack(header)
+        body = await self._read_exactly(length)
+        if body is None:
+            raise ProtocolError("Unvollständiger Rahmeninhalt")
+        return kind, body
+
+    def __aiter__(self) -> "ResultStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self.finished:
+            raise StopAsyncIteration
+
+        try:
+            return await self._next()
+        except (WorkerTimeoutError, ProtocolError, ValueError):
+            self.aborted = True
+            self.finished = True
+            raise
+
+    async def _next(self) -> Any:
+        frame = await self._read_frame()
+        if frame is not None and is_chunk(frame[0]):
+            self.chunks += 1
+            return decode_chunk(*frame)
+
+        self.finished = True
+        if frame is None:
+            raise StopAsyncIteration
+
+        kind, body = frame
+        if kind != KIND_JSON:
+            raise ProtocolError(f"Unerwartete Rahmenart: {kind!r}")
+        result = json.loads(body)
+
+        frame = await self._read_frame()
+        if frame is None:
+            raise ProtocolError("Daten des Ergebnisses fehlen")
+        result["data"] = decode_value(*frame)
+        self.result = result
+        self.received += 1
+        if not result.get("success"):
+            self.failures += 1
+        raise StopAsyncIteration
+
+    async def captured_output(self) -> str:
+        """
+        Gibt die Ausgaben des Sandbox-Prozesses seit Beginn des Auftrags zurück.
+
+        Returns:
+            Die Ausgaben auf stdout/stderr als Text (leer, wenn sie nicht gesammelt werden)
+        """
+        if self.output is None:
+            return ""
+        return await self.output.text()
+
+    async def collect(self) -> Optional[Dict[str, Any]]:
+        """
+        Liest die vollständige Antwort; Teilergebnisse werden als Liste in data zusammengefasst.
+
+        Returns:
+            Das Ergebnis mit success, data und error oder None, wenn der Kanal geschlossen wurde
+        """
+        chunks = [chunk async for chunk in self]
+        if self.result is not None and self.result.get("streamed"):
+            self.result["data"] = chunks
+        return self.result
+
+
+class SandboxWorker:
+    """
+    Ein einzelner, langlebiger Sandbox-Prozess.
+    """
+
+    def __init__(
+        self,
+        process: asyncio.subprocess.Process,
+        results: asyncio.StreamReader,
+        results_transport: asyncio.ReadTransport
+    ):
+        """
+        Initialisiert den Worker. Neue Worker werden mit SandboxWorker.start() erstellt.
+
+        Args:
+            process: Der laufende Worker-Prozess (mit stdout=PIPE und stderr=PIPE)
+            results: Reader für den Ergebniskanal des Workers
+            results_transport: Transport des Ergebniskanals
+        """
+        self.process = process
+        self.results = results
+        self.results_transport = results_transport
+        self.output = CapturedOutput(process)
+        self.jobs = 0
+        self.max_rss_kb = 0
+        self.code_keys = set()  # Code, den der Worker bereits geladen hat
+
+    @classmethod
+    async def start(cls) -> "SandboxWorker":
+        """
+        Startet einen neuen Worker-Prozess mit eigenem Ergebniskanal in einer eigenen Sitzung.
+        Ausgaben des Benutzerskripts auf stdout/stderr werden je Auftrag gesammelt und bei
+        einem Abbruch des Workers in die Fehlermeldung übernommen.
+
+        Returns:
+            SandboxWorker: Der gestartete Worker
+        """
+        write_fd, results, transport = await open_result_pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *worker_command(write_fd),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=worker_env(),
+                pass_fds=(write_fd,),
+                start_new_session=True
+            )
+        except Exception:
+            transport.close()
+            raise
+        finally:
+            os.close(write_fd)
+        return cls(process, results, transport)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def stream(
+        self,
+        job: Dict[str, Any],
+        input_data: Any,
+        timeout: float,
+        code: Optional[bytes] = None
+    ) -> ResultStream:
+        """
+        Sendet einen Auftrag an den Worker und gibt den Stream mit dessen Antwort zurück.
+        Hat der Worker den Code bereits geladen, werden weder Skript noch Code erneut übertragen.
+
+        Args:
+            job: Der Auftragskopf (bei Sammelaufträgen mit der Liste der Skripte unter "handlers")
+            input_data: Die Eingabedaten
+            timeout: Maximale Ausführungszeit des gesamten Auftrags in Sekunden ab dem Senden
+            code: Der mit marshal serialisierte Code des Skripts (bei Sammelaufträgen eine Liste je Skript)
+
+        Returns:
+            ResultStream: Die Antwort des Workers
+
+        Raises:
+            WorkerTimeoutError: Wenn der Worker den Auftrag nicht rechtzeitig annimmt
+        """
+        self.jobs += 1
+        self.output.reset()
+
+        if "handlers" in job:
+            codes = [self._unknown_code(entry.get("code_key"), entry_code) for entry, entry_code in zip(job["handlers"], code)]
+            data = encode_batch_job(job, input_data, codes)
+            expected = len(job["handlers"])
+        else:
+            data = encode_job(job, input_data, self._unknown_code(job.get("code_key"), code))
+            expected = 1
+
+        deadline = asyncio.get_running_loop().time() + timeout
+        self.process.stdin.write(data)
+        try:
+            await asyncio.wait_for(self.process.stdin.drain(), timeout)
+        except asyncio.TimeoutError:
+            raise WorkerTimeoutError()
+        return ResultStream(self.results, deadline, expected, self.process, self.output)
+
+    def _unknown_code(self, code_key: Optional[str], code: Optional[bytes]) -> Optional[bytes]:
+        # Code, den der Worker bereits geladen hat, muss nicht erneut übertragen werden
+        if code is None or code_key is None:
+            return code
+        if code_key in self.code_keys:
+            return None
+        self.code_keys.add(code_key)
+        return code
+
+    def finish(self, stream: ResultStream):
+        """
+        Übernimmt die Verwaltungsdaten aus dem letzten Ergebnis eines Auftrags.
+
+        Args:
+            stream: Der vollständig gelesene Antwort-Stream
+        """
+        if stream.result is not None:
+            self.max_rss_kb = stream.result.pop("max_rss_kb", 0)
+
+    async def stop(self):
+        """
+        Beendet den Worker-Prozess und einen gegebenenfalls noch laufenden Auftrag.
+        """
+        kill_process_group(self.process.pid)
+        await self.process.wait()
+        self.results_transport.close()
+        await self.output.close()
+
+
+class SandboxWorkerPool:
+    """
+    Pool von Sandbox-Workern mit fester Größe.
+    """
+
+    def __init__(self, size: int, max_jobs: int, max_rss_mb: int):
+        """
+        Initialisiert den Pool. Die Worker werden mit start() gestartet.
+
+        Args:
+            size: Anzahl der Worker
+            max_jobs: Anzahl der Aufträge, nach denen ein Worker ersetzt wird
+            max_rss_mb: Speicherverbrauch in MB, ab dem ein Worker ersetzt wird
+        """
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self._idle: "asyncio.Queue[SandboxWorker]" = asyncio.Queue()
+        self._workers: List[SandboxWorker] = []
+        self._closed = False
+
+    async def start(self):
+        """
+        Startet alle Worker des Pools.
+        """
+        await asyncio.gather(*(self._add_worker() for _ in range(self.size)))
+        logger.info(f"Sandbox-Worker-Pool mit {self.size} Workern gestartet")
+
+    async def _add_worker(self):
+        worker = await SandboxWorker.start()
+        self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def _retire(self, worker: SandboxWorker, reason: str):
+        logger.info(f"Ersetze Sandbox-Worker (PID {worker.process.pid}): {reason}")
+        if worker in self._workers:
+            self._workers.remove(worker)
+        await worker.stop()
+
+    def _needs_recycling(self, worker: SandboxWorker, result: Optional[Dict[str, Any]]) -> Optional[str]:
+        if result is None or not result.get("success"):
+            return "Fehler bei der Ausführung"
+        if worker.jobs >= self.max_jobs:
+            return f"{worker.jobs} Aufträge ausgeführt"
+        if worker.max_rss_kb > self.max_rss_mb * 1024:
+            return f"Speicherverbrauch {worker.max_rss_kb // 1024} MB"
+        if not worker.alive:
+            return "Prozess beendet"
+        return None
+
+    async def run(
+        self,
+        job: Dict[str, Any],
+        input_data: Any,
+        timeout: float,
+        code: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """
+        Führt einen Auftrag auf einem freien Worker aus.
+
+        Args:
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten
+            timeout: Maximale Ausführungszeit in Sekunden
+            code: Der mit marshal serialisierte Code des Skripts
+
+        Returns:
+            Dict mit success, data und error
+
+        Raises:
+            WorkerTimeoutError: Wenn der Auftrag das Zeitlimit überschreitet
+        """
+        async with self.stream(job, input_data, timeout, code) as stream:
+            await stream.collect()
+            if stream.result is None:
+                raise RuntimeError(
+                    f"Sandbox-Worker wurde mit Exit-Code {await stream.process.wait()} beendet: "
+                    f"{await stream.captured_output()}"
+                )
+            return stream.result
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        job: Dict[str, Any],
+        input_data: Any,
+        timeout: float,
+        code: Optional[bytes] = None
+    ) -> AsyncIterator[ResultStream]:
+        """
+        Führt einen Auftrag auf einem freien Worker aus und stellt dessen Antwort als Stream bereit.
+        Der Worker bleibt belegt, bis der Kontext verlassen wird; wurde die Antwort bis dahin
+        nicht vollständig gelesen oder ist ein Skript fehlgeschlagen, wird er ersetzt.
+
+        Args:
+            job: Der Auftragskopf
+            input_data: Die Eingabedaten
+            timeout: Maximale Ausführungszeit in Sekunden
+            code: Der mit marshal serialisierte Code des Skripts
+
+        Returns:
+            Kontextmanager mit dem ResultStream; nach dem Lesen enthält stream.result das Ergebnis
+
+        Raises:
+            WorkerTimeoutError: Wenn der Auftrag das Zeitlimit überschreitet
+        """
+        worker = await self._idle.get()
+        while not worker.alive:
+            await self._retire(worker, "Prozess beendet")
+            await self._add_worker()
+            worker = await self._idle.get()
+
+        result = None
+        try:
+            stream = await worker.stream(job, input_data, timeout, code)
+            yield stream
+            # Der Worker bleibt nur im Pool, wenn alle Ergebnisse gelesen wurden und erfolgreich waren
+            if stream.complete and not stream.failures:
+                worker.finish(stream)
+                result = stream.result
+        finally:
+            reason = self._needs_recycling(worker, result)
+            if reason is None:
+                self._idle.put_nowait(worker)
+            else:
+                await self._retire(worker, reason)
+                if not self._closed:
+                    await self._add_worker()
+
+    async def shutdown(self):
+        """
+        Beendet alle Worker des Pools.
+        """
+        self._closed = True
+        workers = list(self._workers)
+        self._workers.clear()
+        await asyncio.gather(*(worker.stop() for worker in workers))
+        logger.info("Sandbox-Worker-Pool beendet")
+
+
+# Globale Pool-Instanz
+_pool: Optional[SandboxWorkerPool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+_pool_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_worker_pool() -> Optional[SandboxWorkerPool]:
+    """
+    Gibt den gemeinsamen Worker-Pool zurück und startet ihn bei Bedarf.
+
+    Returns:
+        Der Worker-Pool oder None, wenn der Pool deaktiviert ist (SANDBOX_POOL_SIZE = 0)
+    """
+    global _pool, _pool_lock, _pool_lock_loop
+
+    if settings.SANDBOX_POOL_SIZE <= 0:
+        return None
+
+    if _pool_lock is None or _pool_lock_loop is not asyncio.get_running_loop():
+        _pool_lock = asyncio.Lock()
+        _pool_lock_loop = asyncio.get_running_loop()
+
+    async with _pool_lock:
+        if _pool is None:
+            pool = SandboxWorkerPool(
+                settings.SANDBOX_POOL_SIZE,
+                settings.SANDBOX_WORKER_MAX_JOBS,
+                settings.SANDBOX_WORKER_MAX_RSS_MB
+            )
+            await pool.start()
+            _pool = pool
+    return _pool
+
+
+async def shutdown_worker_pool():
+    """
+    Beendet den gemeinsamen Worker-Pool, falls er gestartet wurde.
+    """
+    global _pool
+
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.shutdown()
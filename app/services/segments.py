@@ -0,0 +1,324 @@
+"""
+Fortlaufend beschriebene Segmente für Ausgaben mit der Strategie APPEND.
+Jeder Lauf hängt seine Daten an das offene Segment der Ausgabe an; ein neues Segment wird
+begonnen, sobald das aktuelle seine Maximalgröße oder sein Höchstalter erreicht hat oder ein
+neuer Tag beginnt. Angehängte Daten werden im Speicher gesammelt und gebündelt geschrieben,
+komprimierte Ausgaben als eigenständige gzip-Member bzw. zstd-Frames, die aneinandergereiht
+wieder einen gültigen Datenstrom ergeben.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import aiofiles
+
+from app.config.settings import settings
+from app.models.output import Output
+from app.utils.atomic_file import FILE_MODE, fsync_directory
+from app.utils.compression import Compressor
+
+logger = logging.getLogger(__name__)
+
+
+class Segment:
+    """
+    Das offene Segment einer Ausgabe mit den noch nicht geschriebenen Daten.
+    """
+
+    def __init__(self, output_id: int):
+        """
+        Args:
+            output_id: ID der Ausgabekonfiguration
+        """
+        self.output_id = output_id
+        self.lock = asyncio.Lock()  # Ein Lauf zur Zeit; wird vom Öffnen bis zum Abschluss gehalten
+        self.path: Optional[str] = None
+        self.key: Optional[Tuple] = None  # Einstellungen, mit denen das Segment begonnen wurde
+        self.started: Optional[datetime] = None
+        self.last_write: Optional[datetime] = None
+        self.size = 0  # Bereits geschriebene Bytes
+        self.buffer = bytearray()
+        self.last_flush = time.monotonic()
+        self.compression: Optional[str] = None
+        self.compression_level: Optional[int] = None
+        self._file = None
+        # Position der Daten des laufenden Schreibvorgangs in Datei und Puffer (für den Abbruch)
+        self._run_offset = 0
+        self._run_start = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self.buffer)
+
+    def needs_roll(self, output: Output, now: datetime) -> bool:
+        """
+        Prüft, ob vor dem nächsten Lauf ein neues Segment begonnen werden muss.
+
+        Args:
+            output: Die Ausgabekonfiguration
+            now: Zeitpunkt des Laufs
+
+        Returns:
+            bool: True, wenn ein neues Segment nötig ist
+        """
+        if self._file is None or self.key != _segment_key(output):
+            return True
+        max_bytes = (output.segment_max_mb or settings.OUTPUT_SEGMENT_MAX_MB) * 1024 * 1024
+        max_seconds = (output.segment_max_minutes or settings.OUTPUT_SEGMENT_MAX_MINUTES) * 60
+        return (
+            self.size + self.pending >= max_bytes
+            or (now - self.started).total_seconds() >= max_seconds
+            or now.date() != self.started.date()
+        )
+
+    async def roll(self, output: Output, path: str, now: datetime):
+        """
+        Schließt das aktuelle Segment und beginnt ein neues.
+
+        Args:
+            output: Die Ausgabekonfiguration
+            path: Pfad des neuen Segments
+            now: Beginn des neuen Segments
+        """
+        await self.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = await aiofiles.open(path, "ab")
+        os.chmod(path, FILE_MODE)
+        self.path = path
+        self.key = _segment_key(output)
+        self.started = now
+        self.size = os.path.getsize(path)
+        self.compression = output.compression
+        self.compression_level = output.compression_level
+        logger.info(f"Neues Segment für Ausgabe '{output.name}' begonnen: {path}")
+
+    def begin_run(self):
+        # Stand vor dem Lauf merken, um ihn bei einem Abbruch zurückzunehmen
+        self._run_offset = self.size
+        self._run_start = self.pending
+
+    async def flush(self, sync: bool = False):
+        """
+        Schreibt die gesammelten Daten an das Ende des Segments.
+
+        Args:
+            sync: Ob das Segment anschließend auf den Datenträger synchronisiert wird
+        """
+        if self._file is None:
+            return
+        if self._run_start:
+            # Daten früherer Läufe getrennt schreiben, damit ein Abbruch nur den laufenden zurücknimmt
+            await self._write(bytes(self.buffer[:self._run_start]))
+            del self.buffer[:self._run_start]
+            self._run_offset = self.size
+            self._run_start = 0
+        if self.buffer:
+            await self._write(bytes(self.buffer))
+            self.buffer.clear()
+        await self._file.flush()
+        if sync:
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+        self.last_flush = time.monotonic()
+
+    async def rollback(self):
+        """
+        Verwirft die Daten des laufenden Schreibvorgangs, auch wenn sie bereits geschrieben wurden.
+        """
+        del self.buffer[self._run_start:]
+        if self._file is not None and self.size > self._run_offset:
+            await self._file.flush()
+            await self._file.truncate(self._run_offset)
+            self.size = self._run_offset
+
+    async def close(self):
+        """
+        Schreibt die gesammelten Daten und schließt das Segment.
+        """
+        if self._file is None:
+            return
+        try:
+            await self.flush()
+        finally:
+            await self._file.close()
+            self._file = None
+            self.buffer.clear()
+
+    async def _write(self, data: bytes):
+        if self.compression:
+            # Jeder Block wird als eigenständiges gzip-Member bzw. zstd-Frame geschrieben
+            compressor = Compressor(self.compression, self.compression_level)
+            data = await asyncio.to_thread(lambda: compressor.compress(data) + compressor.flush())
+        await self._file.write(data)
+        self.size += len(data)
+
+
+def _segment_key(output: Output) -> Tuple:
+    # Änderungen an diesen Einstellungen erfordern ein neues Segment
+    return (output.path, output.layout, output.compression, output.compression_level)
+
+
+# Offene Segmente je Ausgabe
+_segments: Dict[int, Segment] = {}
+
+
+def get_segment(output_id: int) -> Segment:
+    """
+    Gibt das Segment einer Ausgabe zurück und legt es bei Bedarf an.
+
+    Args:
+        output_id: ID der Ausgabekonfiguration
+
+    Returns:
+        Segment: Das Segment
+    """
+    if output_id not in _segments:
+        _segments[output_id] = Segment(output_id)
+    return _segments[output_id]
+
+
+class SegmentFile:
+    """
+    Schreibvorgang eines Laufs in das Segment einer Ausgabe, mit derselben Schnittstelle wie
+    AtomicFile. Der Lauf hält das Segment vom Öffnen bis zum Abschluss exklusiv; bei einem
+    Abbruch werden seine Daten wieder entfernt.
+    """
+
+    def __init__(self, output: Output, path: str, fsync: bool = True):
+        """
+        Args:
+            output: Die Ausgabekonfiguration
+            path: Pfad eines neuen Segments, falls eines begonnen werden muss
+            fsync: Ob das Segment beim Abschluss geschrieben und synchronisiert wird
+        """
+        self.output = output
+        self.path = path
+        self.fsync = fsync
+        self.size = 0  # Größe des Segments nach dem Lauf einschließlich noch nicht geschriebener Daten
+        self._segment: Optional[Segment] = None
+
+    async def open(self) -> "SegmentFile":
+        segment = get_segment(self.output.id)
+        await segment.lock.acquire()
+        while _segments.get(self.output.id) is not segment:
+            # Segment wurde während des Wartens geschlossen
+            segment.lock.release()
+            segment = get_segment(self.output.id)
+            await segment.lock.acquire()
+        try:
+            now = datetime.now()
+            if segment.needs_roll(self.output, now):
+                await segment.roll(self.output, self.path, now)
+            segment.begin_run()
+        except BaseException:
+            segment.lock.release()
+            raise
+        self._segment = segment
+        self.path = segment.path
+        return self
+
+    async def write(self, data: bytes):
+        segment = self._segment
+        segment.buffer += data
+        if segment.pending >= settings.OUTPUT_APPEND_FLUSH_SIZE:
+            await segment.flush()
+
+    async def commit(self):
+        segment = self._segment
+        try:
+            segment.last_write = datetime.now()
+            due = time.monotonic() - segment.last_flush >= settings.OUTPUT_APPEND_FLUSH_INTERVAL
+            if self.fsync or due:
+                await segment.flush(sync=self.fsync)
+            if self.fsync:
+                await asyncio.to_thread(fsync_directory, os.path.dirname(self.path) or ".")
+            self.size = segment.size + segment.pending
+        finally:
+            self._release()
+
+    async def abort(self):
+        if self._segment is None:
+            return
+        try:
+            await self._segment.rollback()
+        finally:
+            self._release()
+
+    def _release(self):
+        self._segment.lock.release()
+        self._segment = None
+
+
+async def flush_segments(force: bool = False) -> int:
+    """
+    Schreibt die gesammelten Daten aller Segmente, deren letzter Schreibvorgang länger als
+    OUTPUT_APPEND_FLUSH_INTERVAL zurückliegt. Segmente, in die gerade geschrieben wird, werden
+    übersprungen.
+
+    Args:
+        force: Alle Segmente unabhängig vom Zeitpunkt schreiben
+
+    Returns:
+        int: Anzahl der geschriebenen Segmente
+    """
+    flushed = 0
+    now = time.monotonic()
+    for segment in list(_segments.values()):
+        if not segment.pending or segment.lock.locked():
+            continue
+        if not force and now - segment.last_flush < settings.OUTPUT_APPEND_FLUSH_INTERVAL:
+            continue
+        async with segment.lock:
+            try:
+                await segment.flush()
+                flushed += 1
+            except OSError as e:
+                logger.error(f"Fehler beim Schreiben des Segments {segment.path}: {str(e)}")
+    return flushed
+
+
+async def release_segment(output_id: int, before: Optional[datetime] = None) -> bool:
+    """
+    Schließt das Segment einer Ausgabe, z.B. bevor es von der Bereinigung gelöscht wird.
+
+    Args:
+        output_id: ID der Ausgabekonfiguration
+        before: Nur schließen, wenn zuletzt vor diesem Zeitpunkt geschrieben wurde
+
+    Returns:
+        bool: True, wenn ein Segment geschlossen wurde
+    """
+    segment = _segments.get(output_id)
+    if segment is None:
+        return False
+    async with segment.lock:
+        if before is not None and segment.last_write is not None and segment.last_write >= before:
+            return False
+        await segment.close()
+        del _segments[output_id]
+    return True
+
+
+async def close_segments() -> List[str]:
+    """
+    Schreibt die gesammelten Daten aller Segmente und schließt sie. Sollte beim Beenden
+    der Anwendung aufgerufen werden, damit keine angehängten Daten verloren gehen.
+
+    Returns:
+        List[str]: Pfade der geschlossenen Segmente
+    """
+    paths = []
+    for output_id in list(_segments):
+        segment = _segments.pop(output_id)
+        async with segment.lock:
+            try:
+                await segment.close()
+            except OSError as e:
+                logger.error(f"Fehler beim Schließen des Segments {segment.path}: {str(e)}")
+                continue
+        if segment.path:
+            paths.append(segment.path)
+    return paths
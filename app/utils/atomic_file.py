@@ -0,0 +1,139 @@
+"""
+Atomares Schreiben von Dateien für die Data Fetch & Process Webapp.
+Daten werden zunächst in eine temporäre Datei im Zielverzeichnis geschrieben, die anschließend
+per rename() die Zieldatei ersetzt. Leser sehen so entweder die alte oder die vollständige neue
+Datei, und ein Absturz hinterlässt keine abgeschnittenen Ausgaben.
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import Iterable, Optional
+
+import aiofiles
+
+# umask, wenn sie nicht gelesen werden kann
+DEFAULT_UMASK = 0o022
+
+
+def _read_umask() -> int:
+    # umask aus /proc lesen (Linux 4.7+); os.umask() würde sie kurzzeitig für alle Threads ändern
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return DEFAULT_UMASK
+
+
+# Dateirechte neuer Dateien wie bei open(): 0666 abzüglich der umask des Prozesses
+# (mkstemp() legt Dateien sonst nur für den Eigentümer lesbar an)
+FILE_MODE = 0o666 & ~_read_umask()
+
+
+def fsync_directory(directory: str):
+    """
+    Schreibt die Verzeichniseinträge eines Verzeichnisses auf den Datenträger,
+    damit ein rename() einen Absturz übersteht.
+
+    Args:
+        directory: Das Verzeichnis
+    """
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_paths(paths: Iterable[str]):
+    """
+    Schreibt mehrere Dateien und deren Verzeichnisse auf den Datenträger.
+    Jedes Verzeichnis wird nur einmal synchronisiert.
+
+    Args:
+        paths: Pfade der Dateien
+    """
+    directories = set()
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            # Inzwischen ersetzt oder entfernt
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(os.path.dirname(path) or ".")
+    for directory in directories:
+        fsync_directory(directory)
+
+
+class AtomicFile:
+    """
+    Datei, die erst mit commit() unter ihrem Zielpfad sichtbar wird.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Args:
+            path: Der Zielpfad
+            fsync: Ob Datei und Verzeichnis vor bzw. nach dem Umbenennen synchronisiert werden
+        """
+        self.path = path
+        self.fsync = fsync
+        self.temp_path: Optional[str] = None
+        self._file = None
+
+    async def open(self) -> "AtomicFile":
+        """
+        Legt die temporäre Datei im Zielverzeichnis an. Der Name beginnt mit einem Punkt,
+        damit sie nicht als Ausgabe ausgeliefert wird, und ist eindeutig, sodass gleichzeitige
+        Schreibvorgänge auf dasselbe Ziel sich nicht gegenseitig überschreiben.
+
+        Returns:
+            AtomicFile: Die geöffnete Datei
+        """
+        directory, name = os.path.split(self.path)
+        fd, self.temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".part", dir=directory or ".")
+        try:
+            os.fchmod(fd, FILE_MODE)
+            self._file = await aiofiles.open(fd, "wb")
+        except BaseException:
+            os.close(fd)
+            os.remove(self.temp_path)
+            raise
+        return self
+
+    async def write(self, data: bytes):
+        """
+        Schreibt Daten in die temporäre Datei.
+
+        Args:
+            data: Die zu schreibenden Daten
+        """
+        await self._file.write(data)
+
+    async def commit(self):
+        """
+        Schließt die temporäre Datei und ersetzt damit atomar die Zieldatei.
+        """
+        await self._file.flush()
+        if self.fsync:
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+        await self._file.close()
+        os.replace(self.temp_path, self.path)
+        if self.fsync:
+            await asyncio.to_thread(fsync_directory, os.path.dirname(self.path) or ".")
+
+    async def abort(self):
+        """
+        Verwirft die temporäre Datei; die Zieldatei bleibt unverändert.
+        """
+        if self._file is not None:
+            await self._file.close()
+        if self.temp_path is not None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
@@ -0,0 +1,166 @@
+"""
+Inhaltsadressierter Speicher für Ausgabedateien der Data Fetch & Process Webapp.
+Jeder unterschiedliche Dateiinhalt wird einmal unter seinem SHA-256-Hash im Verzeichnis
+.blobs des Ausgabeverzeichnisses abgelegt; Ausgabedateien mit gleichem Inhalt sind Hardlinks
+auf diesen Blob. Ein Blob, auf den keine Ausgabedatei mehr verweist (Linkanzahl 1), wird bei
+der Bereinigung entfernt.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+from typing import Iterable, Optional, Tuple
+
+from app.utils.atomic_file import AtomicFile, fsync_directory
+
+logger = logging.getLogger(__name__)
+
+# Verzeichnis der Blobs relativ zum Ausgabeverzeichnis
+BLOB_DIR_NAME = ".blobs"
+
+
+def blob_path(root: str, digest: str) -> str:
+    """
+    Bestimmt den Pfad eines Blobs.
+
+    Args:
+        root: Das Ausgabeverzeichnis
+        digest: SHA-256-Hash des Inhalts (hexadezimal)
+
+    Returns:
+        str: Pfad des Blobs
+    """
+    return os.path.join(root, BLOB_DIR_NAME, digest[:2], digest)
+
+
+def link_blob(blob: str, target: str) -> bool:
+    """
+    Ersetzt eine Datei atomar durch einen Hardlink auf einen vorhandenen Blob.
+
+    Args:
+        blob: Pfad des Blobs
+        target: Pfad der Zieldatei
+
+    Returns:
+        bool: False, wenn der Blob nicht existiert oder nicht verlinkt werden kann
+    """
+    directory, name = os.path.split(target)
+    temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.link")
+    try:
+        os.link(blob, temp_path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        # z.B. Dateisystem ohne Hardlinks oder maximale Linkanzahl erreicht
+        logger.warning(f"Blob {blob} kann nicht verlinkt werden: {str(e)}")
+        return False
+    try:
+        os.replace(temp_path, target)
+    finally:
+        # rename() lässt beide Namen bestehen, wenn das Ziel bereits derselbe Blob ist
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+    return True
+
+
+def add_blob(path: str, blob: str):
+    """
+    Nimmt eine geschriebene Datei per Hardlink als Blob in den Speicher auf.
+    Der Blob entsteht so bereits mit zwei Links und wird nie versehentlich als verwaist entfernt.
+
+    Args:
+        path: Pfad der geschriebenen Datei
+        blob: Pfad des Blobs
+    """
+    try:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.link(path, blob)
+    except FileExistsError:
+        # Gleichzeitig von einem anderen Schreibvorgang angelegt
+        pass
+    except OSError as e:
+        logger.warning(f"Datei {path} kann nicht in den Blob-Speicher aufgenommen werden: {str(e)}")
+
+
+def collect_garbage(root: str, digests: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+    """
+    Entfernt Blobs, auf die keine Ausgabedatei mehr verweist.
+
+    Args:
+        root: Das Ausgabeverzeichnis
+        digests: Nur diese Blobs prüfen (z.B. die der gerade gelöschten Dateien);
+            ohne Angabe wird der gesamte Blob-Speicher durchsucht
+
+    Returns:
+        Tuple[int, int]: Anzahl der entfernten Blobs und freigegebene Bytes
+    """
+    if digests is None:
+        blob_dir = os.path.join(root, BLOB_DIR_NAME)
+        if not os.path.isdir(blob_dir):
+            return 0, 0
+        paths = [
+            entry.path
+            for prefix in os.scandir(blob_dir) if prefix.is_dir(follow_symlinks=False)
+            for entry in os.scandir(prefix.path)
+        ]
+    else:
+        paths = [blob_path(root, digest) for digest in set(digests)]
+
+    removed = 0
+    freed = 0
+    for path in paths:
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+            if stat.st_nlink > 1:
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += stat.st_size
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            # Verzeichnis enthält noch Blobs
+            pass
+    return removed, freed
+
+
+class ContentAddressedFile(AtomicFile):
+    """
+    Atomar geschriebene Datei, die bei bereits bekanntem Inhalt durch einen Hardlink auf den
+    vorhandenen Blob ersetzt wird. Die temporäre Datei wird dann ohne fsync verworfen.
+    """
+
+    def __init__(self, path: str, root: str, fsync: bool = True):
+        """
+        Args:
+            path: Der Zielpfad
+            root: Das Ausgabeverzeichnis, unter dem die Blobs liegen
+            fsync: Ob Datei und Verzeichnis synchronisiert werden
+        """
+        super().__init__(path, fsync=fsync)
+        self.root = root
+        self.digest = None
+        self.deduplicated = False
+        self._hash = hashlib.sha256()
+
+    async def write(self, data: bytes):
+        self._hash.update(data)
+        await super().write(data)
+
+    async def commit(self):
+        self.digest = self._hash.hexdigest()
+        blob = blob_path(self.root, self.digest)
+
+        if await asyncio.to_thread(link_blob, blob, self.path):
+            self.deduplicated = True
+            await self.abort()
+            if self.fsync:
+                await asyncio.to_thread(fsync_directory, os.path.dirname(self.path) or ".")
+            return
+
+        await super().commit()
+        await asyncio.to_thread(add_blob, self.path, blob)
@@ -0,0 +1,156 @@
+"""
+Komprimierung von Ausgabedateien für die Data Fetch & Process Webapp.
+Stellt inkrementelle Kompressoren bereit, sodass Daten beim Schreiben blockweise komprimiert
+werden können, ohne das gesamte Ergebnis im Speicher zu halten.
+"""
+
+import zlib
+from typing import Optional
+
+# Dateiendung je Verfahren
+EXTENSIONS = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+# Zulässige Stufen je Verfahren (Minimum, Maximum, Standard)
+LEVELS = {
+    "gzip": (1, 9, 6),
+    "zstd": (1, 22, 3),
+}
+
+
+class Compressor:
+    """
+    Inkrementeller Kompressor mit einheitlicher Schnittstelle für alle Verfahren.
+    """
+
+    def __init__(self, codec: str, level: Optional[int] = None):
+        """
+        Args:
+            codec: Das Verfahren ("gzip" oder "zstd")
+            level: Die Kompressionsstufe (Standard je Verfahren)
+
+        Raises:
+            ValueError: Wenn das Verfahren unbekannt oder nicht verfügbar ist
+        """
+        if codec not in LEVELS:
+            raise ValueError(f"Unbekanntes Kompressionsverfahren: {codec}")
+        level = level or LEVELS[codec][2]
+
+        if codec == "gzip":
+            # wbits=31: Deflate mit gzip-Kopf und Prüfsumme
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        else:
+            zstandard = require_zstandard()
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Komprimiert einen Block. Die Ausgabe kann leer sein, solange der Kompressor Daten sammelt.
+
+        Args:
+            data: Der zu komprimierende Block
+
+        Returns:
+            bytes: Die bisher erzeugten komprimierten Daten
+        """
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """
+        Schließt den komprimierten Datenstrom ab.
+
+        Returns:
+            bytes: Die restlichen komprimierten Daten
+        """
+        return self._compressor.flush()
+
+
+class Decompressor:
+    """
+    Inkrementeller Dekompressor, der auch aneinandergereihte gzip-Member bzw. zstd-Frames entpackt.
+    """
+
+    def __init__(self, codec: str):
+        """
+        Args:
+            codec: Das Verfahren ("gzip" oder "zstd")
+        """
+        if codec not in LEVELS:
+            raise ValueError(f"Unbekanntes Kompressionsverfahren: {codec}")
+        self.codec = codec
+        self._decompressor = self._create()
+
+    def _create(self):
+        if self.codec == "gzip":
+            return zlib.decompressobj(31)
+        return require_zstandard().ZstdDecompressor().decompressobj(read_across_frames=True)
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Entpackt einen Block.
+
+        Args:
+            data: Der komprimierte Block
+
+        Returns:
+            bytes: Die bisher entpackten Daten
+        """
+        if self.codec != "gzip":
+            return self._decompressor.decompress(data)
+        parts = [self._decompressor.decompress(data)]
+        while self._decompressor.eof and self._decompressor.unused_data:
+            # Nächstes gzip-Member
+            data = self._decompressor.unused_data
+            self._decompressor = self._create()
+            parts.append(self._decompressor.decompress(data))
+        return b"".join(parts)
+
+
+def require_zstandard():
+    """
+    Lädt das optionale Paket zstandard.
+
+    Returns:
+        Das Modul zstandard
+
+    Raises:
+        ValueError: Wenn das Paket nicht installiert ist
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Für die Komprimierung mit zstd muss das Paket 'zstandard' installiert sein")
+    return zstandard
+
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """
+    Entpackt vollständig komprimierte Daten, auch aneinandergereihte gzip-Member bzw. zstd-Frames.
+
+    Args:
+        codec: Das Verfahren ("gzip" oder "zstd")
+        data: Die komprimierten Daten
+
+    Returns:
+        bytes: Die entpackten Daten
+    """
+    return Decompressor(codec).decompress(data)
+
+
+def codec_from_path(path: str) -> Optional[str]:
+    """
+    Bestimmt das Kompressionsverfahren einer Datei anhand ihrer Endung.
+
+    Args:
+        path: Pfad der Datei
+
+    Returns:
+        Optional[str]: Das Verfahren oder None für unkomprimierte Dateien
+    """
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    return None
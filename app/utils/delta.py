@@ -0,0 +1,286 @@
+"""
+Zeilenbasierte Delta-Kodierung für Ausgaben, die sich zwischen zwei Läufen nur wenig ändern.
+Eine Version wird als Folge von Kopier- und Einfügeoperationen relativ zu einem Keyframe
+(einer vollständig gespeicherten Version) abgelegt. Unveränderte Zeilenfolgen werden als
+Bytebereich des Keyframes referenziert, neue oder geänderte Zeilen unverändert eingefügt.
+
+Format: Magic, Länge der Zielversion, dann Operationen (Typ-Byte und Varints):
+COPY Offset Länge | INSERT Länge Bytes
+"""
+
+import asyncio
+import os
+from typing import Optional, Tuple
+
+from app.utils.atomic_file import AtomicFile
+from app.utils.compression import Compressor, EXTENSIONS, codec_from_path, decompress
+
+MAGIC = b"DLT1"
+OP_COPY = 0x01
+OP_INSERT = 0x02
+
+# Dateiendung von Deltas (vor einer ggf. vorhandenen Kompressionsendung)
+DELTA_EXTENSION = ".delta"
+
+# Kürzere Zeilen werden außerhalb einer laufenden Kopie eingefügt statt referenziert,
+# da die Operation sonst größer als die Zeile wäre
+MIN_COPY_LENGTH = 8
+
+
+class DeltaError(ValueError):
+    """
+    Wird ausgelöst, wenn ein Delta ungültig ist oder nicht zum Keyframe passt.
+    """
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise DeltaError("Unerwartetes Ende des Deltas")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode(base: bytes, target: bytes) -> bytes:
+    """
+    Erstellt das Delta einer Version relativ zu einem Keyframe.
+
+    Args:
+        base: Der Keyframe
+        target: Die zu kodierende Version
+
+    Returns:
+        bytes: Das Delta
+    """
+    # Erstes Vorkommen jeder Zeile im Keyframe
+    index = {}
+    offset = 0
+    for line in base.splitlines(keepends=True):
+        index.setdefault(line, offset)
+        offset += len(line)
+
+    delta = bytearray(MAGIC)
+    _write_varint(delta, len(target))
+    copy_start = copy_end = -1
+    insert = bytearray()
+
+    def flush_copy():
+        nonlocal copy_start, copy_end
+        if copy_start >= 0:
+            delta.append(OP_COPY)
+            _write_varint(delta, copy_start)
+            _write_varint(delta, copy_end - copy_start)
+            copy_start = copy_end = -1
+
+    def flush_insert():
+        if insert:
+            delta.append(OP_INSERT)
+            _write_varint(delta, len(insert))
+            delta.extend(insert)
+            insert.clear()
+
+    for line in target.splitlines(keepends=True):
+        # Laufende Kopie fortsetzen, solange der Keyframe an dieser Stelle übereinstimmt
+        if copy_start >= 0 and base.startswith(line, copy_end):
+            copy_end += len(line)
+            continue
+        offset = index.get(line) if len(line) >= MIN_COPY_LENGTH else None
+        if offset is None:
+            flush_copy()
+            insert += line
+        else:
+            flush_copy()
+            flush_insert()
+            copy_start, copy_end = offset, offset + len(line)
+    flush_copy()
+    flush_insert()
+    return bytes(delta)
+
+
+def apply(base: bytes, delta: bytes) -> bytes:
+    """
+    Stellt eine Version aus Keyframe und Delta wieder her.
+
+    Args:
+        base: Der Keyframe
+        delta: Das mit encode() erstellte Delta
+
+    Returns:
+        bytes: Die Version
+
+    Raises:
+        DeltaError: Wenn das Delta ungültig ist oder nicht zum Keyframe passt
+    """
+    view = memoryview(delta)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise DeltaError("Keine gültigen Delta-Daten")
+    length, offset = _read_varint(view, len(MAGIC))
+
+    parts = []
+    while offset < len(view):
+        op = view[offset]
+        if op == OP_COPY:
+            start, offset = _read_varint(view, offset + 1)
+            size, offset = _read_varint(view, offset)
+            if start + size > len(base):
+                raise DeltaError("Delta verweist auf Daten außerhalb des Keyframes")
+            parts.append(base[start:start + size])
+        elif op == OP_INSERT:
+            size, offset = _read_varint(view, offset + 1)
+            if offset + size > len(view):
+                raise DeltaError("Unerwartetes Ende des Deltas")
+            parts.append(view[offset:offset + size])
+            offset += size
+        else:
+            raise DeltaError(f"Unbekannte Delta-Operation: {op:#x}")
+
+    result = b"".join(parts)
+    if len(result) != length:
+        raise DeltaError("Wiederhergestellte Version hat nicht die erwartete Länge")
+    return result
+
+
+def delta_path(path: str) -> str:
+    """
+    Bestimmt den Pfad des Deltas zu einem Dateipfad, z.B. data.json.gz -> data.json.delta.gz.
+
+    Args:
+        path: Pfad der vollständigen Version
+
+    Returns:
+        str: Pfad des Deltas
+    """
+    codec = codec_from_path(path)
+    if codec is None:
+        return path + DELTA_EXTENSION
+    extension = EXTENSIONS[codec]
+    return path[:-len(extension)] + DELTA_EXTENSION + extension
+
+
+def keyframe_path(path: str) -> str:
+    """
+    Bestimmt den Pfad der vollständigen Version zu einem Delta (Umkehrung von delta_path()).
+
+    Args:
+        path: Pfad des Deltas
+
+    Returns:
+        str: Pfad der vollständigen Version
+    """
+    codec = codec_from_path(path)
+    extension = EXTENSIONS[codec] if codec else ""
+    return path[:len(path) - len(extension) - len(DELTA_EXTENSION)] + extension
+
+
+def read_file(path: str) -> bytes:
+    """
+    Liest eine gespeicherte Datei und entpackt sie anhand ihrer Endung.
+
+    Args:
+        path: Pfad der Datei
+
+    Returns:
+        bytes: Der Inhalt
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    codec = codec_from_path(path)
+    return decompress(codec, data) if codec else data
+
+
+async def write_file(path: str, data: bytes, fsync: bool = True, level: Optional[int] = None) -> int:
+    """
+    Schreibt eine Datei atomar und komprimiert sie anhand ihrer Endung.
+
+    Args:
+        path: Pfad der Datei
+        data: Der Inhalt
+        fsync: Ob die Datei synchronisiert wird
+        level: Kompressionsstufe (Standard je Verfahren)
+
+    Returns:
+        int: Größe der geschriebenen Datei
+    """
+    codec = codec_from_path(path)
+    if codec:
+        compressor = Compressor(codec, level)
+        data = await asyncio.to_thread(lambda: compressor.compress(data) + compressor.flush())
+    file = await AtomicFile(path, fsync=fsync).open()
+    try:
+        await file.write(data)
+        await file.commit()
+    except BaseException:
+        await file.abort()
+        raise
+    return len(data)
+
+
+class DeltaFile:
+    """
+    Schreibvorgang einer Version mit derselben Schnittstelle wie AtomicFile. Die Daten werden
+    gesammelt und beim Abschluss als Delta zum Keyframe gespeichert, sofern dies deutlich
+    kleiner ist als die vollständige Version; andernfalls wird ein neuer Keyframe geschrieben.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        base_path: Optional[str] = None,
+        max_ratio: float = 0.5,
+        fsync: bool = True,
+        level: Optional[int] = None
+    ):
+        """
+        Args:
+            path: Pfad der vollständigen Version (bei einem Delta wird DELTA_EXTENSION eingefügt)
+            base_path: Pfad des Keyframes oder None, um einen Keyframe zu schreiben
+            max_ratio: Größtes Verhältnis von Delta zu vollständiger Version
+            fsync: Ob die Datei synchronisiert wird
+            level: Kompressionsstufe (Standard je Verfahren)
+        """
+        self.path = path
+        self.base_path = base_path
+        self.max_ratio = max_ratio
+        self.fsync = fsync
+        self.level = level
+        self.size = 0  # Größe der gespeicherten Datei
+        self.is_delta = False
+        self._buffer = bytearray()
+
+    async def open(self) -> "DeltaFile":
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return self
+
+    async def write(self, data: bytes):
+        self._buffer += data
+
+    async def commit(self):
+        content = bytes(self._buffer)
+        self._buffer.clear()
+
+        data = content
+        if self.base_path is not None:
+            base = await asyncio.to_thread(read_file, self.base_path)
+            delta = await asyncio.to_thread(encode, base, content)
+            if len(delta) <= len(content) * self.max_ratio:
+                data = delta
+                self.is_delta = True
+                self.path = delta_path(self.path)
+
+        self.size = await write_file(self.path, data, fsync=self.fsync, level=self.level)
+
+    async def abort(self):
+        self._buffer.clear()
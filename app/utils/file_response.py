@@ -0,0 +1,426 @@
+"""
+Ausliefern von Ausgabedateien über HTTP für die Data Fetch & Process Webapp.
+Unterstützt Teilanfragen (Range), bedingte Anfragen (If-None-Match, If-Modified-Since, If-Range)
+und bereits komprimiert gespeicherte Varianten, die dem Client unverändert mit Content-Encoding
+gesendet werden. Die Datei wird per sendfile() gesendet, wenn der ASGI-Server die Erweiterung
+"http.response.zerocopysend" anbietet, andernfalls in großen Blöcken per pread() gelesen.
+"""
+
+import asyncio
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config.settings import settings
+from app.utils.compression import EXTENSIONS, Decompressor, codec_from_path
+
+# Name der Verfahren im Header Content-Encoding
+CONTENT_ENCODINGS = {"gzip": "gzip", "zstd": "zstd"}
+
+# Bevorzugte Reihenfolge, wenn der Client mehrere Verfahren akzeptiert
+PREFERRED_CODECS = ("zstd", "gzip")
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Wird ausgelöst, wenn der angefragte Bereich außerhalb der Datei liegt.
+    """
+
+
+def accepted_codecs(header: Optional[str]) -> Set[str]:
+    """
+    Bestimmt die Kompressionsverfahren, die ein Client laut Accept-Encoding annimmt.
+
+    Args:
+        header: Wert des Headers Accept-Encoding
+
+    Returns:
+        Set[str]: Die angenommenen Verfahren (z.B. {"gzip", "zstd"})
+    """
+    codecs = set()
+    rejected = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        (codecs if quality > 0 else rejected).add(name)
+    if "*" in codecs:
+        codecs.update(CONTENT_ENCODINGS)
+    return {codec for codec, encoding in CONTENT_ENCODINGS.items() if encoding in codecs - rejected}
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Wertet einen Range-Header aus. Nur einzelne Bytebereiche werden unterstützt; bei mehreren
+    Bereichen oder unbekannten Einheiten wird die gesamte Datei gesendet.
+
+    Args:
+        header: Wert des Headers Range
+        size: Größe der Datei
+
+    Returns:
+        Optional[Tuple[int, int]]: Beginn und Ende (exklusiv) oder None für die gesamte Datei
+
+    Raises:
+        RangeNotSatisfiable: Wenn der Bereich nicht in der Datei liegt
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Die letzten n Bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end <= start:
+        # Ungültiger Bereich: Header wird ignoriert
+        return None
+    return start, min(end, size)
+
+
+def make_etag(stat: os.stat_result, suffix: str = "") -> str:
+    """
+    Bildet ein ETag aus Inode, Größe und Änderungszeit einer Datei. Da Dateien nur atomar
+    ersetzt werden, ändert sich das ETag mit jedem neuen Inhalt.
+
+    Args:
+        stat: Status der Datei
+        suffix: Zusatz zur Unterscheidung von Varianten derselben Datei
+
+    Returns:
+        str: Das ETag (in Anführungszeichen)
+    """
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Schwacher Vergleich wie bei If-None-Match vorgesehen
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    Prüft, ob der Client die aktuelle Version bereits besitzt.
+
+    Args:
+        request: Die Anfrage
+        etag: ETag der aktuellen Version
+        last_modified: Änderungszeit der aktuellen Version (Unix-Zeit)
+
+    Returns:
+        bool: True, wenn mit 304 geantwortet werden kann
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since wird ignoriert, wenn If-None-Match angegeben ist
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_allowed(request: Request, etag: str, last_modified: float) -> bool:
+    # Mit If-Range nur dann einen Teil senden, wenn der Client noch die aktuelle Version hat
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range.strip() == etag
+    try:
+        return int(last_modified) == int(parsedate_to_datetime(if_range).timestamp())
+    except (TypeError, ValueError):
+        return False
+
+
+def logical_name(path: str) -> str:
+    """
+    Bestimmt den Dateinamen des entpackten Inhalts, z.B. data_20240101_120000.json.gz -> data_20240101_120000.json.
+
+    Args:
+        path: Pfad der gespeicherten Datei
+
+    Returns:
+        str: Der Dateiname
+    """
+    name = os.path.basename(path)
+    codec = codec_from_path(name)
+    return name[:-len(EXTENSIONS[codec])] if codec else name
+
+
+def _base_headers(filename: str, etag: str, last_modified: float) -> Dict[str, str]:
+    return {
+        "etag": etag,
+        "last-modified": formatdate(last_modified, usegmt=True),
+        # Clients dürfen zwischenspeichern, müssen aber vor jeder Verwendung nachfragen (günstig per 304)
+        "cache-control": "no-cache",
+        "vary": "Accept-Encoding",
+        "content-type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "content-disposition": f"inline; filename*=utf-8''{quote(filename)}",
+    }
+
+
+def _not_modified(headers: Dict[str, str]) -> Response:
+    headers = {key: value for key, value in headers.items() if key not in ("content-type", "content-disposition")}
+    return Response(status_code=304, headers=headers)
+
+
+def _not_satisfiable(headers: Dict[str, str], size: int) -> Response:
+    return Response(
+        status_code=416,
+        headers={"content-range": f"bytes */{size}", "etag": headers["etag"]}
+    )
+
+
+class FileRangeResponse(Response):
+    """
+    Sendet einen Bytebereich einer geöffneten Datei. Der Dateideskriptor wird beim Öffnen
+    übernommen, damit ein gleichzeitiges Ersetzen der Datei die Antwort nicht verändert.
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        start: int,
+        end: int,
+        status_code: int,
+        headers: Dict[str, str],
+        send_body: bool = True
+    ):
+        """
+        Args:
+            fd: Geöffneter Dateideskriptor (wird nach dem Senden geschlossen)
+            start: Erstes zu sendendes Byte
+            end: Ende des Bereichs (exklusiv)
+            status_code: 200 oder 206
+            headers: Die Header der Antwort
+            send_body: False bei HEAD-Anfragen
+        """
+        super().__init__(status_code=status_code, headers=headers)
+        self.fd = fd
+        self.start = start
+        self.end = end
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                # Der Server sendet die Datei per sendfile() ohne Umweg über den Userspace
+                with os.fdopen(os.dup(self.fd), "rb") as file:
+                    await send({
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": file,
+                        "offset": self.start,
+                        "count": self.end - self.start,
+                        "more_body": False,
+                    })
+            else:
+                offset = self.start
+                while offset < self.end:
+                    size = min(settings.OUTPUT_DOWNLOAD_CHUNK_SIZE, self.end - offset)
+                    chunk = await asyncio.to_thread(os.pread, self.fd, size, offset)
+                    if not chunk:
+                        # Datei wurde verkürzt (z.B. zurückgenommener Lauf eines Segments)
+                        break
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": offset < self.end})
+                if offset < self.end:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(self.fd)
+        if self.background is not None:
+            await self.background()
+
+
+def _find_variant(path: str, codecs: Set[str]) -> Tuple[str, Optional[str]]:
+    # Gespeicherte Datei oder eine daneben liegende, mindestens ebenso aktuelle komprimierte Variante
+    codec = codec_from_path(path)
+    if codec is not None:
+        return path, codec
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return path, None
+    for candidate in PREFERRED_CODECS:
+        if candidate not in codecs:
+            continue
+        variant = path + EXTENSIONS[candidate]
+        try:
+            if os.stat(variant).st_mtime_ns >= mtime:
+                return variant, candidate
+        except FileNotFoundError:
+            continue
+    return path, None
+
+
+async def _decompressed(fd: int, codec: str) -> AsyncIterator[bytes]:
+    try:
+        decompressor = Decompressor(codec)
+        offset = 0
+        while True:
+            chunk = await asyncio.to_thread(os.pread, fd, settings.OUTPUT_DOWNLOAD_CHUNK_SIZE, offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            data = await asyncio.to_thread(decompressor.decompress, chunk)
+            if data:
+                yield data
+    finally:
+        os.close(fd)
+
+
+async def serve_file(request: Request, path: str, filename: Optional[str] = None) -> Response:
+    """
+    Erstellt die Antwort für eine gespeicherte Datei. Ist die Datei komprimiert gespeichert
+    oder liegt eine aktuelle komprimierte Variante daneben, wird diese gesendet, sofern der
+    Client das Verfahren annimmt; andernfalls wird der Inhalt beim Senden entpackt (dann ohne
+    Unterstützung von Teilanfragen).
+
+    Args:
+        request: Die Anfrage
+        path: Pfad der gespeicherten Datei
+        filename: Dateiname für Content-Disposition (Standard: Name des entpackten Inhalts)
+
+    Returns:
+        Response: Die Antwort
+
+    Raises:
+        FileNotFoundError: Wenn die Datei nicht existiert
+    """
+    codecs = accepted_codecs(request.headers.get("accept-encoding"))
+    path, codec = _find_variant(path, codecs)
+    fd = await asyncio.to_thread(os.open, path, os.O_RDONLY)
+    try:
+        stat = os.fstat(fd)
+        filename = filename or logical_name(path)
+        encode = codec is not None and codec in codecs
+        etag = make_etag(stat, "" if codec is None or encode else "-identity")
+        headers = _base_headers(filename, etag, stat.st_mtime)
+
+        if is_not_modified(request, etag, stat.st_mtime):
+            os.close(fd)
+            return _not_modified(headers)
+
+        if codec is not None and not encode:
+            # Client nimmt das Verfahren nicht an: beim Senden entpacken
+            if request.method == "HEAD":
+                os.close(fd)
+                response = Response(headers=headers)
+                # Länge des entpackten Inhalts ist erst nach dem Entpacken bekannt
+                del response.headers["content-length"]
+                return response
+            return StreamingResponse(_decompressed(fd, codec), headers=headers)
+
+        if encode:
+            headers["content-encoding"] = CONTENT_ENCODINGS[codec]
+        headers["accept-ranges"] = "bytes"
+        size = stat.st_size
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            os.close(fd)
+            return _not_satisfiable(headers, size)
+        if byte_range is not None and not _range_allowed(request, etag, stat.st_mtime):
+            byte_range = None
+
+        start, end = byte_range or (0, size)
+        headers["content-length"] = str(end - start)
+        if byte_range is not None:
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        return FileRangeResponse(
+            fd,
+            start,
+            end,
+            206 if byte_range is not None else 200,
+            headers,
+            send_body=request.method != "HEAD"
+        )
+    except BaseException:
+        # Deskriptor nur schließen, wenn er noch nicht übergeben oder geschlossen wurde
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+        raise
+
+
+def serve_bytes(
+    request: Request,
+    content: bytes,
+    etag: str,
+    last_modified: float,
+    filename: str
+) -> Response:
+    """
+    Erstellt die Antwort für einen im Speicher vorliegenden Inhalt, z.B. eine aus ihrem Delta
+    wiederhergestellte Version, mit denselben bedingten Anfragen und Teilanfragen wie serve_file().
+
+    Args:
+        request: Die Anfrage
+        content: Der Inhalt
+        etag: ETag des Inhalts (in Anführungszeichen)
+        last_modified: Änderungszeit des Inhalts (Unix-Zeit)
+        filename: Dateiname für Content-Disposition
+
+    Returns:
+        Response: Die Antwort
+    """
+    headers = _base_headers(filename, etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return _not_modified(headers)
+
+    headers["accept-ranges"] = "bytes"
+    size = len(content)
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        return _not_satisfiable(headers, size)
+    if byte_range is not None and not _range_allowed(request, etag, last_modified):
+        byte_range = None
+
+    start, end = byte_range or (0, size)
+    headers["content-length"] = str(end - start)
+    if byte_range is not None:
+        headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+    return Response(
+        content=content[start:end] if request.method != "HEAD" else b"",
+        status_code=206 if byte_range is not None else 200,
+        headers=headers
+    )
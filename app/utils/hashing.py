@@ -0,0 +1,34 @@
+"""
+Hash-Funktionen für die Data Fetch & Process Webapp.
+Stellt schnelle Inhalts-Digests bereit, um unveränderte Daten zu erkennen.
+"""
+
+import hashlib
+
+# Länge des Digests in Bytes (128 Bit reichen zur Erkennung identischer Inhalte)
+DIGEST_SIZE = 16
+
+
+def new_hasher():
+    """
+    Erstellt ein Hash-Objekt für inkrementelle Digests.
+
+    Returns:
+        Ein BLAKE2b-Hash-Objekt, das mit update() befüllt werden kann
+    """
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def compute_digest(data: bytes) -> str:
+    """
+    Berechnet den Digest eines Inhalts.
+
+    Args:
+        data: Die zu hashenden Daten
+
+    Returns:
+        Der Digest als Hex-String
+    """
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
@@ -0,0 +1,378 @@
+"""
+Schlanker Client für S3-kompatible Objektspeicher (AWS S3, MinIO u.a.).
+Unterstützt die Operationen, die Ausgaben benötigen: Hochladen einzelner Objekte und
+mehrteiliges Hochladen (Multipart-Upload), Auflisten nach Präfix, Löschen in Stapeln sowie
+Lebenszyklusregeln für das serverseitige Ablaufen alter Objekte. Anfragen werden mit AWS
+Signature Version 4 signiert und nutzen Pfad-Adressierung (Endpunkt/Bucket/Schlüssel).
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+# Kleinste Teilgröße bei Multipart-Uploads (außer für den letzten Teil)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Höchstzahl von Schlüsseln je DeleteObjects-Anfrage
+DELETE_BATCH_SIZE = 1000
+
+# Inhalte ab dieser Größe werden außerhalb des Event-Loops gehasht
+_HASH_IN_THREAD_SIZE = 1024 * 1024
+
+
+class S3Error(Exception):
+    """
+    Wird ausgelöst, wenn der Objektspeicher eine Anfrage ablehnt oder nicht erreichbar ist.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class S3Object(NamedTuple):
+    key: str
+    size: int
+    last_modified: datetime  # UTC
+
+
+def _local_name(element: ET.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _strip_namespace(element: ET.Element) -> ET.Element:
+    # Namespace entfernen, damit die Elemente unverändert wieder gesendet werden können
+    for child in element.iter():
+        child.tag = _local_name(child)
+    return element
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _md5(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+
+
+class S3Client:
+    """
+    Client für einen S3-kompatiblen Endpunkt. Verwendet einen gemeinsamen httpx.AsyncClient,
+    sodass Verbindungen über alle Anfragen und gleichzeitige Uploads hinweg wiederverwendet werden.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        client: httpx.AsyncClient,
+        region: str = "us-east-1",
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        max_retries: int = 3
+    ):
+        """
+        Args:
+            endpoint_url: URL des Endpunkts, z.B. http://localhost:9000
+            client: Der HTTP-Client mit Connection-Pool
+            region: Region für die Signatur
+            access_key: Zugriffsschlüssel (ohne Angabe werden Anfragen nicht signiert)
+            secret_key: Geheimer Schlüssel
+            max_retries: Wiederholungen bei Verbindungsfehlern und Serverfehlern (5xx)
+        """
+        parts = urlsplit(endpoint_url)
+        self.base_url = f"{parts.scheme}://{parts.netloc}"
+        self.base_path = parts.path.rstrip("/")
+        self.host = parts.netloc
+        self.client = client
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.max_retries = max_retries
+
+    def _signing_key(self, day: str) -> bytes:
+        key = ("AWS4" + self.secret_key).encode("utf-8")
+        for part in (day, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        return key
+
+    def _sign(self, method: str, uri: str, query: str, headers: Dict[str, str], payload_hash: str) -> Dict[str, str]:
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        headers = {name.lower(): str(value).strip() for name, value in headers.items()}
+        headers.update({"host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+        if not self.access_key:
+            return headers
+
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join([
+            method,
+            uri,
+            query,
+            "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+            signed_headers,
+            payload_hash,
+        ])
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, _sha256(canonical_request.encode("utf-8"))])
+        signature = hmac.new(self._signing_key(amz_date[:8]), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    async def _request(
+        self,
+        method: str,
+        bucket: str,
+        key: str = "",
+        params: Optional[Dict[str, str]] = None,
+        content: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+        expected: Iterable[int] = (200,)
+    ) -> httpx.Response:
+        uri = f"{self.base_path}/{quote(bucket, safe='')}"
+        if key:
+            uri += "/" + quote(key, safe="/~")
+        query = "&".join(
+            f"{quote(name, safe='~')}={quote(value, safe='~')}"
+            for name, value in sorted((params or {}).items())
+        )
+        url = self.base_url + uri + (f"?{query}" if query else "")
+        if len(content) >= _HASH_IN_THREAD_SIZE:
+            payload_hash = await asyncio.to_thread(_sha256, content)
+        else:
+            payload_hash = _sha256(content)
+
+        attempt = 0
+        while True:
+            # Bei jeder Wiederholung neu signieren, da die Signatur den Zeitpunkt enthält
+            signed = self._sign(method, uri, query, headers or {}, payload_hash)
+            try:
+                response = await self.client.request(method, url, content=content, headers=signed)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise S3Error(f"Objektspeicher nicht erreichbar: {type(e).__name__}: {str(e)}")
+            else:
+                if response.status_code in expected:
+                    return response
+                if response.status_code < 500 or attempt >= self.max_retries:
+                    raise self._error(response)
+            attempt += 1
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+    @staticmethod
+    def _error(response: httpx.Response) -> S3Error:
+        code = message = None
+        try:
+            root = ET.fromstring(response.content)
+            code = root.findtext("{*}Code") or root.findtext("Code")
+            message = root.findtext("{*}Message") or root.findtext("Message")
+        except ET.ParseError:
+            pass
+        return S3Error(
+            f"{response.request.method} {response.request.url.path} fehlgeschlagen: "
+            f"{response.status_code} {code or ''} {message or ''}".strip(),
+            status_code=response.status_code,
+            code=code
+        )
+
+    async def put_object(self, bucket: str, key: str, data: bytes, headers: Optional[Dict[str, str]] = None):
+        """
+        Lädt ein Objekt in einer Anfrage hoch.
+
+        Args:
+            bucket: Der Bucket
+            key: Schlüssel des Objekts
+            data: Der Inhalt
+            headers: Zusätzliche Header (z.B. x-amz-tagging)
+        """
+        await self._request("PUT", bucket, key, content=data, headers=headers)
+
+    async def create_multipart_upload(self, bucket: str, key: str, headers: Optional[Dict[str, str]] = None) -> str:
+        """
+        Beginnt einen Multipart-Upload.
+
+        Args:
+            bucket: Der Bucket
+            key: Schlüssel des Objekts
+            headers: Zusätzliche Header (z.B. x-amz-tagging)
+
+        Returns:
+            str: ID des Uploads
+        """
+        response = await self._request("POST", bucket, key, params={"uploads": ""}, headers=headers)
+        upload_id = ET.fromstring(response.content).findtext("{*}UploadId")
+        if not upload_id:
+            raise S3Error(f"Keine Upload-ID für {key} erhalten")
+        return upload_id
+
+    async def upload_part(self, bucket: str, key: str, upload_id: str, number: int, data: bytes) -> str:
+        """
+        Lädt einen Teil eines Multipart-Uploads hoch.
+
+        Args:
+            bucket: Der Bucket
+            key: Schlüssel des Objekts
+            upload_id: ID des Uploads
+            number: Nummer des Teils (ab 1)
+            data: Inhalt des Teils
+
+        Returns:
+            str: ETag des Teils
+        """
+        response = await self._request(
+            "PUT", bucket, key, params={"partNumber": str(number), "uploadId": upload_id}, content=data
+        )
+        return response.headers["etag"]
+
+    async def complete_multipart_upload(self, bucket: str, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        """
+        Schließt einen Multipart-Upload ab; erst dann wird das Objekt sichtbar.
+
+        Args:
+            bucket: Der Bucket
+            key: Schlüssel des Objekts
+            upload_id: ID des Uploads
+            parts: Nummer und ETag aller Teile in aufsteigender Reihenfolge
+        """
+        root = ET.Element("CompleteMultipartUpload", xmlns=S3_NAMESPACE)
+        for number, etag in parts:
+            part = ET.SubElement(root, "Part")
+            ET.SubElement(part, "PartNumber").text = str(number)
+            ET.SubElement(part, "ETag").text = etag
+        response = await self._request(
+            "POST", bucket, key, params={"uploadId": upload_id}, content=ET.tostring(root)
+        )
+        # Fehler können auch mit Status 200 im Inhalt gemeldet werden
+        if _local_name(ET.fromstring(response.content)) == "Error":
+            raise self._error(response)
+
+    async def abort_multipart_upload(self, bucket: str, key: str, upload_id: str):
+        """
+        Bricht einen Multipart-Upload ab und gibt die bereits hochgeladenen Teile frei.
+
+        Args:
+            bucket: Der Bucket
+            key: Schlüssel des Objekts
+            upload_id: ID des Uploads
+        """
+        await self._request("DELETE", bucket, key, params={"uploadId": upload_id}, expected=(200, 204, 404))
+
+    async def list_objects(self, bucket: str, prefix: str) -> AsyncIterator[S3Object]:
+        """
+        Listet alle Objekte mit einem Präfix auf (ListObjectsV2, seitenweise).
+
+        Args:
+            bucket: Der Bucket
+            prefix: Das Präfix der Schlüssel
+
+        Yields:
+            S3Object: Schlüssel, Größe und Änderungszeitpunkt je Objekt
+        """
+        params = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self._request("GET", bucket, params=params)
+            root = ET.fromstring(response.content)
+            for contents in root.iterfind("{*}Contents"):
+                last_modified = contents.findtext("{*}LastModified").replace("Z", "+00:00")
+                yield S3Object(
+                    key=contents.findtext("{*}Key"),
+                    size=int(contents.findtext("{*}Size") or 0),
+                    last_modified=datetime.fromisoformat(last_modified)
+                )
+            token = root.findtext("{*}NextContinuationToken")
+            if root.findtext("{*}IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    async def delete_objects(self, bucket: str, keys: List[str]) -> int:
+        """
+        Löscht Objekte in Stapeln von bis zu DELETE_BATCH_SIZE Schlüsseln je Anfrage.
+
+        Args:
+            bucket: Der Bucket
+            keys: Schlüssel der zu löschenden Objekte
+
+        Returns:
+            int: Anzahl der gelöschten Objekte
+        """
+        deleted = 0
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            root = ET.Element("Delete", xmlns=S3_NAMESPACE)
+            ET.SubElement(root, "Quiet").text = "true"
+            for key in batch:
+                ET.SubElement(ET.SubElement(root, "Object"), "Key").text = key
+            body = ET.tostring(root)
+            response = await self._request(
+                "POST", bucket, params={"delete": ""}, content=body, headers={"content-md5": _md5(body)}
+            )
+            errors = ET.fromstring(response.content).findall("{*}Error")
+            for error in errors:
+                logger.error(
+                    f"Objekt {error.findtext('{*}Key')} konnte nicht gelöscht werden: "
+                    f"{error.findtext('{*}Code')} {error.findtext('{*}Message') or ''}".strip()
+                )
+            deleted += len(batch) - len(errors)
+        return deleted
+
+    async def set_expiration_rule(
+        self,
+        bucket: str,
+        rule_id: str,
+        prefix: str,
+        days: int,
+        tags: Optional[Dict[str, str]] = None
+    ):
+        """
+        Legt eine Lebenszyklusregel an bzw. ersetzt sie, nach der Objekte mit dem Präfix (und
+        ggf. den Tags) nach einer Anzahl von Tagen vom Server gelöscht werden. Andere Regeln
+        des Buckets bleiben erhalten.
+
+        Args:
+            bucket: Der Bucket
+            rule_id: Eindeutige ID der Regel
+            prefix: Präfix der Schlüssel
+            days: Tage bis zum Ablauf
+            tags: Tags, die die Objekte zusätzlich tragen müssen
+        """
+        try:
+            response = await self._request("GET", bucket, params={"lifecycle": ""})
+            root = _strip_namespace(ET.fromstring(response.content))
+        except S3Error as e:
+            if e.code != "NoSuchLifecycleConfiguration":
+                raise
+            root = ET.Element("LifecycleConfiguration")
+        root.set("xmlns", S3_NAMESPACE)
+        for rule in root.findall("Rule"):
+            if rule.findtext("ID") == rule_id:
+                root.remove(rule)
+
+        rule = ET.SubElement(root, "Rule")
+        ET.SubElement(rule, "ID").text = rule_id
+        rule_filter = ET.SubElement(rule, "Filter")
+        if tags:
+            rule_filter = ET.SubElement(rule_filter, "And")
+        ET.SubElement(rule_filter, "Prefix").text = prefix
+        for name, value in (tags or {}).items():
+            tag = ET.SubElement(rule_filter, "Tag")
+            ET.SubElement(tag, "Key").text = name
+            ET.SubElement(tag, "Value").text = value
+        ET.SubElement(rule, "Status").text = "Enabled"
+        ET.SubElement(ET.SubElement(rule, "Expiration"), "Days").text = str(days)
+
+        body = ET.tostring(root)
+        await self._request("PUT", bucket, params={"lifecycle": ""}, content=body, headers={"content-md5": _md5(body)})
@@ -0,0 +1,22 @@
+"""
+Gemeinsame Fixtures für die Tests.
+"""
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+
+
+@pytest_asyncio.fixture
+async def session(tmp_path):
+    """
+    Sitzung auf einer leeren SQLite-Datenbank mit allen Tabellen der Modelle.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
@@ -0,0 +1,47 @@
+"""
+Tests für das atomare Schreiben von Dateien (app.utils.atomic_file).
+"""
+
+import os
+
+import pytest
+
+from app.utils.atomic_file import FILE_MODE, AtomicFile, _read_umask
+
+
+@pytest.mark.asyncio
+async def test_commit_replaces_target(tmp_path):
+    target = tmp_path / "ausgabe.json"
+    target.write_bytes(b"alt")
+
+    file = await AtomicFile(str(target)).open()
+    await file.write(b"neu")
+    # Bis zum Commit bleibt die alte Datei sichtbar
+    assert target.read_bytes() == b"alt"
+    await file.commit()
+
+    assert target.read_bytes() == b"neu"
+    assert os.listdir(tmp_path) == ["ausgabe.json"]
+    assert os.stat(target).st_mode & 0o777 == FILE_MODE
+
+
+@pytest.mark.asyncio
+async def test_abort_keeps_target(tmp_path):
+    target = tmp_path / "ausgabe.json"
+    target.write_bytes(b"alt")
+
+    file = await AtomicFile(str(target), fsync=False).open()
+    await file.write(b"neu")
+    await file.abort()
+
+    assert target.read_bytes() == b"alt"
+    assert os.listdir(tmp_path) == ["ausgabe.json"]
+
+
+def test_read_umask_does_not_change_umask():
+    current = os.umask(0o027)
+    try:
+        assert _read_umask() == 0o027
+        assert os.umask(current) == 0o027
+    finally:
+        os.umask(current)
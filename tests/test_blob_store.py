@@ -0,0 +1,59 @@
+"""
+Tests für den inhaltsadressierten Speicher der Ausgabedateien (app.utils.blob_store).
+"""
+
+import os
+
+import pytest
+
+from app.utils.blob_store import ContentAddressedFile, add_blob, blob_path, collect_garbage, link_blob
+
+
+async def write_file(path, root, data):
+    file = ContentAddressedFile(str(path), str(root), fsync=False)
+    await file.open()
+    await file.write(data)
+    await file.commit()
+    return file
+
+
+@pytest.mark.asyncio
+async def test_identical_content_is_linked_to_one_blob(tmp_path):
+    first = await write_file(tmp_path / "a.json", tmp_path, b"{}")
+    second = await write_file(tmp_path / "b.json", tmp_path, b"{}")
+    third = await write_file(tmp_path / "c.json", tmp_path, b"[]")
+
+    assert not first.deduplicated
+    assert second.deduplicated
+    assert not third.deduplicated
+    assert os.path.samefile(tmp_path / "a.json", tmp_path / "b.json")
+    assert os.stat(blob_path(str(tmp_path), first.digest)).st_nlink == 3
+    assert (tmp_path / "b.json").read_bytes() == b"{}"
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(".") and path.is_file()]
+
+
+def test_link_blob_without_blob(tmp_path):
+    target = tmp_path / "a.json"
+    target.write_bytes(b"alt")
+    assert not link_blob(blob_path(str(tmp_path), "ab" * 32), str(target))
+    assert target.read_bytes() == b"alt"
+
+
+def test_collect_garbage_removes_unreferenced_blobs(tmp_path):
+    root = str(tmp_path)
+    digest = "ab" * 32
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    first.write_bytes(b"{}")
+    second.write_bytes(b"alt")
+    blob = blob_path(root, digest)
+    add_blob(str(first), blob)
+    assert link_blob(blob, str(second))
+    assert os.stat(blob).st_nlink == 3
+
+    # Blob wird erst entfernt, wenn keine Ausgabedatei mehr auf ihn verweist
+    first.unlink()
+    assert collect_garbage(root, [digest]) == (0, 0)
+    second.unlink()
+    assert collect_garbage(root) == (1, 2)
+    assert not os.path.exists(blob)
+    assert not os.path.exists(os.path.dirname(blob))
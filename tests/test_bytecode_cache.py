@@ -0,0 +1,45 @@
+"""
+Tests für den Cache kompilierter Handler-Skripte.
+"""
+
+import pytest
+
+from app.services.bytecode_cache import BytecodeCache
+from app.services.sandbox_pool import SandboxWorkerPool
+
+SCRIPT = "def process_data(data):\n    return data\n"
+
+
+def test_bytecode_cache_keys():
+    cache = BytecodeCache(max_entries=2)
+    compiled = cache.get(SCRIPT)
+    assert cache.get(SCRIPT) is compiled
+    assert cache.get(SCRIPT + "# geändert\n").code_key != compiled.code_key
+
+    # Handler-Version als Schlüssel; Invalidierung entfernt alle Versionen des Handlers
+    versioned = cache.get(SCRIPT, (1, 1))
+    assert cache.get(SCRIPT, (1, 1)) is versioned
+    cache.invalidate(1)
+    assert cache.get(SCRIPT, (1, 1)) is not versioned
+
+
+def test_bytecode_cache_rejects_invalid_script():
+    assert BytecodeCache(max_entries=2).get("def (") is None
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_loaded_code_across_jobs():
+    compiled = BytecodeCache(max_entries=2).get(SCRIPT)
+    job = {"script": None, "code_key": compiled.code_key}
+    pool = SandboxWorkerPool(1, 100, 1024)
+    await pool.start()
+    try:
+        worker = pool._workers[0]
+        assert (await pool.run(job, 1, 10, compiled.code))["data"] == 1
+
+        # Der Code wird nur einmal übertragen; der Kindprozess des zweiten Auftrags erbt ihn vom Worker
+        assert compiled.code_key in worker.code_keys
+        assert (await pool.run(job, 2, 10, compiled.code))["data"] == 2
+        assert pool._workers == [worker]
+    finally:
+        await pool.shutdown()
@@ -0,0 +1,32 @@
+"""
+Tests für die inkrementelle Komprimierung von Ausgabedateien (app.utils.compression).
+"""
+
+import gzip
+
+import pytest
+
+from app.utils.compression import Compressor
+
+
+def compress_blocks(codec, blocks):
+    compressor = Compressor(codec)
+    return b"".join(compressor.compress(block) for block in blocks) + compressor.flush()
+
+
+def test_gzip_blocks_form_one_stream():
+    blocks = [b"erster Block\n", b"zweiter Block\n" * 1000]
+    assert gzip.decompress(compress_blocks("gzip", blocks)) == b"".join(blocks)
+
+
+def test_zstd_blocks_form_one_stream():
+    zstandard = pytest.importorskip("zstandard")
+    blocks = [b"erster Block\n", b"zweiter Block\n" * 1000]
+    data = compress_blocks("zstd", blocks)
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(data) == b"".join(blocks)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        Compressor("brotli")
+
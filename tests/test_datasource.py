@@ -0,0 +1,130 @@
+"""
+Tests für die Verwaltung von Datenquellen, ihre Zuordnungen und den Zustand ihrer Abrufe.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.datasource import DataSource, DataSourceCreate, DataSourceRead, DataSourceUpdate, FetchStatus
+from app.models.handler import Handler
+from app.models.output import Output
+from app.scheduler.http_client import get_conditional_headers
+from app.services import datasource as datasource_module
+from app.services.datasource import DataSourceService
+from app.services.handler import HandlerService
+from app.services.output import OutputService
+from app.services.sandbox import SandboxService
+
+
+@pytest.fixture(autouse=True)
+def valid_urls(monkeypatch):
+    # Keine Netzwerkzugriffe bei der Prüfung der URL
+    monkeypatch.setattr(datasource_module, "validate_url", lambda url: (True, None))
+
+
+async def add(session, *items):
+    session.add_all(items)
+    await session.commit()
+    return items
+
+
+def datasource(**values):
+    return DataSourceCreate(**dict({"name": "feed", "url": "http://example.com/feed", "frequency": 60}, **values))
+
+
+@pytest.mark.asyncio
+async def test_links_handlers_and_active_outputs(session):
+    first, second = await add(session, Handler(name="a", script="x = 1"), Handler(name="b", script="x = 2"))
+    active, inactive = await add(
+        session,
+        Output(name="aktiv", path="a.json"),
+        Output(name="inaktiv", path="b.json", active=False)
+    )
+    service = DataSourceService(session)
+    created = await service.create(
+        datasource(handler_ids=[second.id, first.id], output_ids=[active.id, inactive.id])
+    )
+
+    read = DataSourceRead.model_validate(created, from_attributes=True)
+    assert read.frequency == 60
+    assert read.handler_ids == [first.id, second.id]
+
+    handlers = await HandlerService(session, SandboxService()).get_by_datasource(created.id)
+    assert [handler.name for handler in handlers] == ["a", "b"]
+    outputs = await OutputService(session).get_by_datasource(created.id)
+    assert [output.name for output in outputs] == ["aktiv"]
+
+
+@pytest.mark.asyncio
+async def test_update_replaces_links(session):
+    first, second = await add(session, Handler(name="a", script="x = 1"), Handler(name="b", script="x = 2"))
+    service = DataSourceService(session)
+    created = await service.create(datasource(handler_ids=[first.id]))
+
+    await service.update(created.id, DataSourceUpdate(handler_ids=[second.id]))
+    handlers = await HandlerService(session, SandboxService()).get_by_datasource(created.id)
+    assert [handler.id for handler in handlers] == [second.id]
+
+
+@pytest.mark.asyncio
+async def test_unknown_links_are_rejected(session):
+    with pytest.raises(HTTPException) as error:
+        await DataSourceService(session).create(datasource(handler_ids=[42]))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_handler_removes_its_links(session):
+    handler, = await add(session, Handler(name="a", script="x = 1"))
+    created = await DataSourceService(session).create(datasource(handler_ids=[handler.id]))
+
+    handler_service = HandlerService(session, SandboxService())
+    await handler_service.delete(handler.id)
+    assert await handler_service.get_by_datasource(created.id) == []
+
+
+def fetched(**values):
+    return DataSource(**dict({"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}, **values))
+
+
+def test_conditional_headers():
+    assert get_conditional_headers(fetched()) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert get_conditional_headers(DataSource()) == {}
+
+
+def test_forced_run_fetches_unconditionally():
+    # Ohne Validatoren antwortet der Server nicht mit 304, sodass die Verarbeitung stattfindet
+    assert get_conditional_headers(fetched(force_process_every=3, unchanged_runs=1))
+    assert get_conditional_headers(fetched(force_process_every=3, unchanged_runs=2)) == {}
+    assert get_conditional_headers(fetched(force_process_every=1, unchanged_runs=0)) == {}
+
+
+def test_content_unchanged():
+    service = DataSourceService(None)
+    assert service.is_content_unchanged(fetched(content_digest="abc"), "abc")
+    assert not service.is_content_unchanged(fetched(content_digest="abc"), "def")
+    assert service.is_content_unchanged(fetched(content_digest="abc", force_process_every=3, unchanged_runs=1), "abc")
+    assert not service.is_content_unchanged(fetched(content_digest="abc", force_process_every=3, unchanged_runs=2), "abc")
+
+
+@pytest.mark.asyncio
+async def test_record_fetch(session):
+    source, = await add(session, DataSource(name="feed", url="http://example.com", frequency=timedelta(seconds=60)))
+    service = DataSourceService(session)
+
+    await service.record_fetch(source, FetchStatus.SUCCESS, etag='"v1"', content_digest="abc")
+    await service.record_fetch(source, FetchStatus.UNCHANGED)
+    assert (source.etag, source.content_digest, source.unchanged_runs) == ('"v1"', "abc", 1)
+
+    # Neue Validatoren für unveränderten Inhalt werden übernommen, fehlgeschlagene Läufe ändern nichts
+    await service.record_fetch(source, FetchStatus.UNCHANGED, etag='"v2"')
+    await service.record_fetch(source, FetchStatus.ERROR, etag='"v3"', content_digest="def")
+    assert (source.etag, source.content_digest, source.unchanged_runs) == ('"v2"', "abc", 2)
+
+    await service.record_fetch(source, FetchStatus.SUCCESS, etag='"v4"', content_digest="def")
+    assert (source.etag, source.content_digest, source.unchanged_runs) == ('"v4"', "def", 0)
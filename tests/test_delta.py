@@ -0,0 +1,36 @@
+"""
+Tests für die Delta-Kodierung von Versionen (app.utils.delta).
+"""
+
+import pytest
+
+from app.utils.delta import DeltaError, apply, encode
+
+BASE = b"".join(f'{{"id": {i}, "name": "eintrag {i}"}}\n'.encode() for i in range(100))
+
+
+@pytest.mark.parametrize("target", [
+    BASE,
+    b"",
+    BASE.replace(b'"eintrag 50"', b'"geaendert"'),
+    b'{"neu": true}\n' + BASE[:2000] + b"ohne Zeilenende",
+    bytes(range(256)) * 4,
+])
+def test_round_trip(target):
+    assert apply(BASE, encode(BASE, target)) == target
+
+
+def test_unchanged_lines_are_copied():
+    target = BASE.replace(b'"eintrag 50"', b'"geaendert"')
+    assert len(encode(BASE, target)) < len(target) // 10
+
+
+def test_invalid_delta_raises():
+    with pytest.raises(DeltaError):
+        apply(BASE, b"kein delta")
+
+
+def test_delta_for_other_keyframe_raises():
+    delta = encode(BASE, BASE)
+    with pytest.raises(DeltaError):
+        apply(BASE[:100], delta)
@@ -0,0 +1,108 @@
+"""
+Tests für bedingte Anfragen und Teilanfragen beim Ausliefern von Dateien (app.utils.file_response).
+"""
+
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.utils.file_response import RangeNotSatisfiable, parse_range, serve_bytes, serve_file
+
+CONTENT = b"0123456789" * 10
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_bytes(CONTENT)
+
+    async def file_endpoint(request):
+        return await serve_file(request, str(path))
+
+    async def bytes_endpoint(request):
+        return serve_bytes(request, CONTENT, '"version-1"', 1700000000.0, "data.json")
+
+    app = Starlette(routes=[Route("/file", file_endpoint), Route("/bytes", bytes_endpoint)])
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 10)),
+    ("bytes=90-", (90, 100)),
+    ("bytes=-5", (95, 100)),
+    ("bytes=50-500", (50, 100)),
+    ("bytes=9-3", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_full_response(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"]
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_not_modified(client, url):
+    etag = client.get(url).headers["etag"]
+    response = client.get(url, headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_partial_content(client, url):
+    response = client.get(url, headers={"range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert response.headers["content-length"] == "10"
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_range_not_satisfiable(client, url):
+    response = client.get(url, headers={"range": "bytes=100-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_outdated_if_range_sends_full_content(client, url):
+    response = client.get(url, headers={"range": "bytes=10-19", "if-range": '"veraltet"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_compressed_file_is_decompressed_for_other_clients(tmp_path):
+    path = tmp_path / "data.json.gz"
+    path.write_bytes(gzip.compress(CONTENT))
+
+    async def endpoint(request):
+        return await serve_file(request, str(path))
+
+    with TestClient(Starlette(routes=[Route("/", endpoint)])) as client:
+        response = client.get("/", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == CONTENT
+
+        response = client.get("/", headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.content == CONTENT
@@ -0,0 +1,148 @@
+"""
+Tests für den Dateiindex der Ausgaben und die Bereinigung abgelaufener Dateien.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from app.models.output import OutputCreate, OutputLayout, OutputStrategy
+from app.models.output_file import OutputFile
+from app.services.output import OutputService
+
+
+async def chunks(data):
+    yield data
+
+
+@pytest_asyncio.fixture
+async def output_service(session, tmp_path):
+    service = OutputService(session)
+    service.base_output_dir = str(tmp_path)
+    return service
+
+
+async def create_output(output_service, path="archiv/daten.json", retention_days=7, layout=OutputLayout.FLAT):
+    return await output_service.create(OutputCreate(
+        name=path,
+        path=path,
+        strategy=OutputStrategy.TIMESTAMP,
+        retention_days=retention_days,
+        fsync_policy="none",
+        layout=layout,
+    ))
+
+
+async def write(output_service, output, data, age_days=0):
+    writer, = await output_service.save_stream(chunks(data), [output])
+    assert writer.success
+    # Alter der Datei festlegen; der Zeitstempel im Namen hält Dateien derselben Sekunde auseinander
+    created_at = datetime.now() - timedelta(days=age_days)
+    name, extension = os.path.splitext(output.path)
+    path = f"{name}_{created_at:%Y%m%d_%H%M%S}{extension}"
+    os.replace(writer.path, os.path.join(output_service.base_output_dir, path))
+    await output_service.session.execute(
+        update(OutputFile)
+        .where(OutputFile.path == os.path.relpath(writer.path, output_service.base_output_dir))
+        .values(path=path, created_at=created_at)
+    )
+    await output_service.session.commit()
+    return os.path.join(output_service.base_output_dir, path)
+
+
+async def add_file(output_service, output, age_days):
+    # Datei an dem Pfad anlegen, den die Ausgabe zu diesem Zeitpunkt geschrieben hätte
+    created_at = datetime.now() - timedelta(days=age_days)
+    path = output_service._resolve_path(output, created_at)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"{}")
+    output_service.session.add(OutputFile(
+        output_id=output.id,
+        path=os.path.relpath(path, output_service.base_output_dir),
+        size=2,
+        created_at=created_at,
+    ))
+    await output_service.session.commit()
+    return path
+
+
+async def indexed_paths(session):
+    result = await session.execute(select(OutputFile.path).order_by(OutputFile.path))
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_written_files_are_indexed(output_service, tmp_path):
+    output = await create_output(output_service)
+    path = await write(output_service, output, {"a": 1})
+
+    output_file, = (await output_service.session.execute(select(OutputFile))).scalars().all()
+    assert output_file.output_id == output.id
+    assert output_file.path == os.path.relpath(path, tmp_path)
+    assert output_file.size == os.path.getsize(path)
+
+
+@pytest.mark.asyncio
+async def test_clean_old_files_deletes_expired_files(output_service, tmp_path):
+    output = await create_output(output_service)
+    old = await write(output_service, output, {"a": 1}, age_days=10)
+    new = await write(output_service, output, {"b": 2})
+
+    assert await output_service.clean_old_files(output.id) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+    assert await indexed_paths(output_service.session) == [os.path.relpath(new, tmp_path)]
+
+
+@pytest.mark.asyncio
+async def test_clean_old_files_drops_index_entries_of_missing_files(output_service):
+    output = await create_output(output_service)
+    path = await write(output_service, output, {"a": 1}, age_days=10)
+    os.remove(path)
+
+    assert await output_service.clean_old_files(output.id) == 0
+    assert await indexed_paths(output_service.session) == []
+
+
+@pytest.mark.asyncio
+async def test_clean_old_files_collects_blobs(output_service, tmp_path):
+    output = await create_output(output_service)
+    path = await write(output_service, output, {"a": 1}, age_days=10)
+    digest, = (await output_service.session.execute(select(OutputFile.digest))).scalars().all()
+    assert os.path.exists(tmp_path / ".blobs" / digest[:2] / digest)
+
+    assert await output_service.clean_old_files(output.id) == 1
+    assert not os.path.exists(path)
+    assert not os.path.exists(tmp_path / ".blobs" / digest[:2] / digest)
+
+
+@pytest.mark.asyncio
+async def test_clean_old_files_drops_expired_partitions(output_service, tmp_path):
+    output = await create_output(output_service, "feed.json", layout=OutputLayout.DATE)
+    old = [await add_file(output_service, output, 10), await add_file(output_service, output, 10.0001)]
+    new = await add_file(output_service, output, 1)
+
+    assert await output_service.clean_old_files(output.id) == 2
+    assert not any(os.path.exists(path) for path in old)
+    assert not os.path.exists(os.path.dirname(old[0]))
+    assert os.path.exists(new)
+    assert await indexed_paths(output_service.session) == [os.path.relpath(new, tmp_path)]
+
+
+@pytest.mark.asyncio
+async def test_dropping_partitions_keeps_files_of_other_outputs(output_service, tmp_path):
+    # feed.json und feed.csv teilen sich die Tagesverzeichnisse unter feed/
+    json_output = await create_output(output_service, "feed.json", layout=OutputLayout.DATE)
+    csv_output = await create_output(output_service, "feed.csv", retention_days=30, layout=OutputLayout.DATE)
+    expired = await add_file(output_service, json_output, 10)
+    kept = await add_file(output_service, csv_output, 10)
+    assert os.path.dirname(expired) == os.path.dirname(kept)
+
+    assert await output_service.clean_old_files(json_output.id) == 1
+    assert not os.path.exists(expired)
+    assert os.path.exists(kept)
+    assert await indexed_paths(output_service.session) == [os.path.relpath(kept, tmp_path)]
@@ -0,0 +1,105 @@
+"""
+Tests für das nebenläufige Schreiben in mehrere Ausgaben.
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.config.settings import settings
+from app.models.output import Output, OutputStrategy
+from app.services.output import OutputService
+from app.services.output_writer import OutputWriter
+
+CHUNKS = [f"zeile {i}\n" for i in range(20)]
+CONTENT = "".join(CHUNKS)
+
+
+async def chunks():
+    for chunk in CHUNKS:
+        yield chunk
+
+
+@pytest_asyncio.fixture
+async def output_service(session, tmp_path, monkeypatch):
+    # Jedes Teilergebnis als eigenen Block weitergeben
+    monkeypatch.setattr(settings, "OUTPUT_BUFFER_SIZE", 1)
+    service = OutputService(session)
+    service.base_output_dir = str(tmp_path)
+    return service
+
+
+async def make_outputs(output_service, *names):
+    outputs = [
+        Output(name=name, path=f"{name}.txt", strategy=OutputStrategy.OVERWRITE, fsync_policy="none")
+        for name in names
+    ]
+    output_service.session.add_all(outputs)
+    await output_service.session.commit()
+    return outputs
+
+
+@pytest.mark.asyncio
+async def test_slow_output_does_not_block_others(output_service, tmp_path, monkeypatch):
+    write = OutputWriter._write
+    fast_done = asyncio.Event()
+
+    async def gated_write(self, block, final=False):
+        if self.output.name == "langsam":
+            # Erst schreiben, wenn die schnelle Ausgabe bereits alle Blöcke erhalten hat
+            await fast_done.wait()
+        await write(self, block, final)
+        if self.output.name == "schnell" and self.bytes_written == len(CONTENT):
+            fast_done.set()
+
+    monkeypatch.setattr(OutputWriter, "_write", gated_write)
+    writers = await asyncio.wait_for(
+        output_service.save_stream(chunks(), await make_outputs(output_service, "langsam", "schnell")), 5
+    )
+
+    assert all(writer.success for writer in writers)
+    assert (tmp_path / "langsam.txt").read_text() == CONTENT
+    assert (tmp_path / "schnell.txt").read_text() == CONTENT
+
+
+@pytest.mark.asyncio
+async def test_slow_output_is_bounded_by_buffer(output_service, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_WRITER_BUFFER_SIZE", 16)
+    write = OutputWriter._write
+    pending = []
+
+    async def slow_write(self, block, final=False):
+        pending.append(self._pending)
+        await asyncio.sleep(0.001)
+        await write(self, block, final)
+
+    monkeypatch.setattr(OutputWriter, "_write", slow_write)
+    writer, = await output_service.save_stream(chunks(), await make_outputs(output_service, "langsam"))
+
+    assert writer.success
+    assert max(pending) <= 16
+
+
+@pytest.mark.asyncio
+async def test_failed_output_does_not_affect_others(output_service, tmp_path, monkeypatch):
+    (tmp_path / "kaputt.txt").write_text("alt")
+    write = OutputWriter._write
+
+    async def failing_write(self, block, final=False):
+        if self.output.name == "kaputt":
+            raise OSError("Datenträger voll")
+        await write(self, block, final)
+
+    monkeypatch.setattr(OutputWriter, "_write", failing_write)
+    failed, ok = await output_service.save_stream(
+        chunks(), await make_outputs(output_service, "kaputt", "gut")
+    )
+
+    assert not failed.success
+    assert "Datenträger voll" in failed.error
+    assert ok.success
+    assert (tmp_path / "gut.txt").read_text() == CONTENT
+    # Die bisherige Datei der fehlgeschlagenen Ausgabe bleibt erhalten
+    assert (tmp_path / "kaputt.txt").read_text() == "alt"
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(".")]
@@ -0,0 +1,78 @@
+"""
+Tests für das Rahmenprotokoll der Sandbox (app.sandbox.protocol).
+"""
+
+import io
+
+import pytest
+
+from app.sandbox.protocol import (
+    KIND_BINARY,
+    KIND_BYTES,
+    KIND_JSON,
+    KIND_TEXT,
+    ProtocolError,
+    decode_value,
+    encode_batch_job,
+    encode_job,
+    encode_value,
+    read_job,
+    read_result,
+    write_chunk,
+    write_result,
+)
+
+
+@pytest.mark.parametrize("value, kind", [
+    ("text", KIND_TEXT),
+    (b"\x00\x01", KIND_BYTES),
+    ({"a": [1, 2.5, None]}, KIND_JSON),
+    ({"raw": b"\xff"}, KIND_BINARY),
+])
+def test_value_round_trip(value, kind):
+    encoded_kind, body = encode_value(value)
+    assert encoded_kind == kind
+    assert decode_value(encoded_kind, bytes(body)) == value
+
+
+def test_job_round_trip():
+    stream = io.BytesIO(encode_job({"script": "x = 1"}, {"items": [1, 2]}, code=b"code"))
+    job, input_data, code = read_job(stream)
+    assert job["script"] == "x = 1"
+    assert input_data == {"items": [1, 2]}
+    assert code == b"code"
+    assert read_job(stream) is None
+
+
+def test_batch_job_round_trip():
+    job = {"handlers": [{"script": "a"}, {"script": "b"}]}
+    stream = io.BytesIO(encode_batch_job(job, "daten", [b"code-a", None]))
+    job, input_data, code = read_job(stream)
+    assert code is None
+    assert input_data == "daten"
+    assert [entry["code"] for entry in job["handlers"]] == [b"code-a", None]
+
+
+def test_result_round_trip():
+    stream = io.BytesIO()
+    write_result(stream, {"success": True, "data": {"x": 1}, "error": None})
+    stream.seek(0)
+    result = read_result(stream)
+    assert result == {"success": True, "data": {"x": 1}, "error": None}
+    assert read_result(stream) is None
+
+
+def test_streamed_result_collects_chunks():
+    stream = io.BytesIO()
+    write_chunk(stream, "a")
+    write_chunk(stream, {"b": 2})
+    write_chunk(stream, b"c", encoding="binary")
+    write_result(stream, {"success": True, "data": None, "error": None, "streamed": True})
+    stream.seek(0)
+    assert read_result(stream)["data"] == ["a", {"b": 2}, b"c"]
+
+
+def test_truncated_frame_raises():
+    data = encode_job({"script": "x = 1"}, "eingabe")
+    with pytest.raises(ProtocolError):
+        read_job(io.BytesIO(data[:-3]))
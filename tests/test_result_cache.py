@@ -0,0 +1,106 @@
+"""
+Tests für den Ergebnis-Cache und die Bildung seiner Schlüssel.
+"""
+
+import pytest
+
+from app.config.settings import settings
+from app.services import sandbox as sandbox_module
+from app.services.result_cache import ResultCache
+from app.services.sandbox import SandboxService
+
+SCRIPT = "def process_data(data):\n    return data\n"
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEMP_DIR", tmp_path)
+    return SandboxService()
+
+
+def result_key(sandbox, input_data, script=SCRIPT, mode="data", input_digest=None):
+    return sandbox._result_key(script, input_data, None, "utf-8", input_digest, mode)
+
+
+def test_result_key_is_stable(sandbox):
+    assert result_key(sandbox, {"a": [1, 2]}) == result_key(sandbox, {"a": [1, 2]})
+
+
+def test_result_key_depends_on_script_input_and_mode(sandbox):
+    key = result_key(sandbox, {"a": 1})
+    assert result_key(sandbox, {"a": 2}) != key
+    assert result_key(sandbox, {"a": 1}, script=SCRIPT + "# geändert\n") != key
+    assert result_key(sandbox, {"a": 1}, mode="stream") != key
+
+
+def test_result_key_distinguishes_types(sandbox):
+    # Der Text "1" und die Zahl 1 dürfen sich keinen Eintrag teilen
+    assert result_key(sandbox, "1") != result_key(sandbox, 1)
+
+
+def test_result_key_uses_known_input_digest(sandbox):
+    assert result_key(sandbox, None, input_digest="abc") == result_key(sandbox, "anders", input_digest="abc")
+
+
+def test_result_key_disabled(sandbox, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    assert result_key(sandbox, {"a": 1}) is None
+
+
+@pytest.mark.asyncio
+async def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache(tmp_path, 10, 1024 * 1024, 1024 * 1024, 1024 * 1024, 60)
+    key = ResultCache.make_key("skript", "eingabe")
+    recorder = cache.recorder(streamed=True)
+    for chunk in ("a", {"b": 2}, b"c"):
+        recorder.add(chunk)
+    await cache.put(key, recorder.result())
+
+    # Neue Instanz liest den Eintrag von der Festplatte
+    cache = ResultCache(tmp_path, 10, 1024 * 1024, 1024 * 1024, 1024 * 1024, 60)
+    entry = await cache.get(key)
+    assert list(entry.chunks()) == ["a", {"b": 2}, b"c"]
+    assert cache.counters["disk_hits"] == 1
+    assert await cache.get(ResultCache.make_key("skript", "andere")) is None
+
+
+@pytest.mark.asyncio
+async def test_execute_script_bypasses_cache_on_request(sandbox, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        sandbox_module, "result_cache", ResultCache(tmp_path / "cache", 10, 1024 * 1024, 1024 * 1024, 1024 * 1024, 60)
+    )
+    runs = []
+
+    async def execute_async(script_content, input_data, *args):
+        runs.append(input_data)
+        return True, len(runs), None
+
+    monkeypatch.setattr(sandbox, "execute_async", execute_async)
+
+    assert await sandbox.execute_script(SCRIPT, "eingabe") == 1
+    assert await sandbox.execute_script(SCRIPT, "eingabe") == 1
+    assert len(runs) == 1
+
+    # Ohne Cache wird das Skript erneut ausgeführt und sein Ergebnis ersetzt den Eintrag
+    assert await sandbox.execute_script(SCRIPT, "eingabe", use_cache=False) == 2
+    assert await sandbox.execute_script(SCRIPT, "eingabe") == 2
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_are_reported_without_usage(sandbox, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        sandbox_module, "result_cache", ResultCache(tmp_path / "cache", 10, 1024 * 1024, 1024 * 1024, 1024 * 1024, 60)
+    )
+
+    async def execute_async(script_content, input_data, *args):
+        return True, input_data, None
+
+    monkeypatch.setattr(sandbox, "execute_async", execute_async)
+
+    runs = []
+    await sandbox.execute_script(SCRIPT, "eingabe", on_run=runs.append)
+    await sandbox.execute_script(SCRIPT, "eingabe", on_run=runs.append)
+    assert runs == [{"success": True, "error": None, "usage": None, "profile": None, "cached": True}]
@@ -0,0 +1,202 @@
+"""
+Tests für den Pool vorgestarteter Sandbox-Worker.
+"""
+
+import asyncio
+import glob
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.config.settings import settings
+from app.services.sandbox import SandboxService
+from app.services.sandbox_pool import SandboxWorkerPool, WorkerTimeoutError
+
+
+async def run(pool, script, input_data=None, timeout=10):
+    return await pool.run({"script": script}, input_data, timeout)
+
+
+@pytest_asyncio.fixture
+async def make_pool():
+    pools = []
+
+    async def make(max_jobs=100, max_rss_mb=1024):
+        pool = SandboxWorkerPool(1, max_jobs, max_rss_mb)
+        await pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        await pool.shutdown()
+
+
+def worker_pid(pool):
+    return pool._workers[0].process.pid
+
+
+def process_group_alive(pgid):
+    # Beendete, aber noch nicht eingesammelte Prozesse (Zombies) zählen nicht
+    for stat in glob.glob("/proc/[0-9]*/stat"):
+        try:
+            with open(stat) as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid and fields[0] != "Z":
+            return True
+    return False
+
+
+@pytest.mark.asyncio
+async def test_run_job(make_pool):
+    pool = await make_pool()
+    result = await run(pool, "def process_data(data):\n    return data * 2", 21)
+    assert result["success"]
+    assert result["data"] == 42
+    assert result["usage"]["wall_time"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_worker_is_reused(make_pool):
+    pool = await make_pool()
+    pid = worker_pid(pool)
+    for _ in range(3):
+        assert (await run(pool, "x = 1"))["success"]
+    assert worker_pid(pool) == pid
+
+
+@pytest.mark.asyncio
+async def test_script_output_does_not_corrupt_result(make_pool):
+    pool = await make_pool()
+    script = "import sys\ndef process_data(data):\n    print('stdout')\n    print('stderr', file=sys.stderr)\n    return data"
+    assert (await run(pool, script, "eingabe"))["data"] == "eingabe"
+
+
+@pytest.mark.asyncio
+async def test_worker_recycled_after_max_jobs(make_pool):
+    pool = await make_pool(max_jobs=2)
+    pid = worker_pid(pool)
+    await run(pool, "x = 1")
+    assert worker_pid(pool) == pid
+    await run(pool, "x = 1")
+    assert worker_pid(pool) != pid
+
+
+@pytest.mark.asyncio
+async def test_worker_recycled_above_rss_limit(make_pool):
+    pool = await make_pool(max_rss_mb=0)
+    pid = worker_pid(pool)
+    assert (await run(pool, "x = 1"))["success"]
+    assert worker_pid(pool) != pid
+
+
+@pytest.mark.asyncio
+async def test_worker_recycled_after_error(make_pool):
+    pool = await make_pool()
+    pid = worker_pid(pool)
+    result = await run(pool, "def process_data(data):\n    raise ValueError('kaputt')")
+    assert not result["success"]
+    assert "ValueError: kaputt" in result["error"]
+    assert worker_pid(pool) != pid
+
+
+@pytest.mark.asyncio
+async def test_jobs_do_not_share_interpreter_state(make_pool):
+    pool = await make_pool()
+    pid = worker_pid(pool)
+    script = """
+import json, os
+def process_data(data):
+    seen = (os.environ.get("SANDBOX_TEST"), getattr(json, "patched", False))
+    os.environ["SANDBOX_TEST"] = "1"
+    json.patched = True
+    return list(seen)
+"""
+    assert (await run(pool, script))["data"] == [None, False]
+    assert (await run(pool, script))["data"] == [None, False]
+    assert worker_pid(pool) == pid
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_result_per_script(make_pool):
+    pool = await make_pool()
+    job = {"handlers": [
+        {"script": "def process_data(data):\n    return data + 1"},
+        {"script": "def process_data(data):\n    raise ValueError('kaputt')"},
+        {"script": "def process_data(data):\n    return data * 2"},
+    ]}
+    results = []
+    async with pool.stream(job, 10, 10, [None, None, None]) as stream:
+        results.append(await stream.collect())
+        while await stream.next_result():
+            results.append(await stream.collect())
+
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["data"] for result in results] == [11, None, 20]
+    assert "ValueError: kaputt" in results[1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_timeout_covers_whole_batch(make_pool):
+    # Das Zeitlimit gilt für den Sammelauftrag insgesamt, nicht je Skript
+    pool = await make_pool()
+    handler = {"script": "import time\ndef process_data(data):\n    time.sleep(0.4)\n    return data"}
+    with pytest.raises(WorkerTimeoutError):
+        async with pool.stream({"handlers": [handler] * 4}, None, 1, [None] * 4) as stream:
+            await stream.collect()
+            while await stream.next_result():
+                await stream.collect()
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_job_and_replaces_worker(make_pool):
+    pool = await make_pool()
+    pid = worker_pid(pool)
+    started = time.monotonic()
+    with pytest.raises(WorkerTimeoutError):
+        await run(pool, "import time\ntime.sleep(30)", timeout=0.5)
+    assert time.monotonic() - started < 5
+    assert worker_pid(pool) != pid
+
+    # Mit dem Worker wurde auch der Kindprozess des Auftrags beendet
+    await asyncio.sleep(0.1)
+    assert not process_group_alive(pid)
+    assert (await run(pool, "x = 1"))["success"]
+
+
+@pytest.mark.asyncio
+async def test_timeout_covers_whole_streamed_job(make_pool):
+    # Jedes Teilergebnis trifft vor Ablauf des Zeitlimits ein, der gesamte Auftrag aber nicht
+    pool = await make_pool()
+    script = "import time\ndef process_stream(records):\n    for i in range(10):\n        time.sleep(0.3)\n        yield i"
+    started = time.monotonic()
+    with pytest.raises(WorkerTimeoutError):
+        async with pool.stream({"script": script}, "", 1) as stream:
+            async for _ in stream:
+                pass
+    assert time.monotonic() - started < 2.5
+
+
+@pytest.mark.asyncio
+async def test_crashed_job_reports_output(make_pool):
+    pool = await make_pool()
+    script = "import os, sys\nprint('letzte Worte', file=sys.stderr, flush=True)\nos.kill(os.getpid(), 9)"
+    with pytest.raises(RuntimeError, match="letzte Worte"):
+        await run(pool, script)
+    assert (await run(pool, "x = 1"))["success"]
+
+
+@pytest.mark.asyncio
+async def test_one_shot_execution_without_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SANDBOX_POOL_SIZE", 0)
+    monkeypatch.setattr(settings, "TEMP_DIR", tmp_path)
+    sandbox = SandboxService(timeout=1)
+
+    assert await sandbox.execute_async("def process_data(data):\n    return data + 1", 1) == (True, 2, None)
+
+    success, _, error = await sandbox.execute_async("import time\ntime.sleep(30)", None)
+    assert not success
+    assert "Zeitlimit von 1 Sekunden" in error
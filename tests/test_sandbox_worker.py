@@ -0,0 +1,121 @@
+"""
+Tests für die Ausführung von Aufträgen im Sandbox-Worker (app.sandbox.worker).
+"""
+
+import io
+import resource
+
+import pytest
+
+from app.sandbox.protocol import read_result
+from app.sandbox.worker import CountingStream, measure_job, run_batch, run_job
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "eingabe.txt"
+    path.write_text("a\nb\n", encoding="utf-8")
+    return str(path)
+
+
+def test_process_data_receives_spooled_input(input_file):
+    script = "def process_data(data):\n    return data.upper()"
+    result = run_job({"script": script, "input_path": input_file}, None)
+    assert result["data"] == "A\nB\n"
+
+
+def test_process_stream_receives_records():
+    script = "def process_stream(records):\n    for record in records:\n        yield record.strip()"
+    chunks = []
+    result = run_job({"script": script}, "a\nb\n", emit=chunks.append)
+    assert result["success"] and result["streamed"]
+    assert chunks == ["a", "b"]
+
+
+def test_dynamically_defined_process_stream_is_streamed(input_file):
+    script = "globals()['process_' + 'stream'] = lambda records: (record.strip() for record in records)"
+    result = run_job({"script": script, "input_path": input_file}, None)
+    assert result["data"] == ["a", "b"]
+
+
+def test_mentioning_process_stream_does_not_skip_input(input_file):
+    script = "process_stream = None\ndef process_data(data):\n    return len(data)"
+    result = run_job({"script": script, "input_path": input_file}, None)
+    assert result["data"] == 4
+
+
+def run_pipeline(handlers, input_data):
+    stream = io.BytesIO()
+    run_batch(CountingStream(stream), {"handlers": handlers}, input_data, lambda chunk: None, "json", 0)
+    stream.seek(0)
+    results = []
+    while (result := read_result(stream)) is not None:
+        results.append(result)
+    return results
+
+
+def test_pipeline_passes_result_to_next_stage():
+    results = run_pipeline([
+        {"script": "def process_data(data):\n    return data * 2", "emit": False},
+        {"script": "def process_data(data):\n    return data + 1", "parent": 0},
+        {"script": "def process_data(data):\n    return data - 1", "parent": 0},
+    ], 10)
+    # Zwischenergebnisse ohne emit werden nicht zurückgesendet
+    assert [result["data"] for result in results] == [None, 21, 19]
+
+
+def test_pipeline_reports_failed_parent():
+    results = run_pipeline([
+        {"script": "def process_data(data):\n    raise ValueError('kaputt')"},
+        {"script": "def process_data(data):\n    return data", "parent": 0},
+        {"script": "def process_data(data):\n    return data"},
+    ], 10)
+    assert not results[1]["success"]
+    assert "Die Vorstufe ist fehlgeschlagen: ValueError: kaputt" in results[1]["error"]
+    assert results[2]["data"] == 10
+
+
+def test_measure_job_reports_usage(input_file):
+    result = measure_job({"script": "def process_data(data):\n    return len(data)", "input_path": input_file}, None)
+    usage = result["usage"]
+    assert result["data"] == 4
+    assert usage["input_bytes"] == 4
+    assert usage["wall_time"] >= 0 and usage["cpu_user"] >= 0
+    assert usage["max_rss_kb"] > 0
+
+
+def test_cpu_limit_stops_script():
+    limit = resource.getrlimit(resource.RLIMIT_CPU)
+    result = run_job({"script": "while True:\n    pass", "max_cpu_seconds": 1}, None)
+    assert not result["success"]
+    assert result["error"].startswith("CPULimitExceeded")
+    # Das weiche Limit gilt nur für die Dauer des Auftrags
+    assert resource.getrlimit(resource.RLIMIT_CPU) == limit
+
+
+def test_memory_limit_stops_script():
+    script = "def process_data(data):\n    return len(bytearray(512 * 1024 * 1024))"
+    result = run_job({"script": script, "max_memory_mb": 256}, None)
+    assert not result["success"]
+    assert result["error"].startswith("MemoryError")
+    assert run_job({"script": script}, None)["data"] == 512 * 1024 * 1024
+
+
+def test_profile_lists_top_functions():
+    # Die Schleife läuft im Python-Code von slow, damit die Funktion die meiste eigene Zeit hat
+    script = """
+def slow(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+def process_data(data):
+    return [slow(10000) for _ in range(20)]
+"""
+    result = run_job({"script": script, "profile": {"top": 3, "sort": "own"}}, None)
+    profile = result["profile"]
+    assert result["success"]
+    assert profile["sort"] == "own"
+    assert len(profile["functions"]) == 3
+    slow = next(entry for entry in profile["functions"] if entry["function"] == "slow")
+    assert slow["calls"] == 20
@@ -0,0 +1,88 @@
+"""
+Tests für die fortlaufend beschriebenen Segmente der APPEND-Strategie (app.services.segments).
+"""
+
+import gzip
+
+import pytest
+
+from app.config.settings import settings
+from app.models.output import Output, OutputLayout
+from app.services import segments
+from app.services.segments import SegmentFile, close_segments
+
+
+@pytest.fixture
+def output(tmp_path):
+    yield Output(
+        id=1,
+        name="feed",
+        path=str(tmp_path / "feed.jsonl"),
+        layout=OutputLayout.FLAT,
+        compression=None,
+        compression_level=None,
+    )
+    segments._segments.clear()
+
+
+async def append(output, path, data, fsync=True):
+    segment_file = await SegmentFile(output, path, fsync=fsync).open()
+    await segment_file.write(data)
+    await segment_file.commit()
+    return segment_file
+
+
+@pytest.mark.asyncio
+async def test_commit_appends_to_segment(output, tmp_path):
+    path = str(tmp_path / "segment.jsonl")
+    await append(output, path, b"eins\n")
+    segment_file = await append(output, path, b"zwei\n")
+    assert segment_file.path == path
+    assert segment_file.size == 10
+    with open(path, "rb") as f:
+        assert f.read() == b"eins\nzwei\n"
+    assert await close_segments() == [path]
+
+
+@pytest.mark.asyncio
+async def test_abort_rolls_back_written_data(output, tmp_path, monkeypatch):
+    # Kleine Puffergröße, damit der abgebrochene Lauf bereits in die Datei geschrieben wird
+    monkeypatch.setattr(settings, "OUTPUT_APPEND_FLUSH_SIZE", 4)
+    path = str(tmp_path / "segment.jsonl")
+    await append(output, path, b"eins\n")
+
+    segment_file = await SegmentFile(output, path).open()
+    await segment_file.write(b"abgebrochen\n")
+    with open(path, "rb") as f:
+        assert f.read() == b"eins\nabgebrochen\n"
+    await segment_file.abort()
+
+    await append(output, path, b"zwei\n")
+    await close_segments()
+    with open(path, "rb") as f:
+        assert f.read() == b"eins\nzwei\n"
+
+
+@pytest.mark.asyncio
+async def test_abort_keeps_buffered_data_of_earlier_runs(output, tmp_path):
+    path = str(tmp_path / "segment.jsonl")
+    await append(output, path, b"eins\n", fsync=False)
+
+    segment_file = await SegmentFile(output, path, fsync=False).open()
+    await segment_file.write(b"abgebrochen\n")
+    await segment_file.abort()
+
+    await close_segments()
+    with open(path, "rb") as f:
+        assert f.read() == b"eins\n"
+
+
+@pytest.mark.asyncio
+async def test_compressed_blocks_form_valid_stream(output, tmp_path):
+    output.compression = "gzip"
+    path = str(tmp_path / "segment.jsonl.gz")
+    await append(output, path, b"eins\n")
+    await append(output, path, b"zwei\n")
+    await close_segments()
+    with open(path, "rb") as f:
+        assert gzip.decompress(f.read()) == b"eins\nzwei\n"